@@ -0,0 +1,338 @@
+import difflib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# --- Incremental Executable Index ---
+# Discovered apps ek SQLite index mein rehte hain. Har scanned directory ka fingerprint
+# (mtime_ns) save hota hai; agli scan mein sirf wahi directories dobara padhi jaati hain jinka
+# fingerprint badla ho. Directories os.scandir se worker pool par parallel scan hoti hain.
+
+APP_INDEX_FILE = "app_index.db"
+EXECUTABLE_SUFFIXES = ('.exe', '.lnk')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    rank INTEGER NOT NULL,
+    entry_count INTEGER NOT NULL,
+    scanned_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS apps (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    directory TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS apps_by_name ON apps(name);
+CREATE INDEX IF NOT EXISTS apps_by_directory ON apps(directory);
+CREATE TABLE IF NOT EXISTS launches (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_launched REAL NOT NULL
+);
+"""
+
+# Spoken/common names -> executable names, tried in order until one is in the index
+APP_ALIASES = {
+    'chrome': ['chrome', 'google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser'],
+    'google chrome': ['chrome', 'google-chrome', 'google-chrome-stable'],
+    'vs code': ['code'],
+    'vscode': ['code'],
+    'visual studio code': ['code'],
+    'firefox': ['firefox'],
+    'edge': ['msedge', 'microsoft-edge'],
+    'calculator': ['calc', 'calculator', 'gnome-calculator', 'kcalc'],
+    'terminal': ['wt', 'cmd', 'gnome-terminal', 'konsole', 'xterm', 'terminal'],
+    'file explorer': ['explorer', 'nautilus', 'dolphin', 'finder'],
+    'files': ['explorer', 'nautilus', 'dolphin', 'finder'],
+    'notepad': ['notepad', 'gedit', 'textedit'],
+    'text editor': ['notepad', 'gedit', 'kate', 'textedit'],
+    'spotify': ['spotify'],
+    'vlc': ['vlc'],
+}
+
+# Power, disk, account and process-control commands are never indexed, resolved or launched as apps
+SYSTEM_COMMANDS = {
+    'shutdown', 'poweroff', 'reboot', 'halt', 'init', 'telinit', 'systemctl', 'loginctl', 'kexec',
+    'sudo', 'su', 'doas', 'pkexec', 'runas', 'passwd', 'chpasswd', 'useradd', 'userdel', 'usermod',
+    'groupadd', 'groupdel', 'visudo', 'chown', 'chmod', 'chgrp', 'rm', 'rmdir', 'dd', 'shred', 'wipefs',
+    'fdisk', 'sfdisk', 'cfdisk', 'parted', 'gdisk', 'mkswap', 'swapoff', 'mount', 'umount', 'fsck',
+    'kill', 'killall', 'pkill', 'xkill', 'format', 'diskpart', 'bcdedit', 'reg', 'regedit',
+    'logoff', 'cipher', 'takeown', 'icacls', 'iptables', 'ip6tables', 'nft', 'ufw', 'modprobe', 'rmmod',
+    'insmod', 'crontab', 'at', 'truncate', 'mv', 'cp', 'ln',
+}
+SYSTEM_COMMAND_PREFIXES = ('mkfs', 'fsck.', 'systemd-', 'grub', 'update-', 'dpkg', 'apt', 'yum', 'dnf', 'rpm', 'pacman')
+# A prefix shorter than this is never completed to an app ("g" -> "g++", "reb" -> "reboot")
+MIN_PREFIX_LENGTH = 4
+
+# Shown in the prompt hint before any launch history exists
+COMMON_APP_HINTS = ['chrome', 'firefox', 'code', 'notepad', 'explorer', 'calc', 'spotify', 'vlc', 'cmd', 'terminal']
+
+
+def clean_app_name(file_name: str) -> str:
+    return file_name.split('.')[0].lower()
+
+
+def is_system_command(name: str) -> bool:
+    name = os.path.basename(name).lower()
+    return clean_app_name(name) in SYSTEM_COMMANDS or name in SYSTEM_COMMANDS or name.startswith(SYSTEM_COMMAND_PREFIXES)
+
+
+def _scan_directory(directory: str):
+    """Worker: lists one directory with os.scandir. Returns (entry_count, [(name, path), ...]) or None."""
+    found = []
+    entry_count = 0
+    try:
+        entries = os.scandir(directory)
+    except OSError:
+        return None
+    with entries:
+        for entry in entries:
+            entry_count += 1
+            try:
+                # is_file() uses the cached directory entry type, so most entries cost no extra stat
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if entry.name.lower().endswith(EXECUTABLE_SUFFIXES) or os.access(entry.path, os.X_OK):
+                name = clean_app_name(entry.name)
+                if name and not is_system_command(entry.name):
+                    found.append((name, entry.path))
+    return entry_count, found
+
+
+class AppIndex:
+    """Persistent name -> executable path index with per-directory change detection."""
+
+    def __init__(self, db_path: str = APP_INDEX_FILE):
+        self.db_path = db_path
+
+    @contextmanager
+    def _connect(self):
+        """Opens the index, commits on success and always closes the connection."""
+        connection = sqlite3.connect(self.db_path)
+        try:
+            connection.executescript(SCHEMA)
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def scan(self, directories: List[str], full_rescan: bool = False, max_workers: int = 8) -> dict:
+        """Re-examines only directories whose mtime changed since the last scan. Returns scan stats."""
+        start = time.perf_counter()
+        with self._connect() as db:
+            known = {path: mtime for path, mtime in db.execute("SELECT path, mtime_ns FROM directories")}
+
+            changed, current = [], {}
+            for rank, directory in enumerate(directories):
+                try:
+                    mtime_ns = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue  # Missing on this machine (e.g. /Applications on Linux)
+                current[directory] = (rank, mtime_ns)
+                if full_rescan or known.get(directory) != mtime_ns:
+                    changed.append(directory)
+
+            # Forget directories that vanished or are no longer part of the scan list
+            for directory in set(known) - set(current):
+                db.execute("DELETE FROM apps WHERE directory = ?", (directory,))
+                db.execute("DELETE FROM directories WHERE path = ?", (directory,))
+
+            entries_scanned = 0
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(changed)))) as pool:
+                results = pool.map(_scan_directory, changed)
+                for directory, result in zip(changed, results):
+                    if result is None:
+                        continue  # Unreadable right now; keep the old entries and retry next scan
+                    entry_count, found = result
+                    entries_scanned += entry_count
+                    db.execute("DELETE FROM apps WHERE directory = ?", (directory,))
+                    db.executemany(
+                        "INSERT OR REPLACE INTO apps (path, name, directory) VALUES (?, ?, ?)",
+                        [(path, name, directory) for name, path in found],
+                    )
+                    rank, mtime_ns = current[directory]
+                    db.execute(
+                        "INSERT OR REPLACE INTO directories (path, mtime_ns, rank, entry_count, scanned_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (directory, mtime_ns, rank, entry_count, time.time()),
+                    )
+
+            # Scan order decides which copy wins when two directories hold the same app name
+            for directory, (rank, _) in current.items():
+                db.execute("UPDATE directories SET rank = ? WHERE path = ?", (rank, directory))
+            app_count = db.execute("SELECT COUNT(DISTINCT name) FROM apps").fetchone()[0]
+            if changed or set(known) != set(current):
+                # Shared resolvers rebuild on this version, not on the file mtime that launches also change
+                version = db.execute("PRAGMA user_version").fetchone()[0]
+                db.execute(f"PRAGMA user_version = {version + 1}")
+
+        elapsed = time.perf_counter() - start
+        return {
+            "directories": len(current),
+            "changed": len(changed),
+            "skipped": len(current) - len(changed),
+            "entries_scanned": entries_scanned,
+            "seconds": elapsed,
+            "entries_per_second": entries_scanned / elapsed if elapsed > 0 else 0.0,
+            "apps": app_count,
+        }
+
+    def apps(self) -> Dict[str, str]:
+        """Every indexed app name mapped to its path, preferring earlier scan directories."""
+        if not os.path.exists(self.db_path):
+            return {}
+        discovered = {}
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT apps.name, apps.path FROM apps JOIN directories ON apps.directory = directories.path "
+                "ORDER BY directories.rank, apps.path"
+            )
+            for name, path in rows:
+                discovered.setdefault(name, path)
+        return discovered
+
+    def record_launch(self, name: str) -> None:
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO launches (name, count, last_launched) VALUES (?, 1, ?) "
+                "ON CONFLICT(name) DO UPDATE SET count = count + 1, last_launched = excluded.last_launched",
+                (name, time.time()),
+            )
+
+    def top_names(self, limit: int = 20) -> List[str]:
+        """The most-launched indexed apps, topped up with common apps, for a compact prompt hint."""
+        if not os.path.exists(self.db_path):
+            return []
+        with self._connect() as db:
+            launched = [row[0] for row in db.execute(
+                "SELECT launches.name FROM launches WHERE EXISTS (SELECT 1 FROM apps WHERE apps.name = launches.name) "
+                "ORDER BY count DESC, last_launched DESC LIMIT ?", (limit,)
+            )]
+            for name in COMMON_APP_HINTS:
+                if len(launched) >= limit:
+                    break
+                if name not in launched and db.execute("SELECT 1 FROM apps WHERE name = ?", (name,)).fetchone():
+                    launched.append(name)
+        return launched
+
+
+# --- Local App-Name Resolver ---
+# Model ko saare app names bhejne ki jagah, open_application_or_url khud user ke bole hue naam
+# ko absolute path mein resolve karta hai: exact -> alias -> ek hi (kam se kam 4 letter ka) prefix
+# match. Kai prefix matches ya sirf fuzzy match ho to app launch nahi hota, naam suggest hote hain.
+
+def normalize_app_name(name: str) -> str:
+    return re.sub(r'[\s_\-.]+', '', name.lower())
+
+
+class PrefixTrie:
+    """Maps normalized name prefixes to the indexed names that start with them."""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key: str, value: str) -> None:
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        node.setdefault('$', []).append(value)
+
+    def completions(self, prefix: str, limit: int = 10) -> List[str]:
+        node = self.root
+        for char in prefix:
+            if char not in node:
+                return []
+            node = node[char]
+        found, stack = [], [node]
+        # Breadth-first, so the shortest completions come first
+        while stack and len(found) < limit:
+            next_level = []
+            for current in stack:
+                found.extend(current.get('$', []))
+                next_level.extend(child for key, child in sorted(current.items()) if key != '$')
+            stack = next_level
+        return found[:limit]
+
+
+class AppResolver:
+    """Resolves a spoken or typed app name to (indexed name, absolute path)."""
+
+    def __init__(self, apps: Dict[str, str]):
+        # Indexes built before system commands were filtered may still hold them
+        apps = {name: path for name, path in apps.items() if not is_system_command(path)}
+        self.apps = apps
+        self.by_normalized = {}
+        self.trie = PrefixTrie()
+        for name in apps:
+            key = normalize_app_name(name)
+            self.by_normalized.setdefault(key, name)
+            self.trie.insert(key, name)
+        self.normalized_keys = list(self.by_normalized.keys())
+
+    def resolve(self, query: str) -> Optional[Tuple[str, str]]:
+        query_lower = query.strip().lower()
+        key = normalize_app_name(query_lower)
+        if not key:
+            return None
+        if query_lower in self.apps:
+            return query_lower, self.apps[query_lower]
+        for candidate in APP_ALIASES.get(query_lower, []):
+            if candidate in self.apps:
+                return candidate, self.apps[candidate]
+        if key in self.by_normalized:
+            name = self.by_normalized[key]
+            return name, self.apps[name]
+        # Only an unambiguous, long enough prefix is launched; anything else is offered via suggestions()
+        if len(key) >= MIN_PREFIX_LENGTH:
+            completions = self.trie.completions(key, limit=2)
+            if len(completions) == 1:
+                return completions[0], self.apps[completions[0]]
+        return None
+
+    def suggestions(self, query: str, limit: int = 3) -> List[str]:
+        """Candidate names for a query resolve() would not launch: prefix completions, then fuzzy matches."""
+        key = normalize_app_name(query)
+        found = self.trie.completions(key, limit=limit) if key else []
+        for close in difflib.get_close_matches(key, self.normalized_keys, n=limit, cutoff=0.5):
+            if self.by_normalized[close] not in found:
+                found.append(self.by_normalized[close])
+        return found[:limit]
+
+
+_resolver_cache = {}
+_resolver_lock = threading.Lock()
+
+
+def _index_version(db_path: str) -> Optional[int]:
+    """Bumped by every scan that changes the index; launch counts do not change it."""
+    if not os.path.exists(db_path):
+        return None
+    try:
+        connection = sqlite3.connect(db_path)
+        try:
+            return connection.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return None
+
+
+def get_resolver(db_path: str = APP_INDEX_FILE) -> AppResolver:
+    """Shared resolver, rebuilt only when a scan changed the index."""
+    fingerprint = _index_version(db_path)
+    with _resolver_lock:
+        cached = _resolver_cache.get(db_path)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+        resolver = AppResolver(AppIndex(db_path).apps() if fingerprint is not None else {})
+        _resolver_cache[db_path] = (fingerprint, resolver)
+        return resolver
@@ -0,0 +1,389 @@
+import argparse
+import asyncio
+import hmac
+import http.client
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# --- Headless Assistant Daemon ---
+# `python main.py --daemon` assistant ko ek lambe chalne wale local server ki tarah chalata hai
+# (localhost HTTP ya Unix socket). Scripts, hotkeys aur voice front end har command ke liye naya
+# process shuru kiye bina yahin turn bhejte hain. Key pool, tool executor aur intent router sab
+# sessions share karte hain (sab pehle se warm), lekin har session ki conversation history alag
+# rehti hai. Ek session mein ek waqt par ek hi turn chalta hai; queue bhar jaaye to request turant
+# 429/503 ke saath lauta di jaati hai.
+# Turn ka matlab hai tools (commands bhi) chalana, isliye har request ko ek random token chahiye
+# (daemon_token file ya ASSISTANT_DAEMON_TOKEN). Browser se aayi request (Origin header, galat Host,
+# JSON ke alawa content type) seedhe mana hoti hai, taaki koi website localhost par command na chala sake.
+# Jahan ho sake wahan TCP ki jagah sirf user ke liye khula Unix socket use hota hai.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_CONCURRENT_TURNS = 4
+MAX_QUEUED_PER_SESSION = 4
+MAX_PENDING_TURNS = 64
+MAX_SESSIONS = 64
+SESSION_IDLE_SECONDS = 30 * 60
+MAX_BODY_BYTES = 64 * 1024
+REQUEST_READ_TIMEOUT_SECONDS = 10
+DAEMON_TOKEN_FILE = "daemon_token"
+DAEMON_TOKEN_ENV = "ASSISTANT_DAEMON_TOKEN"
+SOCKET_FILE_NAME = "assistant_daemon.sock"
+
+
+def default_socket_path() -> Optional[str]:
+    """Where the daemon listens by default, or None where Unix sockets are unavailable (Windows)."""
+    if os.name == "nt" or not hasattr(socket, "AF_UNIX"):
+        return None
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_FILE_NAME)
+    return os.path.join(os.path.expanduser("~"), "." + SOCKET_FILE_NAME)
+
+
+def read_token(token_file: str = DAEMON_TOKEN_FILE) -> Optional[str]:
+    """The shared secret clients must send: the env var if set, else the token file's contents."""
+    token = os.environ.get(DAEMON_TOKEN_ENV, "").strip()
+    if token:
+        return token
+    try:
+        with open(token_file, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def load_or_create_token(token_file: str = DAEMON_TOKEN_FILE) -> str:
+    """Reads the token, creating a random one readable only by this user on first start."""
+    token = read_token(token_file)
+    if token:
+        return token
+    token = secrets.token_urlsafe(32)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    print(f"INFO: Created daemon token in '{os.path.abspath(token_file)}'.")
+    return token
+
+
+class DaemonSession:
+    """One client's conversation: its own history and chat over the shared key pool."""
+
+    def __init__(self, session_id: str, session_chat):
+        self.id = session_id
+        self.chat = session_chat
+        self.lock = asyncio.Lock()
+        self.queued = 0
+        self.turns = 0
+        self.last_used = time.monotonic()
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AssistantDaemon:
+    """Serves assistant turns to many concurrent sessions over a small JSON-over-HTTP protocol."""
+
+    def __init__(self, assistant, system_instruction: str, token: str, max_concurrent: int = MAX_CONCURRENT_TURNS,
+                 max_queued_per_session: int = MAX_QUEUED_PER_SESSION, max_pending: int = MAX_PENDING_TURNS,
+                 max_sessions: int = MAX_SESSIONS, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self.assistant = assistant  # The main module: handle_turn, create_chat, telemetry, ...
+        self.system_instruction = system_instruction
+        self.token = token
+        self.allowed_hosts = None  # Host header values accepted over TCP; set by serve()
+        self.max_queued_per_session = max_queued_per_session
+        self.max_pending = max_pending
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.sessions = OrderedDict()
+        self.pending = 0
+        self.turn_slots = asyncio.Semaphore(max_concurrent)
+        # handle_turn is blocking (model I/O, tools), so turns run on a bounded thread pool
+        self.turn_pool = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="daemon-turn")
+        self.speech = None
+        self.speech_lock = threading.Lock()
+        self.started_at = time.monotonic()
+
+    # --- Sessions ---
+
+    def session(self, session_id: str) -> DaemonSession:
+        self._expire_sessions()
+        session = self.sessions.get(session_id)
+        if session is None:
+            from conversation_store import ConversationStore
+            store = ConversationStore(token_budget=self.assistant.HISTORY_TOKEN_BUDGET,
+                                      summarizer=self.assistant.summarize_turns)
+            session = DaemonSession(session_id, self.assistant.create_chat(self.system_instruction, store))
+            self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def _expire_sessions(self) -> None:
+        """Drops idle sessions, and the least recently used ones beyond the session limit."""
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            busy = session.queued or session.lock.locked()
+            if not busy and (now - session.last_used > self.idle_seconds or len(self.sessions) > self.max_sessions):
+                del self.sessions[session_id]
+
+    # --- Turns ---
+
+    def _speaker(self, spoken: list, out_loud: bool):
+        def speak(text, cache=False):
+            spoken.append(text)
+            if out_loud:
+                with self.speech_lock:
+                    if self.speech is None:
+                        from speech_output import SpeechWorker
+                        self.speech = SpeechWorker(on_spoken=self.assistant.telemetry.record_speech)
+                self.speech.say(text, cache=cache)
+        return speak
+
+    async def run_turn(self, session_id: str, text: str, speak: bool = False) -> dict:
+        if self.pending >= self.max_pending:
+            raise HttpError(503, "The assistant is busy; try again shortly.")
+        session = self.session(session_id)
+        if session.queued >= self.max_queued_per_session:
+            raise HttpError(429, f"Session '{session_id}' already has {session.queued} turns queued.")
+
+        self.pending += 1
+        session.queued += 1
+        try:
+            # Turns of one session run in order; different sessions run side by side
+            async with session.lock:
+                async with self.turn_slots:
+                    spoken = []
+                    start = time.perf_counter()
+                    trace = self.assistant.telemetry.start_turn("daemon")
+                    loop = asyncio.get_running_loop()
+                    reply = await loop.run_in_executor(
+                        self.turn_pool, self.assistant.handle_turn,
+                        text, self._speaker(spoken, speak), trace, session.chat)
+                    session.turns += 1
+        finally:
+            self.pending -= 1
+            session.queued -= 1
+            session.last_used = time.monotonic()
+        return {
+            "session": session_id,
+            "ok": bool(reply),
+            "reply": reply,
+            "spoken": spoken,
+            "ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def status(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+            "pending_turns": self.pending,
+            "sessions": {
+                session_id: {"turns": session.turns, "queued": session.queued,
+                             "history_tokens": session.chat.store.total_tokens()}
+                for session_id, session in self.sessions.items()
+            },
+            "keys": self.assistant.key_pool.status_report().splitlines(),
+        }
+
+    # --- HTTP ---
+
+    def _check_request(self, method: str, headers: dict) -> None:
+        """Rejects anything a web page could send (cross-origin or DNS-rebound requests) and unauthenticated calls."""
+        if "origin" in headers:
+            raise HttpError(403, "Browser requests are not accepted.")
+        if self.allowed_hosts is not None and headers.get("host", "").lower() not in self.allowed_hosts:
+            raise HttpError(403, "Unexpected Host header.")
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), self.token.encode()):
+            raise HttpError(401, "Missing or invalid bearer token.")
+        if method == "POST" and headers.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            raise HttpError(415, "Content-Type must be application/json.")
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        """Returns (status, content_type, payload)."""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if method == "GET" and parts == ["health"]:
+            return 200, "application/json", self.status()
+        if method == "GET" and parts == ["metrics"]:
+            return 200, "text/plain; version=0.0.4", self.assistant.telemetry.render_metrics()
+        if method == "POST" and parts == ["turn"]:
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Body must be JSON.")
+            text = str(request.get("text", "")).strip()
+            if not text:
+                raise HttpError(400, "Missing 'text'.")
+            session_id = str(request.get("session") or "default")[:64]
+            return 200, "application/json", await self.run_turn(session_id, text, bool(request.get("speak")))
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "sessions":
+            session = self.sessions.get(parts[1])
+            if session is None:
+                raise HttpError(404, f"No session '{parts[1]}'.")
+            if session.queued:
+                raise HttpError(409, f"Session '{parts[1]}' has turns in progress.")
+            del self.sessions[parts[1]]
+            return 200, "application/json", {"deleted": parts[1]}
+        raise HttpError(404, f"No route for {method} {path}.")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        status, content_type, payload = 500, "application/json", {"error": "Internal error."}
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), REQUEST_READ_TIMEOUT_SECONDS)
+            method, path, _ = request_line.decode('latin-1').split(" ", 2)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), REQUEST_READ_TIMEOUT_SECONDS)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+            self._check_request(method.upper(), headers)
+            length = int(headers.get("content-length", "0") or 0)
+            if length > MAX_BODY_BYTES:
+                raise HttpError(413, "Request body too large.")
+            body = await asyncio.wait_for(reader.readexactly(length), REQUEST_READ_TIMEOUT_SECONDS) if length else b""
+            status, content_type, payload = await self._dispatch(method.upper(), path, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            status, payload = 400, {"error": "Malformed request."}
+        except Exception as e:
+            print(f"ERROR: Daemon request failed: {e}")
+            status, payload = 500, {"error": str(e)}
+
+        data = payload.encode('utf-8') if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        reason = http.client.responses.get(status, "")
+        try:
+            writer.write(
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode('latin-1') + data)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None) -> None:
+        # Over a Unix socket the file permissions already limit who can connect
+        self.allowed_hosts = None if socket_path else {f"{name}:{port}" for name in ("127.0.0.1", "localhost", host.lower())}
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)  # Left behind by a daemon that did not shut down cleanly
+            # Created owner-only from the start, not just chmod-ed after other users could connect
+            previous_umask = os.umask(0o177)
+            try:
+                server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            finally:
+                os.umask(previous_umask)
+            os.chmod(socket_path, 0o600)
+            where = f"unix socket {socket_path}"
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+            where = f"http://{host}:{port}"
+        print(f"INFO: Assistant daemon listening on {where} (POST /turn, GET /health, GET /metrics).")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.turn_pool.shutdown(wait=False, cancel_futures=True)
+            if self.speech:
+                self.speech.shutdown(wait=False)
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+# --- Entry Points ---
+
+def parse_args(argv: list) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the assistant as a local daemon, or send it a command.")
+    parser.add_argument("--daemon", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", default=default_socket_path(),
+                        help="Unix socket path (the default where available; see --tcp).")
+    parser.add_argument("--tcp", action="store_true", help="Use localhost TCP (--host/--port) instead of the Unix socket.")
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_TURNS)
+    parser.add_argument("--session", default="default", help="Session to send the command to (with --send).")
+    parser.add_argument("--send", metavar="TEXT", help="Send one command to a running daemon and print the reply.")
+    parser.add_argument("--speak", action="store_true", help="With --send: the daemon also speaks the reply.")
+    args = parser.parse_args(argv)
+    if args.tcp:
+        args.socket = None
+    return args
+
+
+def run_daemon(assistant, argv: list) -> None:
+    """Warms up the shared pool and tools once, then serves until interrupted. assistant is the main module."""
+    args = parse_args(argv)
+    try:
+        assistant.key_pool.preconnect()
+    except Exception as e:
+        print(f"WARNING: Could not prepare Gemini clients during startup ({e}).")
+    system_instruction = assistant.build_system_instruction(assistant.load_dynamic_app_tools())
+    assistant.tool_registry.tools()  # Builds and caches every declaration before the first turn
+    if assistant.METRICS_PORT:
+        assistant.telemetry.serve_metrics(assistant.METRICS_PORT)
+    daemon = AssistantDaemon(assistant, system_instruction, load_or_create_token(), max_concurrent=args.max_concurrent)
+    try:
+        asyncio.run(daemon.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        print("INFO: Assistant daemon stopped.")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def send_command(text: str, session: str = "default", host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 socket_path: Optional[str] = None, speak: bool = False, timeout: float = 900.0,
+                 token: Optional[str] = None) -> dict:
+    """Sends one command to a running daemon and returns its JSON reply."""
+    token = token or read_token()
+    if not token:
+        return {"error": f"No daemon token: set {DAEMON_TOKEN_ENV} or run from the folder with '{DAEMON_TOKEN_FILE}'."}
+    connection = _UnixHTTPConnection(socket_path, timeout) if socket_path else http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps({"session": session, "text": text, "speak": speak})
+        connection.request("POST", "/turn", body=body,
+                           headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"})
+        response = connection.getresponse()
+        return json.loads(response.read() or b"{}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    # Client side, e.g. bound to a hotkey: python assistant_daemon.py --send "open youtube"
+    options = parse_args(sys.argv[1:])
+    if not options.send:
+        print("Start the daemon with `python main.py --daemon`; use --send TEXT here to talk to it.")
+        sys.exit(2)
+    try:
+        result = send_command(options.send, options.session, options.host, options.port, options.socket, options.speak)
+    except OSError as e:
+        print(f"ERROR: Could not reach the assistant daemon ({e}).")
+        sys.exit(1)
+    if "error" in result:
+        print(f"ERROR: {result['error']}")
+        sys.exit(1)
+    print(result.get("reply") or "\n".join(result.get("spoken", [])))
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+from typing import Optional
+
+import speech_recognition as sr
+
+from speech_input import AudioCapture
+from speech_output import SpeechWorker
+
+# --- Asyncio Conversation Core ---
+# `python main.py --async` mein input, model, tools aur speech alag-alag cooperating stages
+# hain. Microphone aur keyboard lagataar sunte rehte hain, agle command ka transcription pichle
+# turn ke model/tools ke saath-saath chalta hai, aur model Gemini ke async client (client.aio) par
+# stream hota hai. "stop" / "ruko" bolne (ya type karne) par bolna turant band hota hai, chal
+# rahi model request aur commands cancel ho jaate hain, aur queue mein pade commands hat jaate hain.
+# ASSISTANT_BARGE_IN set ho to assistant ke bolte hue bhi zor se bola gaya command usse rok deta hai.
+
+STOP_PHRASES = {
+    "stop", "ruko", "ruk jao", "bas", "bas karo", "cancel", "chup", "chup raho", "band karo", "rehne do",
+}
+CANCELLED_PHRASE = "Theek hai, maine woh kaam rok diya."
+UTTERANCE_POLL_SECONDS = 0.5
+
+
+def is_stop_phrase(text: str) -> bool:
+    return " ".join(text.lower().strip(" .!?").split()) in STOP_PHRASES
+
+
+class AsyncAssistant:
+    """Runs the capture, turn and speech stages of the assistant as asyncio tasks."""
+
+    def __init__(self, assistant, speech: SpeechWorker, recognizer, barge_in_ratio: float = 0.0):
+        self.assistant = assistant  # The main module: handle_turn_async, telemetry, intent_router, ...
+        self.speech = speech
+        self.recognizer = recognizer
+        self.barge_in_ratio = barge_in_ratio
+        self.loop = None
+        self.commands: Optional[asyncio.Queue] = None
+        self.turn_task: Optional[asyncio.Task] = None
+        self.voice_task: Optional[asyncio.Task] = None
+        self.audio_capture = None
+
+    def speak(self, text: str, cache: bool = False) -> None:
+        self.speech.say(text, cache=cache)
+
+    # --- Input Stages ---
+
+    def _keyboard_reader(self) -> None:
+        """input() cannot be cancelled, so it runs on a daemon thread that never blocks shutdown."""
+        while True:
+            try:
+                text = input("You: ")
+            except EOFError:
+                text = "exit"
+            trace = self.assistant.telemetry.start_turn("keyboard")
+            self.loop.call_soon_threadsafe(self.submit, text, trace)
+            if text.lower().strip() == 'exit':
+                return
+
+    async def _voice_loop(self) -> None:
+        """Transcribes utterances as they arrive, while earlier turns are still being worked on."""
+        telemetry = self.assistant.telemetry
+        while True:
+            audio = await asyncio.to_thread(self.audio_capture.get_utterance, UTTERANCE_POLL_SECONDS)
+            if audio is None:
+                continue
+            trace = telemetry.start_turn("voice")
+            frame_bytes = audio.sample_rate * audio.sample_width
+            trace.add_span("stt_capture", len(audio.frame_data) / frame_bytes if frame_bytes else 0.0)
+            try:
+                text = getattr(audio, 'transcript', None)
+                if text is None:
+                    with trace.span("stt_transcribe", engine=self.recognizer.name):
+                        text = await asyncio.to_thread(self.recognizer.transcribe, audio)
+                if not text:
+                    raise sr.UnknownValueError()
+            except sr.UnknownValueError:
+                trace.finish("unrecognized")
+                self.speak(self.assistant.UNKNOWN_AUDIO_PHRASE, cache=True)
+                continue
+            except sr.RequestError:
+                trace.finish("stt_error")
+                self.speak(self.assistant.SPEECH_SERVICE_DOWN_PHRASE, cache=True)
+                continue
+            print(f"\nYou said: {text}")
+            self.submit(text, trace)
+
+    def _user_started_speaking(self) -> None:
+        """Called from the capture thread the moment speech is detected: barge-in cuts the assistant off."""
+        if self.speech.is_speaking():
+            self.speech.cancel()
+
+    def submit(self, text: str, trace) -> None:
+        text = text.strip()
+        if not text:
+            trace.finish("empty")
+            return
+        if is_stop_phrase(text):
+            trace.route = "control"
+            trace.finish("stop")
+            self.interrupt()
+            return
+        # A new command cuts off whatever is still being spoken from the last turn
+        self.speech.cancel()
+        self.commands.put_nowait((text, trace))
+
+    def interrupt(self) -> None:
+        """Stops speech, the turn in progress and every queued command."""
+        self.speech.cancel()
+        dropped = 0
+        while not self.commands.empty():
+            _, trace = self.commands.get_nowait()
+            trace.finish("dropped")
+            dropped += 1
+        if self.turn_task and not self.turn_task.done():
+            self.turn_task.cancel()
+        elif not dropped:
+            print("INFO: Nothing to stop.")
+
+    # --- Voice Mode ---
+
+    def _enable_voice(self) -> None:
+        if self.voice_task:
+            return
+        try:
+            # Calibrates once, then listens continuously, also while a turn is running
+            self.audio_capture = AudioCapture.from_microphone(
+                suppress=self.speech.is_speaking,
+                stream_recognizer=self.recognizer,
+                on_partial=lambda partial: print(f"\r... {partial}", end="", flush=True),
+                barge_in_ratio=self.barge_in_ratio,
+                on_speech_start=self._user_started_speaking,
+            ).start()
+        except Exception as e:
+            self.speak(f"Could not open the microphone: {e}")
+            return
+        self.voice_task = asyncio.create_task(self._voice_loop())
+        self.speak(self.assistant.VOICE_ENABLED_PHRASE, cache=True)
+        print("\nListening... (Say 'stop' to interrupt, 'deactivate voice' or 'exit')")
+
+    def _disable_voice(self) -> None:
+        if not self.voice_task:
+            return
+        self.voice_task.cancel()
+        self.voice_task = None
+        self.audio_capture.stop()
+        self.audio_capture = None
+        self.speak(self.assistant.VOICE_DISABLED_PHRASE, cache=True)
+
+    # --- Turn Stage ---
+
+    async def run(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.commands = asyncio.Queue()
+        threading.Thread(target=self._keyboard_reader, name="keyboard-input", daemon=True).start()
+        self.speak("Assistant is running. Type 'enable voice assistant' to start listening, or 'stop' to interrupt.")
+
+        while True:
+            text, trace = await self.commands.get()
+            command = text.lower().strip()
+            if command in ('exit', 'enable voice assistant', 'deactivate voice', 'intent report'):
+                trace.route = "control"
+                trace.finish("ok")
+            if command == 'exit':
+                break
+            if command == 'enable voice assistant':
+                self._enable_voice()
+                continue
+            if command == 'deactivate voice':
+                self._disable_voice()
+                continue
+            if command == 'intent report':
+                print(self.assistant.intent_router.report())
+                continue
+
+            # Turns run one at a time; capture and transcription of the next command keep going meanwhile
+            self.turn_task = asyncio.create_task(self.assistant.handle_turn_async(text, self.speak, trace))
+            await asyncio.wait({self.turn_task})
+            if self.turn_task.cancelled():
+                self.speak(CANCELLED_PHRASE)
+            self.turn_task = None
+
+        if self.voice_task:
+            self.voice_task.cancel()
+            self.audio_capture.stop()
+        print(self.assistant.intent_router.report())
+        self.speech.cancel()
+        self.speak(self.assistant.GOODBYE_PHRASE, cache=True)
+        await asyncio.to_thread(self.speech.shutdown, True)
+
+
+def run_async_assistant(assistant, barge_in_ratio: float = 0.0) -> None:
+    """Entry point for `python main.py --async`. assistant is the main module."""
+    speech = SpeechWorker(on_spoken=assistant.telemetry.record_speech)
+    recognizer = assistant.start_up(speech)
+    asyncio.run(AsyncAssistant(assistant, speech, recognizer, barge_in_ratio).run())
@@ -0,0 +1,469 @@
+"""
+Offline assistant benchmark: turn latency, tool-dispatch overhead, key failover and tool throughput.
+
+Usage:
+    python benchmarks/assistant_benchmark.py --json results.json
+    python benchmarks/assistant_benchmark.py --compare results.json --tolerance 0.25
+
+Nothing here touches the Gemini API, the microphone or the speaker. The key pool is given a
+scripted stub client that answers each request with pre-written function calls and replies
+after a simulated latency, and can inject 503 errors per key. Speech goes through null TTS/STT
+backends. Tools run for real inside a temporary working directory.
+
+--json writes every metric as JSON (with the git commit and Python version), and --compare
+checks a run against an earlier file: "_ms"/"_seconds" metrics must not grow (by more than 1 ms)
+and "_per_second" metrics must not shrink by more than --tolerance. The exit code is 1 on a
+regression. Compare runs made with the same options on the same machine.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from google.genai import errors, types  # noqa: E402
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_stats(seconds: list) -> dict:
+    return {
+        "count": len(seconds),
+        "p50_ms": round(percentile(seconds, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(seconds, 0.95) * 1000, 2),
+        "mean_ms": round(sum(seconds) / len(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+
+# --- Scripted Gemini Backend ---
+
+class ScriptedBackend:
+    """
+    Shared by every stub client. script maps a user message to its steps: each step is either a
+    list of (tool_name, args) calls or the final reply text. failure_rates maps a key to the
+    fraction of its requests that fail with a 503.
+    """
+
+    def __init__(self, latency: float = 0.05, failure_rates: dict = None, seed: int = 7):
+        self.script = {}
+        self.latency = latency
+        self.failure_rates = failure_rates or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.failures = {}
+        self.model_seconds = 0.0
+
+    def step_for(self, history: list, message):
+        if isinstance(message, str):
+            return self.script[message][0]
+        # A function response: count model replies since the last user message
+        for position in range(len(history) - 1, -1, -1):
+            content = history[position]
+            if content.role == 'user' and any(part.text for part in content.parts or []):
+                user_text = content.parts[0].text
+                replies = sum(1 for later in history[position:] if later.role == 'model')
+                return self.script[user_text][replies]
+        raise ValueError("function response without a user message")
+
+    def request(self, api_key: str) -> None:
+        """Simulated server time, with injected 503s for keys that are configured to fail."""
+        with self.lock:
+            self.attempts[api_key] = self.attempts.get(api_key, 0) + 1
+            fails = self.random.random() < self.failure_rates.get(api_key, 0.0)
+            if fails:
+                self.failures[api_key] = self.failures.get(api_key, 0) + 1
+            self.model_seconds += self.latency
+        time.sleep(self.latency)
+        if fails:
+            raise errors.ServerError(503, {"error": {"code": 503, "message": "Injected overload", "status": "UNAVAILABLE"}})
+
+
+def build_parts(step) -> list:
+    if isinstance(step, str):
+        return [types.Part.from_text(text=step)]
+    return [types.Part.from_function_call(name=name, args=args) for name, args in step]
+
+
+def as_content(message) -> types.Content:
+    if isinstance(message, str):
+        return types.Content(role='user', parts=[types.Part.from_text(text=message)])
+    return types.Content(role='user', parts=list(message))
+
+
+class StubChat:
+    def __init__(self, backend: ScriptedBackend, api_key: str, history: list):
+        self.backend = backend
+        self.api_key = api_key
+        self.history = list(history)
+
+    def send_message(self, message):
+        self.backend.request(self.api_key)
+        parts = build_parts(self.backend.step_for(self.history, message))
+        self.history += [as_content(message), types.Content(role='model', parts=parts)]
+        return types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role='model', parts=parts))])
+
+    def send_message_stream(self, message):
+        self.backend.request(self.api_key)
+        step = self.backend.step_for(self.history, message)
+        parts = build_parts(step)
+        if isinstance(step, str):
+            # A few text chunks, like a real stream
+            words = step.split(" ")
+            size = max(1, len(words) // 3)
+            chunks = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+            chunk_parts = [[types.Part.from_text(text=chunk)] for chunk in chunks]
+        else:
+            chunk_parts = [parts]
+        for part_list in chunk_parts:
+            yield types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role='model', parts=part_list))])
+        self.history += [as_content(message), types.Content(role='model', parts=parts)]
+
+    def get_history(self):
+        return self.history
+
+
+class StubClient:
+    """Stands in for genai.Client: chats.create for turns, models.generate_content for history summaries."""
+
+    def __init__(self, backend: ScriptedBackend, api_key: str):
+        self.chats = self
+        self.models = self
+        self.backend = backend
+        self.api_key = api_key
+
+    def create(self, model, config=None, history=None):
+        return StubChat(self.backend, self.api_key, history or [])
+
+    def generate_content(self, model, contents, config=None):
+        self.backend.request(self.api_key)
+        part = types.Part.from_text(text="- Earlier turns created benchmark files and folders.")
+        return types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role='model', parts=[part]))])
+
+
+# --- Null Speech Backends ---
+
+class NullSpeech:
+    """TTS that only counts what would have been spoken."""
+
+    def __init__(self):
+        self.spoken = []
+
+    def say(self, text, cache=False):
+        self.spoken.append(text)
+
+
+class NullRecognizer:
+    """STT that returns the transcript attached to a fake audio clip."""
+    name = "null"
+
+    def transcribe(self, audio) -> str:
+        return audio.transcript
+
+
+class FakeAudio:
+    def __init__(self, transcript: str):
+        self.transcript = transcript
+
+
+# --- Benchmarks ---
+
+def use_stub_backend(main, backend: ScriptedBackend, keys: list):
+    from key_pool import ApiKeyPool
+    main.key_pool = ApiKeyPool(keys, requests_per_minute=100000,
+                               client_factory=lambda api_key: StubClient(backend, api_key))
+    main.conversation_store.clear()
+    main.initialize_chat(main.build_system_instruction([]))
+
+
+def benchmark_turns(main, iterations: int, latency: float) -> dict:
+    """End-to-end turn latency per scenario through main.handle_turn, with stub model time subtracted for overhead."""
+    backend = ScriptedBackend(latency=latency)
+    use_stub_backend(main, backend, ["bench-key-1", "bench-key-2"])
+    speech, recognizer = NullSpeech(), NullRecognizer()
+
+    def scenarios(i):
+        yield "text_reply", f"aaj kaisa din hai {i}", [
+            "Aaj ka din accha hai. Main aapki kya madad kar sakta hoon? Bataiye."]
+        yield "single_tool", f"note_{i}.txt file banao jisme hello likho", [
+            [("create_file", {"filename": f"note_{i}.txt", "content": "hello"})],
+            f"File note_{i}.txt ban gayi hai."]
+        yield "parallel_tools", f"teen folders banao set {i}", [
+            [("create_directory", {"dirname": f"a_{i}"}), ("create_directory", {"dirname": f"b_{i}"}),
+             ("list_directory", {})],
+            "Teeno folders ban gaye hain."]
+        yield "two_round_tools", f"folder banao aur usme file rakho {i}", [
+            [("create_directory", {"dirname": f"project_{i}"})],
+            [("create_file", {"filename": f"project_{i}/readme.md", "content": "# Project"})],
+            "Folder aur file dono ban gaye."]
+        # The same scaffold (plus more files) in one batched call: a single tool round trip
+        yield "batch_scaffold", f"project setup karo batch {i}", [
+            [("apply_file_batch", {"file_paths": [f"batch_{i}/src/module_{n}.py" for n in range(10)]
+                                   + [f"batch_{i}/readme.md"],
+                                   "file_contents": [f"VALUE = {n}\n" for n in range(10)] + ["# Project"],
+                                   "directories": [f"batch_{i}/tests"]})],
+            "Project ka saara structure ban gaya."]
+        yield "local_intent", f"create folder local_{i}", None
+
+    results = {}
+    for i in range(iterations):
+        for name, utterance, steps in scenarios(i):
+            if steps:
+                backend.script[utterance] = steps
+            model_before = backend.model_seconds
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                transcript = recognizer.transcribe(FakeAudio(utterance))
+                reply = main.handle_turn(transcript, speech.say)
+            elapsed = time.perf_counter() - start
+            if not reply:
+                raise RuntimeError(f"Scenario '{name}' produced no reply for '{utterance}'")
+            entry = results.setdefault(name, {"turns": [], "overhead": []})
+            entry["turns"].append(elapsed)
+            entry["overhead"].append(elapsed - (backend.model_seconds - model_before))
+
+    report = {}
+    for name, entry in results.items():
+        stats = latency_stats(entry["turns"])
+        stats["overhead_p50_ms"] = round(percentile(entry["overhead"], 0.5) * 1000, 2)
+        report[name] = stats
+    return report
+
+
+def benchmark_dispatch(iterations: int) -> dict:
+    """Cost of the ToolExecutor itself, using tools that return immediately."""
+    from tool_executor import ToolExecutor
+    from tool_registry import ToolRegistry
+
+    def noop(**kwargs):
+        return "SUCCESS: ok"
+
+    registry = ToolRegistry()
+    registry.register(noop, group="bench", lane="system", name="lane_tool")
+    registry.register(noop, group="bench", name="free_tool")
+    executor = ToolExecutor(registry)
+    batches = {
+        "single_call": [("free_tool", {})],
+        "four_parallel_calls": [("free_tool", {})] * 4,
+        "four_lane_calls": [("lane_tool", {})] * 4,
+    }
+    report = {}
+    for name, calls in batches.items():
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            executor.run_calls(calls)
+            samples.append(time.perf_counter() - start)
+        report[name] = latency_stats(samples)
+    return report
+
+
+def benchmark_failover(main, turns: int, latency: float) -> dict:
+    """Turns over three keys while key 1 always returns 503 and key 2 fails 30% of the time."""
+    keys = ["bench-down", "bench-flaky", "bench-healthy"]
+    backend = ScriptedBackend(latency=latency, failure_rates={"bench-down": 1.0, "bench-flaky": 0.3})
+    use_stub_backend(main, backend, keys)
+    speech = NullSpeech()
+    samples, succeeded = [], 0
+    for i in range(turns):
+        utterance = f"failover check {i}"
+        backend.script[utterance] = [f"Reply number {i}."]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            reply = main.handle_turn(utterance, speech.say)
+        samples.append(time.perf_counter() - start)
+        succeeded += bool(reply)
+    report = latency_stats(samples)
+    report.update({
+        "success_rate": round(succeeded / turns, 3),
+        "attempts_per_turn": round(sum(backend.attempts.values()) / turns, 3),
+        "attempts_by_key": {key: backend.attempts.get(key, 0) for key in keys},
+        "injected_failures_by_key": {key: backend.failures.get(key, 0) for key in keys},
+        "circuit_states": [key.state for key in main.key_pool.keys],
+    })
+    return report
+
+
+def benchmark_scan(directories: int, files_per_directory: int) -> dict:
+    """AppIndex scan throughput on a synthetic tree (cold, unchanged, one directory changed) and the real tool."""
+    from app_index import AppIndex
+    import tools
+
+    root = tempfile.mkdtemp(prefix="scan_bench_")
+    scan_dirs = []
+    for d in range(directories):
+        directory = os.path.join(root, f"bin_{d}")
+        os.makedirs(directory)
+        for f in range(files_per_directory):
+            path = os.path.join(directory, f"app_{d}_{f}.exe")
+            with open(path, "w") as handle:
+                handle.write("")
+            os.chmod(path, 0o755)
+        scan_dirs.append(directory)
+
+    index = AppIndex(os.path.join(root, "bench_index.db"))
+    cold = index.scan(scan_dirs)
+    unchanged = index.scan(scan_dirs)
+    time.sleep(0.01)
+    with open(os.path.join(scan_dirs[0], "new_app.exe"), "w") as handle:
+        handle.write("")
+    one_changed = index.scan(scan_dirs)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tool_output = tools.scan_system_for_executables(full_rescan=True)
+    system_seconds = time.perf_counter() - start
+
+    def summary(stats):
+        return {"seconds": round(stats["seconds"], 4), "entries_scanned": stats["entries_scanned"],
+                "entries_per_second": round(stats["entries_per_second"], 1)}
+
+    return {
+        "synthetic_entries": directories * files_per_directory,
+        "cold": summary(cold),
+        "unchanged": summary(unchanged),
+        "one_directory_changed": summary(one_changed),
+        "system_tool_full_rescan_seconds": round(system_seconds, 4),
+        "system_tool_ok": not tool_output.startswith("ERROR"),
+    }
+
+
+def benchmark_commands(iterations: int, output_megabytes: int) -> dict:
+    """execute_command start-up cost for a trivial command and streaming throughput for a large output."""
+    import tools
+
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for _ in range(iterations):
+            start = time.perf_counter()
+            tools.execute_command("echo", ["benchmark"])
+            samples.append(time.perf_counter() - start)
+        line_count = output_megabytes * 1024 * 1024 // 64
+        script = f"import sys\nline = 'x' * 63 + '\\n'\nfor _ in range({line_count}): sys.stdout.write(line)"
+        start = time.perf_counter()
+        output = tools.execute_command(sys.executable, ["-c", script])
+        bulk_seconds = time.perf_counter() - start
+    small = latency_stats(samples)
+    small["commands_per_second"] = round(iterations / sum(samples), 1) if samples else 0.0
+    return {
+        "echo": small,
+        "bulk_output": {
+            "megabytes": output_megabytes,
+            "seconds": round(bulk_seconds, 4),
+            "megabytes_per_second": round(output_megabytes / bulk_seconds, 1),
+            "reply_characters": len(output),
+        },
+    }
+
+
+# --- Results and Regression Check ---
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def flatten(metrics: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    now, before = flatten(current["results"]), flatten(baseline["results"])
+    for name, value in sorted(now.items()):
+        old = before.get(name)
+        if not old:
+            continue
+        if name.endswith(("_ms", "seconds")) and not name.endswith("_per_second"):
+            # Sub-millisecond jitter on tiny timings is noise, not a regression
+            absolute = value - old if name.endswith("_ms") else (value - old) * 1000
+            if value > old * (1 + tolerance) and absolute > 1.0:
+                regressions.append(f"{name}: {old} -> {value} (+{(value / old - 1):.0%})")
+        elif name.endswith("_per_second") and value < old * (1 - tolerance):
+            regressions.append(f"{name}: {old} -> {value} ({(value / old - 1):.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the assistant offline with a scripted Gemini backend.")
+    parser.add_argument("--iterations", type=int, default=20, help="Repetitions per turn scenario")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Simulated seconds per model request")
+    parser.add_argument("--failover-turns", type=int, default=30)
+    parser.add_argument("--scan-directories", type=int, default=50)
+    parser.add_argument("--scan-files", type=int, default=200, help="Files per synthetic directory")
+    parser.add_argument("--command-megabytes", type=int, default=4, help="Output size for the bulk command (under the 5 MB budget)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    options = parser.parse_args()
+
+    # Tools write files and the router keeps its cache in the working directory, so use a scratch one
+    options.json = options.json and os.path.abspath(options.json)
+    options.compare = options.compare and os.path.abspath(options.compare)
+    os.chdir(tempfile.mkdtemp(prefix="assistant_bench_"))
+    os.environ.setdefault("GEMINI_API_KEY_0", "offline-benchmark")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as assistant
+
+    results = {}
+    stages = [
+        ("turns", lambda: benchmark_turns(assistant, options.iterations, options.model_latency)),
+        ("dispatch", lambda: benchmark_dispatch(options.iterations * 10)),
+        ("failover", lambda: benchmark_failover(assistant, options.failover_turns, options.model_latency)),
+        ("scan", lambda: benchmark_scan(options.scan_directories, options.scan_files)),
+        ("commands", lambda: benchmark_commands(options.iterations, options.command_megabytes)),
+    ]
+    for name, run in stages:
+        print(f"INFO: Running {name} benchmark...")
+        results[name] = run()
+
+    document = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "options": vars(options),
+        "results": results,
+    }
+    print(json.dumps(results, indent=4))
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=4)
+
+    if options.compare:
+        with open(options.compare, encoding="utf-8") as f:
+            regressions = compare(document, json.load(f), options.tolerance)
+        if regressions:
+            print("REGRESSIONS:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("INFO: No regressions beyond the tolerance.")
+
+
+if __name__ == "__main__":
+    main()
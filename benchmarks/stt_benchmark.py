@@ -0,0 +1,121 @@
+"""
+Speech recognition benchmark: real-time factor and word error rate per engine.
+
+Usage:
+    python benchmarks/stt_benchmark.py --data recordings/ --engines google,vosk --vosk-model models/vosk-model-small-en-in-0.4
+
+The data directory holds WAV recordings plus a transcripts.tsv file with one
+"<file name>\t<reference transcript>" line per recording (e.g. Hinglish commands
+like "whatsapp par bhaskar ko message karo").
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr  # noqa: E402
+
+from speech_input import create_recognizer  # noqa: E402
+
+
+def normalize_words(text: str) -> list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_dataset(data_dir: str) -> list:
+    samples = []
+    with open(os.path.join(data_dir, "transcripts.tsv"), encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            file_name, reference = line.rstrip("\n").split("\t", 1)
+            samples.append((os.path.join(data_dir, file_name), reference))
+    return samples
+
+
+def benchmark_engine(recognizer, samples: list) -> dict:
+    total_audio = total_decode = total_errors = 0.0
+    total_words = 0
+    rows = []
+    for path, reference in samples:
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        duration = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+        start = time.perf_counter()
+        try:
+            hypothesis = recognizer.transcribe(audio)
+        except (sr.UnknownValueError, sr.RequestError):
+            hypothesis = ""
+        elapsed = time.perf_counter() - start
+        wer = word_error_rate(reference, hypothesis)
+        words = len(normalize_words(reference))
+        total_audio += duration
+        total_decode += elapsed
+        total_errors += wer * words
+        total_words += words
+        rows.append({"file": os.path.basename(path), "seconds": round(duration, 3),
+                     "rtf": round(elapsed / duration, 3) if duration else None,
+                     "wer": round(wer, 3), "hypothesis": hypothesis})
+    return {
+        "engine": recognizer.name,
+        "samples": len(samples),
+        "audio_seconds": round(total_audio, 3),
+        "real_time_factor": round(total_decode / total_audio, 3) if total_audio else None,
+        "word_error_rate": round(total_errors / total_words, 3) if total_words else None,
+        "per_file": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare speech recognition engines on recorded commands.")
+    parser.add_argument("--data", required=True, help="Directory with WAV files and transcripts.tsv")
+    parser.add_argument("--engines", default="google,vosk", help="Comma-separated engines to compare")
+    parser.add_argument("--vosk-model", default=os.getenv("VOSK_MODEL_PATH"), help="Path to a Vosk model")
+    parser.add_argument("--language", default="en-IN")
+    parser.add_argument("--json", help="Optional path to write the full results as JSON")
+    options = parser.parse_args()
+
+    samples = load_dataset(options.data)
+    results = []
+    for engine in options.engines.split(","):
+        load_start = time.perf_counter()
+        try:
+            recognizer = create_recognizer(engine.strip(), options.language, options.vosk_model)
+        except Exception as e:
+            print(f"SKIPPED: {engine}: {e}")
+            continue
+        load_seconds = time.perf_counter() - load_start
+        result = benchmark_engine(recognizer, samples)
+        result["load_seconds"] = round(load_seconds, 3)
+        results.append(result)
+
+    print(f"{'Engine':<10}{'Samples':>9}{'Load(s)':>9}{'RTF':>9}{'WER':>9}")
+    for result in results:
+        print(f"{result['engine']:<10}{result['samples']:>9}{result['load_seconds']:>9}"
+              f"{result['real_time_factor']!s:>9}{result['word_error_rate']!s:>9}")
+
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
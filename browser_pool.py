@@ -0,0 +1,189 @@
+import atexit
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver #type: ignore
+from selenium.common.exceptions import WebDriverException #type: ignore
+
+# --- Persistent Selenium WebDriver Pool ---
+# Har browser profile ke liye sirf ek long-lived Chrome session rehta hai. Har web app
+# (WhatsApp/Telegram) us session mein apne tab mein khula rehta hai, isliye pehle message ke
+# baad WhatsApp Web dobara boot nahi hota. Checkout par health check hota hai aur mara hua
+# driver apne aap dobara ban jaata hai. Idle sessions reaper thread band kar deta hai.
+
+DEFAULT_IDLE_TIMEOUT_SECONDS = 600
+REAPER_INTERVAL_SECONDS = 30
+LINUX_LOCK_FILES = ("SingletonLock", "SingletonCookie", "SingletonSocket")
+
+
+class ProfileInUseError(Exception):
+    """Raised when a Chrome window outside the assistant holds the profile's lock."""
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def release_stale_profile_lock(profile_path: str) -> None:
+    """
+    Removes lock files left behind by a crashed browser. Raises ProfileInUseError if a live
+    Chrome still owns the profile, instead of letting Chrome crash on start-up.
+    """
+    if platform.system() == "Windows":
+        lock_path = os.path.join(profile_path, "lockfile")
+        if os.path.exists(lock_path):
+            try:
+                os.remove(lock_path)  # Windows keeps the file locked while Chrome is running
+            except PermissionError:
+                raise ProfileInUseError(profile_path)
+        return
+
+    singleton = os.path.join(profile_path, "SingletonLock")
+    if not os.path.islink(singleton):
+        return
+    # The link target is "<hostname>-<pid>"
+    owner = os.readlink(singleton)
+    pid = owner.rsplit("-", 1)[-1]
+    if pid.isdigit() and _process_alive(int(pid)):
+        raise ProfileInUseError(profile_path)
+    for name in LINUX_LOCK_FILES:
+        try:
+            os.remove(os.path.join(profile_path, name))
+        except FileNotFoundError:
+            pass
+
+
+class BrowserSession:
+    """One Chrome instance bound to one profile, with a tab per web app URL."""
+
+    def __init__(self, profile_path: str, headless: bool):
+        self.profile_path = profile_path
+        self.headless = headless
+        self.driver = None
+        self.tabs = {}
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        release_stale_profile_lock(self.profile_path)
+        chrome_options = webdriver.ChromeOptions()
+        # Essential step: Load the pre-logged-in browser profile
+        chrome_options.add_argument(f"user-data-dir={self.profile_path}")
+        if self.headless:
+            chrome_options.add_argument("--headless")  # Run in background without showing UI
+        self.driver = webdriver.Chrome(options=chrome_options)
+        self.tabs = {}
+
+    def is_healthy(self) -> bool:
+        if self.driver is None:
+            return False
+        try:
+            self.driver.execute_script("return document.readyState")
+            return True
+        except WebDriverException:
+            return False
+
+    def open_tab(self, url: str) -> bool:
+        """Switches to the app's tab, loading it only the first time. Returns True if freshly loaded."""
+        handle = self.tabs.get(url)
+        if handle in self.driver.window_handles:
+            self.driver.switch_to.window(handle)
+            return False
+        if self.tabs:
+            self.driver.switch_to.new_window('tab')
+        self.driver.get(url)
+        self.tabs[url] = self.driver.current_window_handle
+        return True
+
+    def quit(self) -> None:
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = None
+        self.tabs = {}
+
+
+class WebDriverPool:
+    """Keeps one warm BrowserSession per profile and reconnects or retires them as needed."""
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS, headless: bool = True):
+        self.idle_timeout = idle_timeout
+        self.headless = headless
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.reaper = None
+
+    def _session_for(self, profile_path: str) -> BrowserSession:
+        with self.lock:
+            session = self.sessions.get(profile_path)
+            if session is None:
+                session = BrowserSession(profile_path, self.headless)
+                self.sessions[profile_path] = session
+            if self.reaper is None:
+                self.reaper = threading.Thread(target=self._reap_idle, name="driver-reaper", daemon=True)
+                self.reaper.start()
+            return session
+
+    @contextmanager
+    def checkout(self, profile_path: str, url: str):
+        """
+        Yields (driver, freshly_loaded) with the app's tab active. Calls for the same profile are
+        serialized, so the assistant never fights itself over the profile lock.
+        """
+        session = self._session_for(profile_path)
+        with session.lock:
+            if not session.is_healthy():
+                if session.driver is not None:
+                    print(f"INFO: Browser session for '{profile_path}' is unresponsive. Reconnecting.")
+                session.quit()
+                session.start()
+            try:
+                freshly_loaded = session.open_tab(url)
+            except WebDriverException:
+                # The tab or window died under us; one reconnect attempt
+                session.quit()
+                session.start()
+                freshly_loaded = session.open_tab(url)
+            try:
+                yield session.driver, freshly_loaded
+            finally:
+                session.last_used = time.monotonic()
+
+    def _reap_idle(self) -> None:
+        while True:
+            time.sleep(REAPER_INTERVAL_SECONDS)
+            now = time.monotonic()
+            with self.lock:
+                sessions = list(self.sessions.values())
+            for session in sessions:
+                if session.driver is None or now - session.last_used < self.idle_timeout:
+                    continue
+                # Skip sessions that are in use right now; they will be checked next round
+                if session.lock.acquire(blocking=False):
+                    try:
+                        print(f"INFO: Closing browser session for '{session.profile_path}' after idle timeout.")
+                        session.quit()
+                    finally:
+                        session.lock.release()
+
+    def shutdown(self) -> None:
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions = {}
+        for session in sessions:
+            session.quit()
+
+
+DRIVER_POOL = WebDriverPool()
+atexit.register(DRIVER_POOL.shutdown)
@@ -0,0 +1,218 @@
+import atexit
+import itertools
+import os
+import platform
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# --- Bounded, Streaming Command Runner ---
+# Command ka output chalte-chalte console par dikhta hai, lekin model ko sirf shuruaat (head),
+# ant (tail) aur ek chhota summary milta hai. Wall-clock timeout aur output byte budget cross
+# hone par poora process tree band kar diya jaata hai. Lambe jobs detached chal sakte hain aur
+# baad mein unke handle se poll kiye ja sakte hain.
+
+READ_CHUNK_BYTES = 4096
+HEAD_BYTES = 2000
+TAIL_BYTES = 2000
+DEFAULT_MAX_OUTPUT_BYTES = 5 * 1024 * 1024
+
+
+class OutputCapture:
+    """Keeps the first and last few KB of a stream plus totals, however much output arrives."""
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = deque()
+        self.tail_size = 0
+        self.total_bytes = 0
+        self.line_count = 0
+        self.lock = threading.Lock()
+
+    def add(self, chunk: bytes) -> None:
+        with self.lock:
+            self.total_bytes += len(chunk)
+            self.line_count += chunk.count(b"\n")
+            room = self.head_bytes - len(self.head)
+            if room > 0:
+                self.head += chunk[:room]
+                chunk = chunk[room:]
+            if chunk:
+                self.tail.append(chunk)
+                self.tail_size += len(chunk)
+                while self.tail and self.tail_size - len(self.tail[0]) >= self.tail_bytes:
+                    self.tail_size -= len(self.tail.popleft())
+
+    def render(self) -> str:
+        with self.lock:
+            tail = b"".join(self.tail)[-self.tail_bytes:]
+            omitted = self.total_bytes - len(self.head) - len(tail)
+            text = self.head.decode(errors='replace')
+            if omitted > 0:
+                text += f"\n... [{omitted} bytes omitted] ...\n"
+            return text + tail.decode(errors='replace')
+
+
+def build_command_line(command: str, args=None) -> str:
+    if not args:
+        return command
+    if platform.system() == "Windows":
+        return command + " " + subprocess.list2cmdline(args)
+    import shlex
+    return command + " " + " ".join(shlex.quote(arg) for arg in args)
+
+
+# Commands a tool is waiting on right now (detached jobs are not in here)
+_foreground_runs = set()
+_foreground_lock = threading.Lock()
+
+
+class CommandRun:
+    """One shell command whose stdout/stderr are streamed to the console and captured within a budget."""
+
+    def __init__(self, command_line: str, max_output_bytes: Optional[int] = DEFAULT_MAX_OUTPUT_BYTES, echo: bool = True):
+        # max_output_bytes=None never kills for output; the capture still only keeps head and tail
+        self.command_line = command_line
+        self.max_output_bytes = max_output_bytes
+        self.echo = echo
+        self.stdout = OutputCapture()
+        self.stderr = OutputCapture()
+        self.stop_reason = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        popen_kwargs = {'stdout': subprocess.PIPE, 'stderr': subprocess.PIPE, 'stdin': subprocess.DEVNULL, 'shell': True}
+        if platform.system() == "Windows":
+            popen_kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            popen_kwargs['start_new_session'] = True  # Own process group, so the whole tree can be killed
+        self.process = subprocess.Popen(command_line, **popen_kwargs)
+        self.pumps = [
+            threading.Thread(target=self._pump, args=(self.process.stdout, self.stdout, sys.stdout), daemon=True),
+            threading.Thread(target=self._pump, args=(self.process.stderr, self.stderr, sys.stderr), daemon=True),
+        ]
+        for pump in self.pumps:
+            pump.start()
+
+    def _pump(self, pipe, capture: OutputCapture, echo_stream) -> None:
+        read = getattr(pipe, 'read1', pipe.read)
+        while True:
+            chunk = read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            capture.add(chunk)
+            if self.echo:
+                echo_stream.write(chunk.decode(errors='replace'))
+                echo_stream.flush()
+            if (self.max_output_bytes is not None and not self.stop_reason
+                    and self.stdout.total_bytes + self.stderr.total_bytes > self.max_output_bytes):
+                self.kill(f"output exceeded the {self.max_output_bytes} byte budget")
+        pipe.close()
+
+    def kill(self, reason: str) -> None:
+        self.stop_reason = reason
+        if self.process.poll() is not None:
+            return
+        try:
+            if platform.system() == "Windows":
+                subprocess.run(['taskkill', '/F', '/T', '/PID', str(self.process.pid)], capture_output=True)
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, OSError):
+            pass
+
+    def wait(self, timeout: float = None) -> int:
+        """Waits for exit, killing the process tree when the wall-clock timeout passes."""
+        with _foreground_lock:
+            _foreground_runs.add(self)
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.kill(f"timed out after {timeout:g}s")
+            self.process.wait()
+        finally:
+            with _foreground_lock:
+                _foreground_runs.discard(self)
+        for pump in self.pumps:
+            pump.join(timeout=2)
+        self._mark_finished()
+        return self.process.returncode
+
+    def _mark_finished(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+
+    def is_running(self) -> bool:
+        if self.process.poll() is None:
+            return True
+        self._mark_finished()
+        return False
+
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def summary(self) -> str:
+        """Compact report for the model: status line, then head/tail of stdout and stderr."""
+        if self.is_running():
+            status = "still running"
+        elif self.stop_reason:
+            status = f"stopped ({self.stop_reason}), exit code {self.process.returncode}"
+        else:
+            status = f"exit code {self.process.returncode}"
+        report = (
+            f"Command '{self.command_line}': {status} after {self.elapsed():.1f}s. "
+            f"stdout {self.stdout.line_count} lines / {self.stdout.total_bytes} bytes, "
+            f"stderr {self.stderr.line_count} lines / {self.stderr.total_bytes} bytes."
+            f"\nCOMMAND OUTPUT:\n{self.stdout.render()}"
+        )
+        if self.stderr.total_bytes:
+            report += f"\nCOMMAND ERROR (if any):\n{self.stderr.render()}"
+        return report
+
+
+def stop_foreground_runs(reason: str) -> int:
+    """Kills every command a tool is currently waiting on, e.g. when the user cancels the turn."""
+    with _foreground_lock:
+        runs = list(_foreground_runs)
+    for run in runs:
+        run.kill(reason)
+    return len(runs)
+
+
+# --- Detached Jobs ---
+
+_job_ids = itertools.count(1)
+COMMAND_JOBS = {}
+_jobs_lock = threading.Lock()
+
+
+def start_job(command_line: str) -> str:
+    """Starts a command in the background and returns a handle for later polling."""
+    # Servers and watchers log for hours, so a job is never killed for its output volume
+    run = CommandRun(command_line, max_output_bytes=None, echo=False)
+    with _jobs_lock:
+        job_id = f"job-{next(_job_ids)}"
+        COMMAND_JOBS[job_id] = run
+    return job_id
+
+
+def get_job(job_id: str):
+    with _jobs_lock:
+        return COMMAND_JOBS.get(job_id)
+
+
+def stop_all_jobs() -> None:
+    """Background jobs live in their own process group, so they are stopped explicitly on exit."""
+    with _jobs_lock:
+        runs = list(COMMAND_JOBS.values())
+    for run in runs:
+        if run.is_running():
+            run.kill("assistant exited")
+
+
+atexit.register(stop_all_jobs)
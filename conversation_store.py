@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    from google.genai import types
+
+# --- Bounded Conversation Memory ---
+# Conversation ki history kisi ek client/chat object mein nahi, balki assistant ke is store
+# mein rehti hai. Har request isi se kisi bhi key par chat dobara banati hai. Store ek token
+# budget ke andar recent turns rakhta hai: purane turns ke bade tool outputs pehle chhote kiye
+# jaate hain, phir bhi budget cross ho to sabse purane turns ek rolling summary mein fold ho
+# jaate hain. Isse lambe session mein bhi har turn ka prompt size lagbhag flat rehta hai.
+
+DEFAULT_TOKEN_BUDGET = 6000
+CHARS_PER_TOKEN = 4
+SUMMARY_HEADER = "[Summary of the earlier conversation]"
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """Rough size of one history entry; close enough to keep the window under budget."""
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        if part.function_call:
+            chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+        if part.function_response:
+            chars += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // CHARS_PER_TOKEN + 4
+
+
+def is_user_message(content: types.Content) -> bool:
+    """A typed or spoken user message, i.e. the start of a turn (function responses also use role 'user')."""
+    return content.role == 'user' and any(part.text for part in content.parts or [])
+
+
+def render_turn(turn: List[types.Content], clip: int = 300) -> str:
+    lines = []
+    for content in turn:
+        for part in content.parts or []:
+            if part.text:
+                speaker = "User" if content.role == 'user' else "Assistant"
+                lines.append(f"{speaker}: {part.text.strip()[:clip]}")
+            elif part.function_call:
+                lines.append(f"Tool call: {part.function_call.name}({json.dumps(part.function_call.args or {}, default=str)[:clip]})")
+            elif part.function_response:
+                result = json.dumps(part.function_response.response or {}, default=str)
+                lines.append(f"Tool result ({part.function_response.name}): {result[:clip]}")
+    return "\n".join(lines)
+
+
+def extractive_summary(previous_summary: str, turns: List[List[types.Content]]) -> str:
+    """Fallback summary without a model call: one line per folded turn."""
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        user = next((p.text for c in turn if c.role == 'user' for p in c.parts or [] if p.text), "")
+        reply = next((p.text for c in reversed(turn) if c.role == 'model' for p in c.parts or [] if p.text), "")
+        tools = [p.function_call.name for c in turn for p in c.parts or [] if p.function_call]
+        line = f"- User: {user.strip()[:150]}"
+        if tools:
+            line += f" | tools: {', '.join(tools)}"
+        if reply:
+            line += f" | Assistant: {reply.strip()[:150]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class ConversationStore:
+    """Token-budgeted conversation history that any chat on any key can be rebuilt from."""
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, keep_recent_turns: int = 3,
+                 tool_output_chars: int = 600, summary_chars: int = 3000,
+                 summarizer: Optional[Callable[[str, str], str]] = None):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.tool_output_chars = tool_output_chars
+        self.summary_chars = summary_chars
+        self.summarizer = summarizer
+        self.summary = ""
+        self.contents = []
+        self.appended = 0  # Total entries ever added; checkpoints count from here so compaction cannot shift them
+        self.compactions = 0
+
+    # --- Window ---
+
+    def history(self) -> List[types.Content]:
+        """The history sent with the next request: the rolling summary, then the recent turns verbatim."""
+        if not self.summary:
+            return list(self.contents)
+        from google.genai import types
+        return [
+            types.Content(role='user', parts=[types.Part.from_text(text=f"{SUMMARY_HEADER}\n{self.summary}")]),
+            types.Content(role='model', parts=[types.Part.from_text(text="Understood, I will keep that context in mind.")]),
+        ] + self.contents
+
+    def extend(self, new_contents: List[types.Content]) -> None:
+        self.contents.extend(new_contents)
+        self.appended += len(new_contents)
+        if self.total_tokens() > self.token_budget:
+            self.compact()
+
+    def total_tokens(self) -> int:
+        return sum(estimate_tokens(content) for content in self.history())
+
+    def checkpoint(self) -> int:
+        return self.appended
+
+    def rollback(self, checkpoint: int) -> None:
+        """Drops entries added after checkpoint, e.g. a function call whose response never got sent."""
+        excess = min(self.appended - checkpoint, len(self.contents))
+        if excess > 0:
+            del self.contents[-excess:]
+            self.appended -= excess
+
+    def _turns(self) -> List[List[types.Content]]:
+        turns = []
+        for content in self.contents:
+            if is_user_message(content) or not turns:
+                turns.append([])
+            turns[-1].append(content)
+        return turns
+
+    # --- Compaction ---
+
+    def _trim_tool_outputs(self, turn: List[types.Content]) -> List[types.Content]:
+        from google.genai import types
+        trimmed = []
+        for content in turn:
+            parts = []
+            for part in content.parts or []:
+                response = part.function_response
+                if response:
+                    text = json.dumps(response.response or {}, default=str)
+                    if len(text) > self.tool_output_chars:
+                        keep = self.tool_output_chars // 2
+                        short = f"{text[:keep]} ...[trimmed {len(text) - 2 * keep} chars]... {text[-keep:]}"
+                        part = types.Part.from_function_response(name=response.name, response={"result": short})
+                parts.append(part)
+            trimmed.append(types.Content(role=content.role, parts=parts))
+        return trimmed
+
+    def compact(self) -> None:
+        """
+        Brings the window back under budget: trims bulky tool outputs of finished turns first, then
+        folds the oldest turns into the summary. The most recent turns are never folded.
+        """
+        turns = self._turns()
+        # Only the turn in progress keeps its full tool outputs; the model has already read the rest
+        turns = [self._trim_tool_outputs(turn) for turn in turns[:-1]] + turns[-1:]
+        recent = max(1, self.keep_recent_turns)
+        older, kept = turns[:-recent], turns[-recent:]
+        self.contents = [content for turn in older + kept for content in turn]
+        if self.total_tokens() <= self.token_budget:
+            return
+
+        # Fold down to about half the budget, so the (possibly model-backed) summary runs only now and then
+        target = self.token_budget // 2
+        folded = []
+        while older and self.total_tokens() > target:
+            folded.append(older.pop(0))
+            self.contents = [content for turn in older + kept for content in turn]
+        if not folded:
+            return
+
+        self.summary = self._summarize(folded)
+        self.compactions += 1
+        print(f"INFO: Compacted {len(folded)} old turn(s) into the conversation summary "
+              f"(history now ~{self.total_tokens()} tokens).")
+
+    def _summarize(self, turns: List[List[types.Content]]) -> str:
+        summary = None
+        if self.summarizer:
+            transcript = "\n\n".join(render_turn(turn) for turn in turns)
+            try:
+                summary = self.summarizer(self.summary, transcript)
+            except Exception as e:
+                print(f"WARNING: Model summary failed ({e}). Using a short extractive summary instead.")
+        if not summary:
+            summary = extractive_summary(self.summary, turns)
+        # Oldest lines go first when the summary itself outgrows its cap
+        return summary.strip()[-self.summary_chars:]
+
+    def clear(self) -> None:
+        self.summary = ""
+        self.contents = []
@@ -0,0 +1,177 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Iterator, List, Optional
+
+# --- Directory Listing ---
+# Folder listing ab kisi bhi path ki hoti hai, glob filter aur sort ke saath, aur model ko ek
+# baar mein sirf ek page (default 50 entries) milta hai; agla page cursor se maanga jaata hai.
+# os.scandir ek hi pass mein naam, type aur size deta hai, aur har folder ka result kuch
+# seconds ke liye cache rehta hai, isliye agle pages ya dobara poochne par folder phir se scan nahi
+# hota. Recursive walk bhi isi cache se chalta hai aur ek hard limit par ruk jaata hai, chahe
+# neeche lakhon files hon.
+
+STAT_CACHE_SECONDS = 5.0
+STAT_CACHE_DIRECTORIES = 256
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_MAX_RESULTS = 1000
+MAX_RESULTS_LIMIT = 5000
+# Directories visited by one recursive walk, however few of their entries match
+MAX_WALK_DIRECTORIES = 5000
+SORT_KEYS = ("name", "size", "modified", "type")
+
+
+class DirectoryCache:
+    """
+    Short-lived cache of one scandir pass per directory: (name, is_dir, size, mtime, is_link) per entry.
+    A listing is reused while it is younger than ttl and the directory's own mtime is unchanged.
+    """
+
+    def __init__(self, ttl: float = STAT_CACHE_SECONDS, max_directories: int = STAT_CACHE_DIRECTORIES):
+        self.ttl = ttl
+        self.max_directories = max_directories
+        self.listings = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def entries(self, directory: str) -> List[tuple]:
+        """Raises OSError if directory cannot be read."""
+        signature = os.stat(directory).st_mtime_ns
+        now = time.monotonic()
+        with self.lock:
+            cached = self.listings.get(directory)
+            if cached and cached[0] == signature and cached[1] > now:
+                self.hits += 1
+                self.listings.move_to_end(directory)
+                return cached[2]
+            self.misses += 1
+
+        entries = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                try:
+                    is_dir = entry.is_dir()
+                    # On Windows scandir already carries the stat; elsewhere this is one lstat/stat per entry
+                    stat = entry.stat()
+                    entries.append((entry.name, is_dir, 0 if is_dir else stat.st_size, stat.st_mtime, entry.is_symlink()))
+                except OSError:
+                    entries.append((entry.name, False, 0, 0.0, True))  # Broken link or vanished meanwhile
+
+        with self.lock:
+            self.listings[directory] = (signature, now + self.ttl, entries)
+            self.listings.move_to_end(directory)
+            while len(self.listings) > self.max_directories:
+                self.listings.popitem(last=False)
+        return entries
+
+
+# Shared by every listing call, so paging through a big folder scans it once
+DIRECTORY_CACHE = DirectoryCache()
+
+
+def _matcher(pattern: str):
+    patterns = [p.strip() for p in re.split(r"[;,]", pattern or "*") if p.strip()] or ["*"]
+    if patterns == ["*"]:
+        return lambda name: True
+    return lambda name: any(fnmatch.fnmatch(name, p) for p in patterns)
+
+
+def _walk(root: str, matches, max_results: int, cache: DirectoryCache, stats: dict) -> Iterator[tuple]:
+    """
+    Breadth-first walk yielding (relative_path, is_dir, size, mtime) for matching entries, at most
+    max_results of them. Symlinked folders are not followed and unreadable folders are skipped.
+    stats['truncated'] is set when the walk stops at MAX_WALK_DIRECTORIES with folders left.
+    """
+    pending = deque([""])
+    visited = 0
+    produced = 0
+    while pending and visited < MAX_WALK_DIRECTORIES:
+        relative = pending.popleft()
+        visited += 1
+        try:
+            entries = cache.entries(os.path.join(root, relative) if relative else root)
+        except OSError:
+            continue
+        for name, is_dir, size, mtime, is_link in sorted(entries):
+            path = os.path.join(relative, name) if relative else name
+            if is_dir and not is_link:
+                pending.append(path)
+            if matches(name):
+                yield path, is_dir, size, mtime
+                produced += 1
+                if produced >= max_results:
+                    return
+    stats['truncated'] = bool(pending)
+
+
+def _human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _sorted(items: List[tuple], sort_by: str) -> List[tuple]:
+    if sort_by == "size":
+        return sorted(items, key=lambda item: (-item[2], item[0].lower()))
+    if sort_by == "modified":
+        return sorted(items, key=lambda item: (-item[3], item[0].lower()))
+    if sort_by == "type":
+        return sorted(items, key=lambda item: (not item[1], os.path.splitext(item[0])[1].lower(), item[0].lower()))
+    return sorted(items, key=lambda item: item[0].lower())
+
+
+def list_directory(path: str = ".", pattern: str = "*", sort_by: str = "name", page_size: int = DEFAULT_PAGE_SIZE,
+                   cursor: Optional[str] = None, recursive: bool = False,
+                   max_results: int = DEFAULT_MAX_RESULTS, cache: DirectoryCache = DIRECTORY_CACHE) -> str:
+    """One page of the listing as a compact string, with the cursor for the next page if there is one."""
+    directory = os.path.abspath(os.path.expanduser(path or "."))
+    if not os.path.isdir(directory):
+        return f"ERROR: Directory '{path}' not found."
+    sort_by = (sort_by or "name").lower()
+    if sort_by not in SORT_KEYS:
+        return f"ERROR: Unknown sort key '{sort_by}' (use one of: {', '.join(SORT_KEYS)})."
+    page_size = max(1, min(int(page_size or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    try:
+        offset = max(0, int(cursor)) if cursor else 0
+    except ValueError:
+        return f"ERROR: Invalid cursor '{cursor}'. Use the cursor from the previous page."
+
+    matches = _matcher(pattern)
+    limited = False
+    walk_stats = {}
+    try:
+        if recursive:
+            max_results = max(1, min(int(max_results or DEFAULT_MAX_RESULTS), MAX_RESULTS_LIMIT))
+            items = list(_walk(directory, matches, max_results, cache, walk_stats))
+            limited = len(items) >= max_results or walk_stats.get('truncated', False)
+        else:
+            items = [item for item in cache.entries(directory) if matches(item[0])]
+    except OSError as e:
+        return f"ERROR: Could not list '{path}'. Reason: {e}"
+
+    total = len(items)
+    page = _sorted(items, sort_by)[offset:offset + page_size]
+    filter_note = f" matching '{pattern}'" if pattern and pattern.strip() != "*" else ""
+    if not page:
+        if offset and total:
+            return f"INFO: No more entries in '{directory}'{filter_note} ({total} in total)."
+        return f"INFO: '{directory}' has no entries{filter_note}."
+
+    names = [f"{name}/" if is_dir else f"{name} ({_human_size(size)})" for name, is_dir, size, *_ in page]
+    summary = (
+        f"SUCCESS: '{directory}'{' (recursive)' if recursive else ''}: entries {offset + 1}-{offset + len(page)} "
+        f"of {total}{'+' if limited else ''}{filter_note}, sorted by {sort_by}: " + ", ".join(names) + "."
+    )
+    if offset + len(page) < total:
+        summary += f" More entries: call again with cursor='{offset + len(page)}'."
+    if walk_stats.get('truncated'):
+        summary += f" Stopped after searching {MAX_WALK_DIRECTORIES} folders; use a narrower path."
+    elif limited:
+        summary += f" Stopped at the {max_results} result limit; use a narrower path or pattern."
+    return summary
@@ -0,0 +1,216 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# --- Batched File Operations ---
+# Project scaffold jaise kaam (das folders, tees files) ek hi tool call mein ho jaate hain, har
+# file ke liye alag function call aur model round trip nahi lagta. Har file pehle usi folder mein
+# ek temp file mein likhi jaati hai (bade content chunks mein, append ke liye purani file copy
+# karke), alag-alag files saath-saath threads par. Sab temp files ban jaayein tabhi rename se
+# asli jagah aati hain; beech mein kuch bhi fail ho to puraani files wapas aa jaati hain aur
+# naye banaye folders hat jaate hain, yaani ya poora batch lagta hai ya kuch nahi.
+
+WRITE_CHUNK_BYTES = 1024 * 1024
+MAX_WORKERS = 8
+WRITE_MODES = ("write", "append")
+
+
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Temp files are created private (0600); new files get the permissions open() would have given them
+NEW_FILE_MODE = 0o666 & ~_current_umask()
+
+
+class BatchError(Exception):
+    """A batch entry that cannot be applied; nothing has been changed when this is raised."""
+
+
+class _FileTarget:
+    """Every manifest entry for one path, applied in order to a temp file next to it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pieces = []  # (mode, content)
+        self.temp_path = None
+        self.backup_path = None
+        self.existed = False
+        self.size = 0
+
+
+def _staged_path(path: str, suffix: str) -> str:
+    fd, staged = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=suffix, dir=os.path.dirname(path))
+    os.close(fd)
+    return staged
+
+
+def _write_chunks(f, content: str) -> int:
+    """Writes content in fixed-size slices, so a large file never needs a second full copy in memory."""
+    data = memoryview(content.encode('utf-8'))
+    for offset in range(0, len(data), WRITE_CHUNK_BYTES):
+        f.write(data[offset:offset + WRITE_CHUNK_BYTES])
+    return len(data)
+
+
+def _stage(target: _FileTarget) -> None:
+    """Builds the final content of target in its temp file; the real file is not touched."""
+    target.existed = os.path.exists(target.path)
+    target.temp_path = _staged_path(target.path, ".tmp")
+    first_mode = target.pieces[0][0]
+    if first_mode == "append" and target.existed:
+        shutil.copyfile(target.path, target.temp_path)
+    with open(target.temp_path, 'ab') as f:
+        for mode, content in target.pieces:
+            if mode == "write":
+                f.seek(0)
+                f.truncate()
+            _write_chunks(f, content)
+        f.flush()
+        os.fsync(f.fileno())
+        target.size = f.tell()
+    if target.existed:
+        shutil.copymode(target.path, target.temp_path)
+    else:
+        os.chmod(target.temp_path, NEW_FILE_MODE)
+
+
+# --- Validation ---
+
+def _plan(file_paths: List[str], file_contents: List[str], write_modes: Optional[List[str]],
+          directories: Optional[List[str]], base_directory: str) -> tuple:
+    """Checks the whole manifest before anything is written. Returns (directories, targets)."""
+    if len(file_contents) != len(file_paths):
+        raise BatchError(f"{len(file_paths)} file paths but {len(file_contents)} contents.")
+    write_modes = write_modes or ["write"] * len(file_paths)
+    if len(write_modes) == 1 and len(file_paths) > 1:
+        write_modes = write_modes * len(file_paths)
+    if len(write_modes) != len(file_paths):
+        raise BatchError(f"{len(file_paths)} file paths but {len(write_modes)} write modes.")
+    if not os.path.isdir(base_directory):
+        raise BatchError(f"Base directory '{base_directory}' not found.")
+
+    def resolve(path: str) -> str:
+        if not path or not path.strip():
+            raise BatchError("Empty path in the manifest.")
+        return os.path.abspath(os.path.join(base_directory, os.path.expanduser(path.strip())))
+
+    targets: Dict[str, _FileTarget] = {}
+    for path, content, mode in zip(file_paths, file_contents, write_modes):
+        mode = (mode or "write").lower().strip()
+        if mode not in WRITE_MODES:
+            raise BatchError(f"Unknown write mode '{mode}' for '{path}' (use 'write' or 'append').")
+        full_path = resolve(path)
+        if os.path.isdir(full_path):
+            raise BatchError(f"'{path}' is an existing directory.")
+        # Repeated paths add to the same file in order, which is how large content arrives in parts
+        targets.setdefault(full_path, _FileTarget(full_path)).pieces.append((mode, content or ""))
+
+    wanted = {resolve(directory) for directory in directories or []}
+    wanted.update(os.path.dirname(path) for path in targets)
+    for directory in wanted:
+        if directory in targets:
+            raise BatchError(f"'{directory}' is listed both as a file and as a directory.")
+        existing = directory
+        while not os.path.exists(existing):
+            existing = os.path.dirname(existing)
+        if not os.path.isdir(existing):
+            raise BatchError(f"Cannot create '{directory}': '{existing}' is a file.")
+    # Parents before children, so every created directory can be recorded for rollback
+    return sorted(wanted, key=lambda d: (d.count(os.sep), d)), list(targets.values())
+
+
+# --- Apply and Roll Back ---
+
+def _make_directories(directories: List[str], created: List[str]) -> None:
+    for directory in directories:
+        missing = []
+        current = directory
+        while not os.path.exists(current):
+            missing.append(current)
+            current = os.path.dirname(current)
+        for path in reversed(missing):
+            os.mkdir(path)
+            created.append(path)
+
+
+def _move_aside(target: _FileTarget) -> None:
+    """Moves the existing file to a backup; backup_path is only set once it really holds the original."""
+    backup_path = _staged_path(target.path, ".bak")
+    try:
+        os.replace(target.path, backup_path)
+    except OSError:
+        os.remove(backup_path)
+        raise
+    target.backup_path = backup_path
+
+
+def _roll_back(targets: List[_FileTarget], committed: List[_FileTarget], created: List[str]) -> None:
+    # Every moved-aside original comes back, also when its own rename failed and it is not committed
+    for target in reversed(targets):
+        if target.backup_path:
+            try:
+                os.replace(target.backup_path, target.path)
+                target.backup_path = None
+            except OSError as e:
+                # The backup is now the only copy, so it is left where it is
+                print(f"ERROR: Could not restore '{target.path}'; the original is kept at '{target.backup_path}' ({e}).")
+        elif target in committed and os.path.exists(target.path):
+            os.remove(target.path)
+    for target in targets:
+        if target.temp_path and os.path.exists(target.temp_path):
+            os.remove(target.temp_path)
+    for directory in reversed(created):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # Something else was put there meanwhile; leave it
+
+
+def apply_batch(file_paths: List[str], file_contents: List[str], write_modes: Optional[List[str]] = None,
+                directories: Optional[List[str]] = None, base_directory: str = ".") -> str:
+    """Applies the manifest atomically and returns one summary line."""
+    start = time.perf_counter()
+    try:
+        planned_directories, targets = _plan(file_paths, file_contents, write_modes, directories, base_directory)
+    except BatchError as e:
+        return f"ERROR: Batch not applied. {e}"
+    if not targets and not planned_directories:
+        return "INFO: The batch is empty; nothing to do."
+
+    created, committed = [], []
+    try:
+        _make_directories(planned_directories, created)
+        if len(targets) > 1:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(targets))) as pool:
+                # list() re-raises the first failure after every staging write has finished
+                list(pool.map(_stage, targets))
+        elif targets:
+            _stage(targets[0])
+        # Renames are fast and ordered; old contents are kept aside until the whole batch is in place
+        for target in targets:
+            if target.existed:
+                _move_aside(target)
+            os.replace(target.temp_path, target.path)
+            target.temp_path = None
+            committed.append(target)
+    except Exception as e:
+        _roll_back(targets, committed, created)
+        return f"ERROR: Batch rolled back, no files or folders were changed. Reason: {e}"
+
+    for target in targets:
+        if target.backup_path:
+            os.remove(target.backup_path)
+
+    written = sum(1 for target in targets if target.pieces[0][0] == "write" or not target.existed)
+    total_bytes = sum(target.size for target in targets)
+    return (
+        f"SUCCESS: Batch applied in '{os.path.abspath(base_directory)}' in {time.perf_counter() - start:.2f}s: "
+        f"{len(created)} folder(s) created, {written} file(s) written, {len(targets) - written} appended, "
+        f"{total_bytes / 1024:.1f} KB total."
+    )
@@ -0,0 +1,224 @@
+import os
+import re
+import threading
+from typing import Callable, List, Optional
+
+from app_index import APP_ALIASES, APP_INDEX_FILE, get_resolver, normalize_app_name
+from state_store import STATE_STORE
+from tools import SITE_SEARCH_TEMPLATES
+
+# --- Fast Local Intent Router ---
+# Seedhe, saaf commands ("open youtube", "list files", "create folder X") ke liye Gemini ka
+# round trip zaroori nahi. Compiled pattern rules aur pichle successful turns se seekhi gayi
+# utterance -> tool call cache se command seedha tools.py par dispatch hota hai. Confidence
+# kam ho ya tool fail ho, to request model ke paas hi jaati hai.
+
+INTENT_CACHE_FILE = "intent_cache.json"
+CONFIDENCE_THRESHOLD = 0.85
+
+# Only read-only tools are learned: a learned call replays without the model, so it must be harmless
+# even when it was learned from an utterance that meant something else in its original context
+LEARNABLE_TOOLS = {
+    'list_directory',
+    'scan_system_for_executables',
+}
+# A mapping replays only after the same utterance led to the same call this many times
+LEARN_MIN_OBSERVATIONS = 2
+LEARNED_CONFIDENCE = 0.95
+MIN_LEARNED_WORDS = 2
+# Answers to a question ("haan", "ok karo") mean nothing on their own and are never learned
+CONFIRMATION_WORDS = {
+    'haan', 'han', 'ha', 'hanji', 'ji', 'yes', 'yeah', 'yep', 'ok', 'okay', 'theek', 'thik', 'hai', 'sure',
+    'karo', 'kar', 'do', 'de', 'nahi', 'na', 'no', 'nope', 'bilkul', 'chalo', 'done', 'go', 'ahead', 'right',
+    'sahi', 'correct', 'confirm', 'yahi', 'wahi', 'same', 'this', 'that', 'one', 'it',
+}
+# Bare host names only count as sites with one of these endings (so "notes.txt" or "main.py" are not URLs)
+WEB_TLDS = ("com", "org", "net", "io", "dev", "app", "ai", "in", "co", "edu", "gov", "me", "tv", "info", "xyz", "uk")
+URL_PATTERN = re.compile(
+    r"(?:https?://\S+|www\.[\w\-]+(?:\.[\w\-]+)+(?:/\S*)?|[\w\-]+(?:\.[\w\-]+)*\.(?:%s)(?:/\S*)?)" % "|".join(WEB_TLDS),
+    re.IGNORECASE,
+)
+
+FILLER_WORDS = {'please', 'plz', 'pls', 'zara', 'jaldi', 'kripya', 'now', 'abhi'}
+SITES = "|".join(re.escape(site) for site in sorted(SITE_SEARCH_TEMPLATES, key=len, reverse=True))
+SEARCHABLE_SITES = "youtube|google|spotify|stackoverflow"
+
+
+def normalize_utterance(text: str) -> str:
+    """Lower-cased, punctuation-trimmed, filler-free form used as the learned-cache key."""
+    words = re.sub(r"[^\w\s.\-/]", " ", text.lower()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS).strip(" .")
+
+
+class IntentMatch:
+    """A tool call the router is confident enough to run without the model."""
+
+    def __init__(self, tool_name: str, args: dict, confidence: float, source: str):
+        self.tool_name = tool_name
+        self.args = args
+        self.confidence = confidence
+        self.source = source
+
+
+class _Rule:
+    def __init__(self, name: str, pattern: str, build: Callable):
+        self.name = name
+        self.regex = re.compile(pattern, re.IGNORECASE)
+        self.build = build
+
+
+class IntentRouter:
+    """Matches utterances against compiled rules and a learned cache, and keeps hit-rate stats."""
+
+    def __init__(self, cache_file: str = INTENT_CACHE_FILE, app_index_file: str = APP_INDEX_FILE,
+                 threshold: float = CONFIDENCE_THRESHOLD):
+        self.cache_file = cache_file
+        self.app_index_file = app_index_file
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.rules = self._compile_rules()
+        self.stats = {'local': [], 'model': [], 'fallbacks': 0, 'sources': {}}
+
+    # --- Rules ---
+
+    def _compile_rules(self) -> List[_Rule]:
+        return [
+            _Rule('search_site',
+                  rf"^(?:search|find|play|dhundo)\s+(?P<query>.+?)\s+(?:on|in|par|pe)\s+(?P<site>{SEARCHABLE_SITES})$",
+                  self._build_search),
+            _Rule('search_site',
+                  rf"^(?P<site>{SEARCHABLE_SITES})\s+(?:par|pe|mein|me|on)\s+(?P<query>.+?)\s+"
+                  r"(?:search karo|search kar do|search|dhundo|chalao|play karo|lagao)$",
+                  self._build_search),
+            _Rule('list_files',
+                  r"^(?:ls|dir|list|list files|show files|list (?:the )?(?:current )?(?:directory|folder)(?: contents)?|"
+                  r"files dikhao|files list karo|(?:is )?folder (?:ki|ke) files dikhao)$",
+                  lambda m: ('list_directory', {}, 0.95)),
+            _Rule('create_directory',
+                  r"^(?:create|make|new)\s+(?:a\s+)?(?:folder|directory|dir)\s+(?:named\s+|called\s+)?(?P<name>[\w.\-]+)$",
+                  lambda m: ('create_directory', {'dirname': m.group('name')}, 0.95)),
+            _Rule('create_directory',
+                  r"^(?P<name>[\w.\-]+)\s+(?:naam ka|name ka|naam se)?\s*(?:folder|directory)\s+(?:banao|bana do|create karo)$",
+                  lambda m: ('create_directory', {'dirname': m.group('name')}, 0.95)),
+            _Rule('create_directory', r"^mkdir\s+(?P<name>[\w.\-]+)$",
+                  lambda m: ('create_directory', {'dirname': m.group('name')}, 0.95)),
+            _Rule('create_file',
+                  r"^(?:create|make|new)\s+(?:an?\s+)?(?:empty\s+)?file\s+(?:named\s+|called\s+)?(?P<name>[\w.\-]+)$",
+                  lambda m: ('create_file', {'filename': m.group('name'), 'content': ""}, 0.95)),
+            _Rule('create_file',
+                  r"^file\s+ka\s+naam\s+(?P<name>[\w.\-]+)\s+(?:se|rakh ke|rakhkar)\s+banao$",
+                  lambda m: ('create_file', {'filename': m.group('name'), 'content': ""}, 0.95)),
+            _Rule('open_target', r"^(?:open|launch|start|kholo|chalao)\s+(?P<target>.+)$", self._build_open),
+            _Rule('open_target',
+                  r"^(?P<target>.+?)\s+(?:kholo|khol do|open karo|open kar do|chalao|start karo|launch karo)$",
+                  self._build_open),
+        ]
+
+    @staticmethod
+    def _build_search(match):
+        site = match.group('site').lower()
+        return 'open_application_or_url', {'target_type': 'site', 'target_name': site,
+                                           'search_query': match.group('query')}, 0.9
+
+    def _build_open(self, match):
+        target = match.group('target').strip()
+        lowered = target.lower()
+        if lowered in SITE_SEARCH_TEMPLATES:
+            return 'open_application_or_url', {'target_type': 'site', 'target_name': lowered}, 0.95
+        resolved = get_resolver(self.app_index_file).resolve(target)
+        if resolved is not None:
+            # Exact or alias hits are trusted; prefix hits are left to the model
+            exact = normalize_app_name(resolved[0]) == normalize_app_name(target) or lowered in APP_ALIASES
+            return 'open_application_or_url', {'target_type': 'app', 'target_name': target}, 0.9 if exact else 0.6
+        if os.path.exists(os.path.expanduser(target)):
+            return None  # A local file or folder, not a website
+        if URL_PATTERN.fullmatch(target):
+            return 'open_application_or_url', {'target_type': 'site', 'target_name': target}, 0.9
+        return None
+
+    # --- Routing ---
+
+    def route(self, utterance: str) -> Optional[IntentMatch]:
+        """Returns a confident local match, or None to send the utterance to the model."""
+        key = normalize_utterance(utterance)
+        learned = self.learned().get(key)
+        if learned and learned.get('hits', 0) >= LEARN_MIN_OBSERVATIONS and learned['tool'] in LEARNABLE_TOOLS:
+            return IntentMatch(learned['tool'], dict(learned['args']), LEARNED_CONFIDENCE, 'learned')
+
+        text = " ".join(utterance.strip().rstrip("?!.").split())
+        text = " ".join(word for word in text.split() if word.lower() not in FILLER_WORDS)
+        for rule in self.rules:
+            match = rule.regex.match(text)
+            if not match:
+                continue
+            built = rule.build(match)
+            if built and built[2] >= self.threshold:
+                return IntentMatch(built[0], built[1], built[2], f"rule:{rule.name}")
+        return None
+
+    def learn(self, utterance: str, tool_name: str, args: dict, answers_question: bool = False) -> None:
+        """
+        Counts a successful single-tool model turn for this utterance. Once the same utterance has led
+        to the same call LEARN_MIN_OBSERVATIONS times, it skips the model. A reply to a question from
+        the assistant depends on that question, so it is never learned.
+        """
+        if tool_name not in LEARNABLE_TOOLS or answers_question:
+            return
+        key = normalize_utterance(utterance)
+        words = key.split()
+        if len(words) < MIN_LEARNED_WORDS or all(word in CONFIRMATION_WORDS for word in words):
+            return
+
+        def remember(learned):
+            entry = learned.get(key)
+            if entry and entry['tool'] == tool_name and entry['args'] == args:
+                entry['hits'] += 1
+            else:
+                # A different call for the same words starts the count over
+                learned[key] = {'tool': tool_name, 'args': args, 'hits': 1}
+
+        STATE_STORE.update(self.cache_file, remember)
+
+    def forget(self, utterance: str) -> None:
+        """Drops a learned mapping that just failed, so it is not replayed again."""
+        key = normalize_utterance(utterance)
+        STATE_STORE.update(self.cache_file, lambda learned: learned.pop(key, None))
+
+    # --- Persistence ---
+
+    def learned(self) -> dict:
+        """The learned cache, kept in memory by the state store and saved in batches."""
+        return STATE_STORE.get(self.cache_file)
+
+    # --- Hit-Rate and Latency Report ---
+
+    def record(self, routed_locally: bool, seconds: float, source: Optional[str] = None) -> None:
+        with self.lock:
+            self.stats['local' if routed_locally else 'model'].append(seconds)
+            if source:
+                self.stats['sources'][source] = self.stats['sources'].get(source, 0) + 1
+
+    def record_fallback(self) -> None:
+        """A local match whose tool failed, so the model handled the utterance after all."""
+        with self.lock:
+            self.stats['fallbacks'] += 1
+
+    def report(self) -> str:
+        with self.lock:
+            local, model = sorted(self.stats['local']), sorted(self.stats['model'])
+            sources = dict(self.stats['sources'])
+            fallbacks = self.stats['fallbacks']
+        total = len(local) + len(model)
+        if not total:
+            return "INFO: No routed turns yet."
+
+        def p50(values):
+            return f"{values[len(values) // 2] * 1000:.0f}ms" if values else "n/a"
+
+        breakdown = ", ".join(f"{source}: {count}" for source, count in sorted(sources.items()))
+        return (
+            f"Intent router: {len(local)}/{total} turns handled locally ({len(local) / total:.0%} hit rate), "
+            f"{fallbacks} fell back to the model after a local tool error.\n"
+            f"p50 latency: local {p50(local)}, model {p50(model)}.\n"
+            f"Local hits by source: {breakdown or 'none'}. Learned utterances: {len(self.learned())}."
+        )
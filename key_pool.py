@@ -0,0 +1,483 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Optional
+
+from conversation_store import ConversationStore
+from rate_limiter import TokenBucketRateLimiter, parse_retry_after
+
+# --- Health-Scored API Key Pool ---
+# Har key ki latency aur error rate track hoti hai. Baar-baar fail hone wali key ka circuit
+# breaker "open" ho jaata hai, kuch der baad "half_open" mein ek trial request jaati hai, aur
+# success par key wapas pool mein aa jaati hai. Slow request par doosri key par hedged
+# duplicate bheja jaata hai aur jo pehle jawab de, wahi jeet-ta hai.
+# google-genai ka import bhaari hai (~0.6s), isliye woh pehli zaroorat par ya preconnect() mein
+# hota hai, jo startup par greeting ke saath background mein chalta hai.
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+RATE_LIMITED_STATUS_CODES = (429, 503)
+KEY_REJECTED_STATUS_CODES = (401, 403)
+DEFAULT_LATENCY_SECONDS = 2.0
+HALF_OPEN_SCORE_PENALTY = 10.0
+
+
+class AllKeysUnavailableError(Exception):
+    """Raised when every key's circuit stays open for longer than the pool is willing to wait."""
+
+
+class KeyState:
+    """Health bookkeeping and circuit breaker for a single API key."""
+
+    def __init__(self, index: int, api_key: str, limiter: TokenBucketRateLimiter,
+                 window: int, reset_timeout: float):
+        self.index = index
+        self.api_key = api_key
+        self.limiter = limiter
+        self.client = None
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.reset_timeout = reset_timeout
+        self.trial_in_flight = False
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+    def health_score(self) -> float:
+        """Lower is better: typical latency inflated by error rate, plus any rate-limit wait."""
+        median = self.latency_percentile(0.5) or DEFAULT_LATENCY_SECONDS
+        score = median * (1 + 4 * self.error_rate()) + self.limiter.expected_wait()
+        if self.state == HALF_OPEN:
+            score += HALF_OPEN_SCORE_PENALTY
+        return score
+
+
+class ApiKeyPool:
+    """Routes requests to the healthiest key, fails over on errors and hedges slow calls."""
+
+    def __init__(self, api_keys: List[str], requests_per_minute: float,
+                 failure_threshold: int = 3, error_rate_threshold: float = 0.5,
+                 reset_timeout: float = 15.0, max_reset_timeout: float = 300.0,
+                 hedge_percentile: float = 0.9, min_hedge_samples: int = 5,
+                 min_hedge_delay: float = 1.0, max_outage_wait: float = 60.0,
+                 window: int = 50, client_factory: Optional[Callable[[str], object]] = None):
+        self.keys = [
+            KeyState(i, key, TokenBucketRateLimiter(requests_per_minute), window, reset_timeout)
+            for i, key in enumerate(api_keys)
+        ]
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_samples = min_hedge_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.max_outage_wait = max_outage_wait
+        # Builds the client for one API key; benchmarks pass a scripted stub instead of genai.Client
+        self.client_factory = client_factory
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(2, 2 * len(api_keys)),
+                                           thread_name_prefix="key-pool")
+
+    # --- Key Selection ---
+
+    def _client_for(self, key: KeyState):
+        if key.client is None:
+            factory = self.client_factory
+            if factory is None:
+                from google import genai
+                factory = lambda api_key: genai.Client(api_key=api_key)
+            with self.lock:
+                if key.client is None:
+                    key.client = factory(key.api_key)
+        return key.client
+
+    def preconnect(self) -> None:
+        """Imports the SDK and builds every key's client ahead of the first request."""
+        for key in self.keys:
+            self._client_for(key)
+
+    def _acquire_key(self, exclude=()) -> Optional[KeyState]:
+        """Picks the best-scoring usable key. Open circuits past their timeout get one half-open trial."""
+        with self.lock:
+            now = time.monotonic()
+            candidates = []
+            for key in self.keys:
+                if key.index in exclude:
+                    continue
+                if key.state == OPEN and now >= key.open_until:
+                    key.state = HALF_OPEN
+                    key.trial_in_flight = False
+                if key.state == CLOSED or (key.state == HALF_OPEN and not key.trial_in_flight):
+                    candidates.append(key)
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda k: k.health_score())
+            if best.state == HALF_OPEN:
+                best.trial_in_flight = True
+            return best
+
+    def _seconds_until_half_open(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            pending = [k.open_until - now for k in self.keys if k.state == OPEN]
+        return max(0.0, min(pending)) if pending else self.min_hedge_delay
+
+    # --- Health Recording ---
+
+    def _record_success(self, key: KeyState, latency: float) -> None:
+        key.limiter.reward()
+        with self.lock:
+            key.latencies.append(latency)
+            key.outcomes.append(True)
+            key.consecutive_failures = 0
+            if key.state != CLOSED:
+                print(f"INFO: Key {key.index + 1} recovered. Circuit closed.")
+            key.state = CLOSED
+            key.trial_in_flight = False
+            key.reset_timeout = self.base_reset_timeout
+
+    def _record_failure(self, key: KeyState, error: Exception) -> None:
+        code = getattr(error, 'code', None)
+        retry_after = parse_retry_after(error)
+        if code in RATE_LIMITED_STATUS_CODES:
+            key.limiter.penalize(retry_after)
+        with self.lock:
+            key.outcomes.append(False)
+            key.consecutive_failures += 1
+            tripped = (
+                key.state == HALF_OPEN
+                or code in KEY_REJECTED_STATUS_CODES
+                or key.consecutive_failures >= self.failure_threshold
+                or (len(key.outcomes) >= self.failure_threshold
+                    and key.error_rate() >= self.error_rate_threshold)
+            )
+            if not tripped:
+                return
+            if key.state == HALF_OPEN:
+                key.reset_timeout = min(self.max_reset_timeout, key.reset_timeout * 2)
+            if code in KEY_REJECTED_STATUS_CODES:
+                key.reset_timeout = self.max_reset_timeout
+            cooldown = max(key.reset_timeout, retry_after or 0.0)
+            key.state = OPEN
+            key.trial_in_flight = False
+            key.open_until = time.monotonic() + cooldown
+        print(f"WARNING: Circuit opened for Key {key.index + 1} for {cooldown:.0f}s after: {error}")
+
+    @staticmethod
+    def _should_fail_over(error: Exception) -> bool:
+        """Bad requests (400/404) would fail on every key, so only key/server/network errors fail over."""
+        from google.genai import errors
+        if isinstance(error, errors.ClientError):
+            return error.code in RATE_LIMITED_STATUS_CODES or error.code in KEY_REJECTED_STATUS_CODES
+        return True
+
+    # --- Request Execution ---
+
+    def _begin_attempt(self, key: KeyState, waited: float, stats: Optional[dict]) -> dict:
+        print(f"INFO: Rate limiter applied {waited:.2f}s wait for Key {key.index + 1}.")
+        attempt = {'key': key.index, 'waited_ms': round(waited * 1000, 2), 'ok': False}
+        if stats is not None:
+            stats['attempts'].append(attempt)
+        return attempt
+
+    def _attempt_failed(self, key: KeyState, attempt: dict, start: float, error: BaseException) -> None:
+        attempt['ms'] = round((time.monotonic() - start) * 1000, 2)
+        attempt['error'] = type(error).__name__
+        if isinstance(error, Exception) and self._should_fail_over(error):
+            self._record_failure(key, error)
+        else:
+            # A bad request or a cancelled call says nothing about the key's health
+            with self.lock:
+                key.trial_in_flight = False
+
+    def _attempt_succeeded(self, key: KeyState, attempt: dict, start: float) -> None:
+        elapsed = time.monotonic() - start
+        attempt.update(ms=round(elapsed * 1000, 2), ok=True)
+        self._record_success(key, elapsed)
+
+    def _attempt(self, key: KeyState, request_fn: Callable, stats: Optional[dict] = None):
+        attempt = self._begin_attempt(key, key.limiter.acquire(), stats)
+        start = time.monotonic()
+        try:
+            result = request_fn(self._client_for(key), key.index)
+        except Exception as e:
+            self._attempt_failed(key, attempt, start, e)
+            raise
+        self._attempt_succeeded(key, attempt, start)
+        return result
+
+    async def _attempt_async(self, key: KeyState, request_fn: Callable, stats: Optional[dict] = None):
+        attempt = self._begin_attempt(key, await key.limiter.acquire_async(), stats)
+        start = time.monotonic()
+        try:
+            result = await request_fn(self._client_for(key), key.index)
+        except BaseException as e:  # Includes CancelledError, so a cancelled trial frees its key
+            self._attempt_failed(key, attempt, start, e)
+            raise
+        self._attempt_succeeded(key, attempt, start)
+        return result
+
+    def _hedge_delay(self, key: KeyState) -> Optional[float]:
+        if not self.hedge_percentile or len(self.keys) < 2:
+            return None
+        with self.lock:
+            if len(key.latencies) < self.min_hedge_samples:
+                return None
+            threshold = key.latency_percentile(self.hedge_percentile)
+        return max(self.min_hedge_delay, threshold)
+
+    def _run_hedged(self, primary: KeyState, request_fn: Callable, stats: Optional[dict] = None):
+        first = self.executor.submit(self._attempt, primary, request_fn, stats)
+        hedge_delay = self._hedge_delay(primary)
+        if hedge_delay is None:
+            return first.result()
+        done, _ = wait([first], timeout=hedge_delay)
+        if done:
+            return first.result()
+        secondary = self._acquire_key(exclude={primary.index})
+        if secondary is None:
+            return first.result()
+        print(f"INFO: Key {primary.index + 1} slower than p{int(self.hedge_percentile * 100)} "
+              f"({hedge_delay:.2f}s). Hedging on Key {secondary.index + 1}.")
+        pending = {first, self.executor.submit(self._attempt, secondary, request_fn, stats)}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+        raise last_error
+
+    async def _run_hedged_async(self, primary: KeyState, request_fn: Callable, stats: Optional[dict] = None):
+        """_run_hedged on the event loop; here the losing request is cancelled instead of left to finish."""
+        first = asyncio.ensure_future(self._attempt_async(primary, request_fn, stats))
+        pending = {first}
+        try:
+            hedge_delay = self._hedge_delay(primary)
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                secondary = None if done else self._acquire_key(exclude={primary.index})
+                if secondary is not None:
+                    print(f"INFO: Key {primary.index + 1} slower than p{int(self.hedge_percentile * 100)} "
+                          f"({hedge_delay:.2f}s). Hedging on Key {secondary.index + 1}.")
+                    pending.add(asyncio.ensure_future(self._attempt_async(secondary, request_fn, stats)))
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def execute_async(self, request_fn: Callable, stats: Optional[dict] = None):
+        """
+        execute() for the asyncio core: request_fn(client, key_index) is a coroutine function
+        (use client.aio). Cancelling the awaiting task cancels the in-flight request(s) too.
+        """
+        if stats is not None:
+            stats.setdefault('attempts', [])
+            stats.setdefault('outage_wait', 0.0)
+        deadline = time.monotonic() + self.max_outage_wait
+        last_error = None
+        while True:
+            key = self._acquire_key()
+            if key is None:
+                delay = self._seconds_until_half_open()
+                if time.monotonic() + delay > deadline:
+                    raise AllKeysUnavailableError(f"All API keys are unavailable. Last error: {last_error}")
+                print(f"INFO: All key circuits are open. Retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
+                if stats is not None:
+                    stats['outage_wait'] += delay
+                continue
+            try:
+                return await self._run_hedged_async(key, request_fn, stats)
+            except Exception as e:
+                if not self._should_fail_over(e):
+                    raise
+                last_error = e
+                print(f"WARNING: Request on Key {key.index + 1} failed ({e}). Failing over.")
+
+    def execute(self, request_fn: Callable, stats: Optional[dict] = None):
+        """
+        Runs request_fn(client, key_index) on the healthiest key, failing over between keys
+        and waiting out short outages (up to max_outage_wait) before giving up. If a stats dict
+        is given, every attempt (key, rate-limit wait, latency, outcome) and the outage wait are
+        recorded in it.
+        """
+        if stats is not None:
+            stats.setdefault('attempts', [])
+            stats.setdefault('outage_wait', 0.0)
+        deadline = time.monotonic() + self.max_outage_wait
+        last_error = None
+        while True:
+            key = self._acquire_key()
+            if key is None:
+                delay = self._seconds_until_half_open()
+                if time.monotonic() + delay > deadline:
+                    raise AllKeysUnavailableError(f"All API keys are unavailable. Last error: {last_error}")
+                print(f"INFO: All key circuits are open. Retrying in {delay:.1f}s.")
+                time.sleep(delay)
+                if stats is not None:
+                    stats['outage_wait'] += delay
+                continue
+            try:
+                return self._run_hedged(key, request_fn, stats)
+            except Exception as e:
+                if not self._should_fail_over(e):
+                    raise
+                last_error = e
+                print(f"WARNING: Request on Key {key.index + 1} failed ({e}). Failing over.")
+
+    def status_report(self) -> str:
+        """One line per key: circuit state, error rate and p50/p90 latency."""
+        lines = []
+        with self.lock:
+            for key in self.keys:
+                p50, p90 = key.latency_percentile(0.5), key.latency_percentile(0.9)
+                lines.append(
+                    f"Key {key.index + 1}: {key.state}, errors {key.error_rate():.0%}, "
+                    f"p50 {p50 or 0:.2f}s, p90 {p90 or 0:.2f}s"
+                )
+        return "\n".join(lines)
+
+
+class PooledChat:
+    """
+    A chat session whose history lives in a ConversationStore instead of any single client, so
+    every send can use any key and a failover loses no context.
+    """
+
+    def __init__(self, pool: ApiKeyPool, model: str, config, store: Optional[ConversationStore] = None):
+        self.pool = pool
+        self.model = model
+        self.config = config
+        self.store = store if store is not None else ConversationStore()
+        self.last_key_index = None
+        # Attempts of the latest send (keys tried, rate-limit waits, latencies), for telemetry
+        self.last_call = {}
+
+    def set_tools(self, tools: list) -> None:
+        """Sends only these tool declarations from the next request on (e.g. the subset for one turn)."""
+        if tools is not self.config.tools:
+            self.config = self.config.model_copy(update={'tools': tools})
+
+    def send_message(self, message):
+        history = self.store.history()
+
+        def request(client, key_index):
+            chat = client.chats.create(model=self.model, config=self.config, history=history)
+            return chat.send_message(message), chat, key_index
+
+        self.last_call = {}
+        response, chat, self.last_key_index = self.pool.execute(request, self.last_call)
+        self._extend(chat.get_history()[len(history):])
+        return response
+
+    def send_message_stream(self, message):
+        """
+        Yields response chunks as they arrive. Failover and hedging cover the request up to the
+        first chunk; once text starts flowing the stream stays on that key.
+        """
+        history = self.store.history()
+
+        def request(client, key_index):
+            chat = client.chats.create(model=self.model, config=self.config, history=history)
+            stream = iter(chat.send_message_stream(message))
+            return next(stream, None), stream, chat, key_index
+
+        self.last_call = {}
+        first_chunk, stream, chat, self.last_key_index = self.pool.execute(request, self.last_call)
+        if first_chunk is not None:
+            yield first_chunk
+        yield from stream
+        # The SDK records the streamed turn in the chat history once the stream is exhausted
+        self._extend(chat.get_history()[len(history):])
+
+    async def send_message_async(self, message):
+        """send_message on the SDK's async client (client.aio)."""
+        history = self.store.history()
+
+        async def request(client, key_index):
+            chat = client.aio.chats.create(model=self.model, config=self.config, history=history)
+            return await chat.send_message(message), chat, key_index
+
+        self.last_call = {}
+        response, chat, self.last_key_index = await self.pool.execute_async(request, self.last_call)
+        await self._extend_async(chat.get_history()[len(history):])
+        return response
+
+    async def send_message_stream_async(self, message):
+        """
+        send_message_stream on the async client. If the consumer stops early (e.g. the turn was
+        cancelled), the HTTP stream is closed right away and nothing is added to the history.
+        """
+        history = self.store.history()
+
+        async def request(client, key_index):
+            chat = client.aio.chats.create(model=self.model, config=self.config, history=history)
+            stream = await chat.send_message_stream(message)
+            return await anext(stream, None), stream, chat, key_index
+
+        self.last_call = {}
+        first_chunk, stream, chat, self.last_key_index = await self.pool.execute_async(request, self.last_call)
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+        await self._extend_async(chat.get_history()[len(history):])
+
+    def _extend(self, new_contents: list) -> None:
+        """Records the new turn entries; compactions they trigger are reported with the call's stats."""
+        compactions = self.store.compactions
+        self.store.extend(new_contents)
+        self.last_call['compactions'] = self.store.compactions - compactions
+
+    async def _extend_async(self, new_contents: list) -> None:
+        """
+        store.extend off the event loop: it may compact the history with a blocking model summary.
+        A cancel waits for the update to finish, so the caller's rollback never races it.
+        """
+        update = asyncio.ensure_future(asyncio.to_thread(self._extend, new_contents))
+        try:
+            await asyncio.shield(update)
+        except asyncio.CancelledError:
+            await update
+            raise
+
+    def record_local_turn(self, user_text: str, reply_text: str) -> None:
+        """Adds a turn that was handled without the model, so later requests still see it as context."""
+        from google.genai import types
+        self.store.extend([
+            types.Content(role='user', parts=[types.Part.from_text(text=user_text)]),
+            types.Content(role='model', parts=[types.Part.from_text(text=reply_text)]),
+        ])
+
+    def checkpoint(self) -> int:
+        return self.store.checkpoint()
+
+    def rollback(self, checkpoint: int) -> None:
+        """Drops turns recorded after checkpoint, e.g. a function call whose response never got sent."""
+        self.store.rollback(checkpoint)
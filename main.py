@@ -1,35 +1,60 @@
+import asyncio
 import os
-import json
+import sys
 import re 
+import threading
 import time
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-from google.genai import errors 
-import pyttsx3 
-import speech_recognition as sr 
+from concurrent.futures import ThreadPoolExecutor
+from startup_profile import StartupProfiler
+
+# Started first, so the profile covers every import below
+startup_profiler = StartupProfiler()
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+
+with startup_profiler.stage("import dotenv + speech modules"):
+    from dotenv import load_dotenv
+    import speech_recognition as sr 
+    from speech_output import SpeechWorker
+    from speech_input import AudioCapture, create_recognizer
 
 # --- Import ALL System Tools ---
-from tools import (
-    create_file, 
-    create_directory, 
-    execute_command, 
-    list_current_directory_contents, 
-    open_application_or_url,
-    lookup_phone_number_info,             
-    scan_system_for_executables,
-    assign_keyboard_shortcut,
-    send_web_message # NEW: Web messaging tool added and imported
-)
+# Selenium, phonenumbers and google-genai are not imported here; each loads on first use
+# (Gemini during the startup warm-up, while the greeting plays)
+with startup_profiler.stage("import tools + local modules"):
+    from tool_registry import create_default_registry
+    from app_index import AppIndex, APP_INDEX_FILE
+    from key_pool import ApiKeyPool, PooledChat, AllKeysUnavailableError
+    from conversation_store import ConversationStore
+    from tool_executor import ToolExecutor
+    from intent_router import IntentRouter
+    from telemetry import Telemetry
+    from command_runner import stop_foreground_runs
 
 # --- Configuration & Setup ---
 
-DISCOVERED_APPS_FILE = "discovered_apps.json"
-API_DELAY_SECONDS = 3
 MODEL_NAME = 'gemini-2.5-flash'
 
 load_dotenv()
 
+API_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM_LIMIT", "10"))
+# Only this many app names go into the system prompt; the rest are resolved locally by name
+APP_HINT_LIMIT = 20
+# Speech recognition engine: 'google' (web API) or 'vosk' (offline, CPU-only, needs VOSK_MODEL_PATH)
+STT_ENGINE = os.getenv("ASSISTANT_STT_ENGINE", "google")
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH")
+# Stream replies and speak them sentence by sentence (set to 0 to wait for the full reply)
+STREAMING_ENABLED = os.getenv("ASSISTANT_STREAMING", "1") == "1"
+# Send a hedged duplicate to a second key once a call runs past this latency percentile (0 disables)
+HEDGE_LATENCY_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.9"))
+# Approximate token budget for the conversation history; older turns are summarized beyond it
+HISTORY_TOKEN_BUDGET = int(os.getenv("ASSISTANT_HISTORY_TOKENS", "6000"))
+# Per-turn traces go to telemetry/turns.jsonl and metrics to telemetry/metrics.prom (set to 0 to disable)
+TELEMETRY_ENABLED = os.getenv("ASSISTANT_TELEMETRY", "1") == "1"
+# Optional port for a local Prometheus /metrics endpoint (0 = file only)
+METRICS_PORT = int(os.getenv("ASSISTANT_METRICS_PORT", "0"))
+# --async only: talking over the assistant interrupts it when louder than the speech threshold times this (0 disables)
+BARGE_IN_RATIO = float(os.getenv("ASSISTANT_BARGE_IN", "0"))
+
 # API Key Loading and Management
 API_KEYS = [
     os.getenv("GEMINI_API_KEY_0"),
@@ -44,109 +69,458 @@ if not VALID_API_KEYS:
     exit()
 
 # Global state for API management
-current_api_key_index = 0
-client = None 
+key_pool = ApiKeyPool(
+    VALID_API_KEYS,
+    requests_per_minute=API_REQUESTS_PER_MINUTE,
+    hedge_percentile=HEDGE_LATENCY_PERCENTILE,
+)
 chat = None
 
-# --- GLOBAL AVAILABLE TOOLS LIST ---
-# This variable was previously defined inside run_assistant, causing issues.
-# It is now defined globally and includes the new web messaging tool.
-AVAILABLE_TOOLS = [
-    create_file, 
-    create_directory, 
-    execute_command, 
-    list_current_directory_contents,
-    open_application_or_url,
-    lookup_phone_number_info,
-    scan_system_for_executables,
-    assign_keyboard_shortcut,
-    send_web_message # <-- NEW TOOL IS NOW REGISTERED HERE
-]
-# --- END GLOBAL AVAILABLE TOOLS LIST ---
 
+def summarize_turns(previous_summary: str, transcript: str) -> str:
+    """Asks the model to fold old turns into the rolling summary kept by the conversation store."""
+    prompt = (
+        "Update this running summary of a desktop assistant conversation with the turns below. "
+        "Keep names, file paths, contacts, app names, decisions and open tasks; drop small talk and raw tool output. "
+        "Reply with short bullet points only.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\nTurns:\n{transcript}"
+    )
 
-# --- API Client Initialization Function ---
-def initialize_client_and_chat(system_instruction, tools=AVAILABLE_TOOLS): # tools=AVAILABLE_TOOLS default argument added
-    global current_api_key_index, client, chat
-    
-    if current_api_key_index >= len(VALID_API_KEYS):
-        print("FATAL: All available API keys have failed.")
-        return False
-    
-    key = VALID_API_KEYS[current_api_key_index]
-    
-    try:
-        client = genai.Client(api_key=key)
-        
-        # Chat session is initialized with the global AVAILABLE_TOOLS
-        chat = client.chats.create(
-            model=MODEL_NAME,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=tools
-            )
-        )
-        print(f"INFO: Successfully initialized with API Key Index {current_api_key_index + 1}.")
-        return True
-        
-    except Exception as e:
-        print(f"ERROR: API Key Index {current_api_key_index + 1} failed during initialization: {e}")
-        current_api_key_index += 1
-        # Try initializing with the next key recursively
-        return initialize_client_and_chat(system_instruction, tools)
+    def request(client, key_index):
+        return client.models.generate_content(model=MODEL_NAME, contents=prompt).text
+
+    return key_pool.execute(request)
+
+
+# Owns the conversation history, so a chat can be rebuilt on any key without losing context
+conversation_store = ConversationStore(token_budget=HISTORY_TOKEN_BUDGET, summarizer=summarize_turns)
+
+# --- GLOBAL TOOL REGISTRY ---
+# Every tool with its lane, timeout and selection keywords. Declarations are built once and
+# each request only carries the tool groups that match what the user asked for.
+tool_registry = create_default_registry()
+# --- END GLOBAL TOOL REGISTRY ---
+
+# Dispatches function calls by name through the registry; shared by every turn of the conversation
+tool_executor = ToolExecutor(tool_registry)
+# Handles unambiguous commands locally and learns from successful model turns
+intent_router = IntentRouter()
+# Stage timings, keys and token usage of every turn
+telemetry = Telemetry(enabled=TELEMETRY_ENABLED)
+
+
+# --- API Chat Initialization Function ---
+def create_chat(system_instruction, store, tools=None):
+    """A pooled chat with all tools over the shared key pool; its history lives in store."""
+    from google.genai import types
+    return PooledChat(
+        key_pool,
+        model=MODEL_NAME,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            tools=tools or tool_registry.tools()
+        ),
+        store=store
+    )
+
+def initialize_chat(system_instruction, tools=None):
+    """Creates the pooled chat session with all tools. Keys are picked per request by the key pool."""
+    global chat
+    chat = create_chat(system_instruction, conversation_store, tools)
+    print(f"INFO: Chat initialized with a pool of {len(VALID_API_KEYS)} API key(s).")
+    return chat
+
+# --- Fixed Spoken Phrases (synthesized once and played from the TTS disk cache) ---
+GREETING_PHRASE = "Hello Eisa, your assistant is starting up."
+GOODBYE_PHRASE = "Assistant shutting down. Goodbye!"
+VOICE_ENABLED_PHRASE = "Voice assistant enabled. I am now listening for your commands."
+VOICE_DISABLED_PHRASE = "Voice assistant deactivated. Switching back to keyboard input."
+UNKNOWN_AUDIO_PHRASE = "Sorry, I could not understand the audio. Please try again."
+SPEECH_SERVICE_DOWN_PHRASE = "Speech service is currently unavailable. Please check your internet connection."
+ALL_KEYS_DOWN_PHRASE = "ERROR: All API keys are unavailable right now. Please try again in a moment."
+UNKNOWN_ERROR_PHRASE = "An unknown error occurred after processing the request."
+FIXED_PHRASES = [
+    GOODBYE_PHRASE, VOICE_ENABLED_PHRASE, VOICE_DISABLED_PHRASE, UNKNOWN_AUDIO_PHRASE,
+    SPEECH_SERVICE_DOWN_PHRASE, ALL_KEYS_DOWN_PHRASE, UNKNOWN_ERROR_PHRASE,
+] + [f"Assistant action calling tool {name}." for name in tool_registry.names()]
+
+# --- Model Turn (Blocking or Streaming) ---
+SENTENCE_END_PATTERN = re.compile(r'([^\n]+?[.!?\u0964]+)(?:\s+|$)|([^\n]*)\n+')
+
+def split_complete_sentences(buffer: str):
+    """Splits off every complete sentence in buffer. Returns (sentences, unfinished_remainder)."""
+    sentences = []
+    position = 0
+    for match in SENTENCE_END_PATTERN.finditer(buffer):
+        # A terminator at the very end may still be followed by more text (e.g. '3.' of '3.5')
+        if match.end() == len(buffer) and not buffer[-1].isspace():
+            break
+        sentence = (match.group(1) or match.group(2)).strip()
+        if sentence:
+            sentences.append(sentence)
+        position = match.end()
+    return sentences, buffer[position:]
+
+class StreamedReply:
+    """Collects function calls and reply text from streamed chunks, speaking each sentence once it is complete."""
+
+    def __init__(self, speak):
+        self.speak = speak
+        self.start = time.perf_counter()
+        self.function_calls = []
+        self.reply_parts = []
+        self.buffer = ""
+        self.first_chunk_seconds = None
+        self.usage = None
+
+    def add(self, chunk) -> None:
+        if self.first_chunk_seconds is None:
+            self.first_chunk_seconds = time.perf_counter() - self.start
+        # Usage metadata arrives with the last chunk(s)
+        self.usage = chunk.usage_metadata or self.usage
+        if not chunk.candidates or not chunk.candidates[0].content:
+            return
+        for part in chunk.candidates[0].content.parts or []:
+            if part.function_call:
+                print(f"INFO: Function call '{part.function_call.name}' detected mid-stream.")
+                self.function_calls.append(part.function_call)
+            elif part.text and not part.thought:
+                self.reply_parts.append(part.text)
+                sentences, self.buffer = split_complete_sentences(self.buffer + part.text)
+                for sentence in sentences:
+                    self.speak(sentence)
+
+    def finish(self, trace, session_chat):
+        if self.buffer.strip():
+            self.speak(self.buffer.strip())
+        trace.model_call(time.perf_counter() - self.start, self.first_chunk_seconds, session_chat.last_call, self.usage)
+        return self.function_calls, "".join(self.reply_parts)
+
+def blocking_reply(response, speak):
+    if response.function_calls:
+        return list(response.function_calls), ""
+    if response.text:
+        speak(response.text)
+    return [], response.text or ""
+
+def model_turn(message, speak, trace, session_chat):
+    """
+    Sends one message and returns (function_calls, reply_text). Any reply text is spoken here:
+    in streaming mode each sentence is spoken as soon as it is complete.
+    """
+    if not STREAMING_ENABLED:
+        start = time.perf_counter()
+        response = session_chat.send_message(message)
+        trace.model_call(time.perf_counter() - start, None, session_chat.last_call, response.usage_metadata)
+        return blocking_reply(response, speak)
+
+    reply = StreamedReply(speak)
+    for chunk in session_chat.send_message_stream(message):
+        reply.add(chunk)
+    return reply.finish(trace, session_chat)
+
+async def model_turn_async(message, speak, trace, session_chat):
+    """model_turn on the SDK's async client; the event loop stays free while the model streams."""
+    if not STREAMING_ENABLED:
+        start = time.perf_counter()
+        response = await session_chat.send_message_async(message)
+        trace.model_call(time.perf_counter() - start, None, session_chat.last_call, response.usage_metadata)
+        return blocking_reply(response, speak)
+
+    reply = StreamedReply(speak)
+    async for chunk in session_chat.send_message_stream_async(message):
+        reply.add(chunk)
+    return reply.finish(trace, session_chat)
 
 # --- Helper Functions ---
 def load_dynamic_app_tools() -> list:
-    """Load discovered app names from JSON file for System Instruction."""
-    if not os.path.exists(DISCOVERED_APPS_FILE):
-        return []
+    """Load a short list of frequently used app names from the app index for System Instruction."""
     try:
-        with open(DISCOVERED_APPS_FILE, 'r') as f:
-            discovered_apps = json.load(f)
-        return list(discovered_apps.keys())
+        return AppIndex(APP_INDEX_FILE).top_names(APP_HINT_LIMIT)
     except Exception as e:
         return []
 
+def build_system_instruction(discovered_app_names: list) -> str:
+    return (
+        "You are an expert system automation assistant. Your goal is to help the user control "
+        "their local system (file creation, running commands, opening apps/sites, etc.) by using the provided tools. "
+        "The user speaks Hindi but types in English. You must also reply in Hindi, typed in English. "
+        "ALWAYS use the tools when the user asks for a system action. "
+        "If multiple tools need to be called, prioritize the most relevant one first. "
+        "Do not perform the action yourself; always respond with the function call."
+        f"\n[HINT: Frequently used apps include: {', '.join(discovered_app_names)}. "
+        "open_application_or_url resolves any installed app name locally (aliases are fine; for an unclear name it returns candidates to ask about), "
+        "so pass the app name the user said. "
+        "To create several files or folders, call apply_file_batch once with all of them instead of one call per path.]"
+        # HINT: send_web_message tool is available for whatsapp and telegram web automation.
+    )
+
+def load_recognizer():
+    """Loaded once at startup and kept warm; a local engine also decodes while the user speaks."""
+    try:
+        return create_recognizer(STT_ENGINE, language='en-IN', model_path=VOSK_MODEL_PATH)
+    except Exception as e:
+        print(f"ERROR: Could not load '{STT_ENGINE}' speech engine ({e}). Falling back to Google web speech.")
+        return create_recognizer('google', language='en-IN')
+
+def profiled(name, function, *args):
+    with startup_profiler.stage(name):
+        return function(*args)
+
+# --- Turn Steps (shared by the blocking and the asyncio turn) ---
+def route_locally(user_input: str, speak, trace, session_chat, turn_start: float, cancel_event=None):
+    """Runs an unambiguous command on the local tools. Returns the reply, or None to ask the model."""
+    with trace.span("intent_route"):
+        intent = intent_router.route(user_input)
+    if not intent:
+        return None
+    print(f"\n**LOCAL ACTION ({intent.source}, {intent.confidence:.2f}): {intent.tool_name}({intent.args})**")
+    result = tool_executor.run_calls([(intent.tool_name, intent.args)], cancel_event)[0]
+    if cancel_event is not None and cancel_event.is_set():
+        return None  # The turn was cancelled meanwhile; the caller has already finished it
+    trace.tool_results([result])
+    print(f"**TOOL RESULT ({result.name}, {result.elapsed:.2f}s): {result.output}**")
+    if not result.output.startswith("ERROR"):
+        reply_text = result.output.replace("SUCCESS: ", "", 1)
+        speak(reply_text)
+        session_chat.record_local_turn(user_input, f"[Handled locally with {intent.tool_name}] {result.output}")
+        intent_router.record(True, time.perf_counter() - turn_start, intent.source)
+        trace.route = "local"
+        trace.finish("ok")
+        return reply_text
+    # The local guess did not work out; let the model handle the request instead
+    if intent.source == 'learned':
+        intent_router.forget(user_input)
+    intent_router.record_fallback()
+    return None
+
+def last_reply_asked(session_chat) -> bool:
+    """True if the assistant's last reply was a question; the next utterance is then an answer to it."""
+    for content in reversed(session_chat.store.contents):
+        if content.role == 'model':
+            text = "".join(part.text or "" for part in content.parts or []).strip()
+            if text:
+                return text.endswith("?")
+    return False
+
+def prepare_model_turn(user_input: str, trace, session_chat) -> int:
+    """Picks the tools for this request and returns the history checkpoint to roll back to on failure."""
+    history_checkpoint = session_chat.checkpoint()
+    # Only the tool groups this request is about; the same set stays for the whole tool-calling loop
+    with trace.span("tool_select") as span:
+        tool_names = tool_registry.select(user_input)
+        session_chat.set_tools(tool_registry.tools(tool_names))
+        span['tools'] = len(tool_names)
+    return history_checkpoint
+
+def announce_calls(function_calls, speak) -> list:
+    calls = [(fc.name, dict(fc.args or {})) for fc in function_calls]
+    if len(calls) == 1:
+        speak(f"Assistant action calling tool {calls[0][0]}.", cache=True)
+    else:
+        speak(f"Assistant action calling {len(calls)} tools.", cache=True)
+    for function_name, function_args in calls:
+        print(f"\n**ASSISTANT ACTION: Calling tool: {function_name}({function_args})**")
+    return calls
+
+def function_response_parts(results) -> list:
+    from google.genai import types
+    parts = []
+    for result in results:
+        print(f"**TOOL RESULT ({result.name}, {result.elapsed:.2f}s): {result.output}**")
+        parts.append(types.Part.from_function_response(name=result.name, response={"result": result.output}))
+    return parts
+
+def finish_model_turn(user_input: str, reply_text: str, turn_results: list, speak, trace, turn_start: float,
+                      answers_question: bool) -> str:
+    # The reply has already been spoken by model_turn; only report an empty one
+    if not reply_text:
+        speak(UNKNOWN_ERROR_PHRASE, cache=True)
+
+    intent_router.record(False, time.perf_counter() - turn_start)
+    trace.finish("ok" if reply_text else "empty_reply")
+    # A turn the model solved with exactly one successful tool call can be replayed locally next time
+    if len(turn_results) == 1 and turn_results[0].output.startswith("SUCCESS"):
+        intent_router.learn(user_input, turn_results[0].name, turn_results[0].args, answers_question)
+    return reply_text
+
+# --- One Conversation Turn ---
+def handle_turn(user_input: str, speak, trace=None, session_chat=None) -> str:
+    """
+    Runs one user request end to end: local intent routing, then the model and its tool-calling
+    loop. Speaks as it goes and returns the final reply text ("" if the turn failed).
+    The turn is traced into trace (a new text-input trace if none is given) and recorded in
+    session_chat (the assistant's own chat if none is given).
+    """
+    trace = trace or telemetry.start_turn("text")
+    session_chat = session_chat or chat
+
+    # --- Local Intent Routing (unambiguous commands skip the model round trip) ---
+    turn_start = time.perf_counter()
+    reply_text = route_locally(user_input, speak, trace, session_chat, turn_start)
+    if reply_text is not None:
+        return reply_text
+
+    # --- Gemini Interaction (failover, circuit breaking and hedging live in the key pool) ---
+
+    reply_text = ""
+    turn_results = []
+    answers_question = last_reply_asked(session_chat)
+    history_checkpoint = prepare_model_turn(user_input, trace, session_chat)
+
+    try:
+        # 1. Send user message to the model
+        function_calls, reply_text = model_turn(user_input, speak, trace, session_chat)
+
+        # 2. Tool Calling Loop (Inner loop)
+        while function_calls:
+            calls = announce_calls(function_calls, speak)
+
+            # Independent tools run in parallel; side-effecting tools stay serial in their lane
+            results = tool_executor.run_calls(calls)
+            turn_results.extend(results)
+            trace.tool_results(results)
+
+            # Send all tool outputs back to the model in a single message
+            function_calls, reply_text = model_turn(function_response_parts(results), speak, trace, session_chat)
+
+    except AllKeysUnavailableError:
+        # Keys stay in the pool; their circuits reset on their own after a cooldown
+        session_chat.rollback(history_checkpoint)
+        speak(ALL_KEYS_DOWN_PHRASE, cache=True)
+        trace.finish("keys_unavailable")
+        return ""
+
+    except Exception as e:
+        session_chat.rollback(history_checkpoint)
+        speak(f"An unexpected API error occurred: {e}.")
+        trace.finish("error")
+        return ""
+
+    return finish_model_turn(user_input, reply_text, turn_results, speak, trace, turn_start, answers_question)
+
+async def handle_turn_async(user_input: str, speak, trace=None, session_chat=None) -> str:
+    """
+    handle_turn for the asyncio core: the model runs on the SDK's async client and tools on worker
+    threads. Cancelling the task stops the model request, kills running commands, tells running
+    tools to stop and leaves the conversation history as it was before the turn.
+    """
+    trace = trace or telemetry.start_turn("text")
+    session_chat = session_chat or chat
+    # Tool threads cannot be killed; tools still running see this through cancel_requested()
+    cancel_event = threading.Event()
+
+    turn_start = time.perf_counter()
+    reply_text = ""
+    turn_results = []
+    history_checkpoint = None
+
+    try:
+        local_reply = await asyncio.to_thread(route_locally, user_input, speak, trace, session_chat, turn_start, cancel_event)
+        if local_reply is not None:
+            return local_reply
+
+        answers_question = last_reply_asked(session_chat)
+        history_checkpoint = prepare_model_turn(user_input, trace, session_chat)
+        function_calls, reply_text = await model_turn_async(user_input, speak, trace, session_chat)
+        while function_calls:
+            calls = announce_calls(function_calls, speak)
+            results = await asyncio.to_thread(tool_executor.run_calls, calls, cancel_event)
+            turn_results.extend(results)
+            trace.tool_results(results)
+            function_calls, reply_text = await model_turn_async(function_response_parts(results), speak, trace, session_chat)
+
+    except asyncio.CancelledError:
+        cancel_event.set()
+        if history_checkpoint is not None:
+            session_chat.rollback(history_checkpoint)
+        stopped = stop_foreground_runs("cancelled by the user")
+        if stopped:
+            print(f"INFO: Stopped {stopped} running command(s).")
+        trace.finish("cancelled")
+        raise
+
+    except AllKeysUnavailableError:
+        session_chat.rollback(history_checkpoint)
+        speak(ALL_KEYS_DOWN_PHRASE, cache=True)
+        trace.finish("keys_unavailable")
+        return ""
+
+    except Exception as e:
+        if history_checkpoint is not None:
+            session_chat.rollback(history_checkpoint)
+        speak(f"An unexpected API error occurred: {e}.")
+        trace.finish("error")
+        return ""
+
+    return finish_model_turn(user_input, reply_text, turn_results, speak, trace, turn_start, answers_question)
+
+
 # --- Main Conversational Loop ---
+def start_up(speech):
+    """
+    Queues the greeting, then warms up Gemini, the speech recognizer and the app hints in parallel
+    while it plays, and creates the chat. Returns the loaded speech recognizer.
+    """
+    speech.say(GREETING_PHRASE, cache=True)
+    startup_profiler.mark("greeting queued")
+
+    # --- Parallel Warm-Up (runs while the TTS engine starts and the greeting plays) ---
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix="warm-up") as warm_up:
+        gemini_ready = warm_up.submit(profiled, "import google-genai + create clients", key_pool.preconnect)
+        recognizer_ready = warm_up.submit(profiled, "load speech recognizer", load_recognizer)
+        app_names_ready = warm_up.submit(profiled, "load app hints", load_dynamic_app_tools)
+
+    try:
+        gemini_ready.result()
+    except Exception as e:
+        # Clients are created again on the first request; any real problem surfaces there
+        print(f"WARNING: Could not prepare Gemini clients during startup ({e}).")
+    recognizer = recognizer_ready.result()
+    discovered_app_names = app_names_ready.result()
+    speech.warm_cache(FIXED_PHRASES)
+    
+    # SYSTEM_INSTRUCTION_TEXT remains the same
+    SYSTEM_INSTRUCTION_TEXT = build_system_instruction(discovered_app_names)
+
+    # Initialize the pooled chat; the healthiest key is chosen on every request
+    with startup_profiler.stage("build chat config"):
+        initialize_chat(SYSTEM_INSTRUCTION_TEXT)
+    startup_profiler.mark("ready for input")
+    if METRICS_PORT and not PROFILE_STARTUP:
+        try:
+            telemetry.serve_metrics(METRICS_PORT)
+        except OSError as e:
+            print(f"WARNING: Could not start the metrics endpoint on port {METRICS_PORT} ({e}).")
+    return recognizer
+
 def run_assistant():
     """The main function to run the conversational AI assistant."""
-    global current_api_key_index, client, chat
+    global chat
     
     # ... (TTS/STT setup code) ...
-    tts_engine = pyttsx3.init()
-    tts_engine.setProperty('rate', 150)  
+    # Speech runs on its own worker thread; speak() only queues and returns immediately.
+    # The pyttsx3 engine initializes on that thread and the greeting plays as soon as it is ready.
+    speech = SpeechWorker(on_spoken=telemetry.record_speech)
     voice_mode_enabled = False 
-    r = sr.Recognizer()
+    # Persistent microphone pipeline, started the first time voice mode is enabled
+    audio_capture = None
 
-    def speak(text):
-        filtered_text = re.sub(r'[^\w\s,\.\?\!]', '', text).replace('*', '') 
-        print(f"Assistant: {text}") 
-        tts_engine.say(filtered_text)
-        tts_engine.runAndWait()
+    def speak(text, cache=False):
+        speech.say(text, cache=cache)
     # ... (End TTS/STT setup) ...
 
-    speak("Hello Eisa, your assistant is starting up.")
-    
-    discovered_app_names = load_dynamic_app_tools()
-    
-    # SYSTEM_INSTRUCTION_TEXT remains the same
-    SYSTEM_INSTRUCTION_TEXT = (
-        "You are an expert system automation assistant. Your goal is to help the user control "
-        "their local system (file creation, running commands, opening apps/sites, etc.) by using the provided tools. "
-        "The user speaks Hindi but types in English. You must also reply in Hindi, typed in English. "
-        "ALWAYS use the tools when the user asks for a system action. "
-        "If multiple tools need to be called, prioritize the most relevant one first. "
-        "Do not perform the action yourself; always respond with the function call."
-        f"\n[HINT: The following common apps were previously discovered: {', '.join(discovered_app_names)}. Use open_application_or_url for these.]"
-        # HINT: send_web_message tool is available for whatsapp and telegram web automation.
-    )
+    recognizer = start_up(speech)
 
-    # Initialize client and chat with the first working key
-    if not initialize_client_and_chat(SYSTEM_INSTRUCTION_TEXT): # tools argument is no longer needed here
-        speak("Fatal error: Could not initialize the assistant with any provided API key. Shutting down.")
-        return 
+    if PROFILE_STARTUP:
+        if speech.ready.wait(timeout=10) and speech.init_timing:
+            started_at, seconds = speech.init_timing
+            startup_profiler.add("init TTS engine (pyttsx3)", started_at - startup_profiler.origin, seconds, "speech-worker")
+        print(startup_profiler.report())
+        speech.shutdown(wait=False)
+        return
     
-    speak(f"Assistant is running in keyboard mode using Key {current_api_key_index + 1}. Type 'enable voice assistant' to start listening.")
+    speak(f"Assistant is running in keyboard mode with {len(VALID_API_KEYS)} API keys. Type 'enable voice assistant' to start listening.")
 
     while True:
         user_input = ""
@@ -154,127 +528,90 @@ def run_assistant():
         # ... (Input Handling: Voice/Keyboard logic remains the same) ...
         if voice_mode_enabled:
             # VOICE INPUT MODE
-            with sr.Microphone() as source:
-                print("\nListening... (Say 'deactivate' or 'exit')")
-                r.pause_threshold = 0.8
-                try:
-                    r.adjust_for_ambient_noise(source)
-                    audio = r.listen(source, timeout=5, phrase_time_limit=10)
-                    user_input = r.recognize_google(audio, language='en-IN') 
-                    print(f"You said: {user_input}")
-                except sr.WaitTimeoutError:
-                    continue 
-                except sr.UnknownValueError:
-                    speak("Sorry, I could not understand the audio. Please try again.")
-                    continue
-                except sr.RequestError:
-                    speak("Speech service is currently unavailable. Please check your internet connection.")
-                    continue
+            # The background listener keeps capturing while the model and tools work on the last command
+            audio = audio_capture.get_utterance(timeout=5)
+            if audio is None:
+                continue
+            trace = telemetry.start_turn("voice")
+            frame_bytes = audio.sample_rate * audio.sample_width
+            trace.add_span("stt_capture", len(audio.frame_data) / frame_bytes if frame_bytes else 0.0)
+            try:
+                user_input = getattr(audio, 'transcript', None)
+                if user_input is None:
+                    with trace.span("stt_transcribe", engine=recognizer.name):
+                        user_input = recognizer.transcribe(audio)
+                elif not user_input:
+                    raise sr.UnknownValueError()
+                print(f"\nYou said: {user_input}")
+            except sr.UnknownValueError:
+                trace.finish("unrecognized")
+                speak(UNKNOWN_AUDIO_PHRASE, cache=True)
+                continue
+            except sr.RequestError:
+                trace.finish("stt_error")
+                speak(SPEECH_SERVICE_DOWN_PHRASE, cache=True)
+                continue
         else:
             # KEYBOARD INPUT MODE
             user_input = input("You: ")
+            trace = telemetry.start_turn("keyboard")
+            # Barge-in: a new command cuts off whatever is still being spoken from the last turn
+            speech.cancel()
             
         # ... (Mode Control and Exit logic remains the same) ...
         if user_input.lower().strip() == 'enable voice assistant':
             if not voice_mode_enabled:
+                try:
+                    # Calibrates once, then listens continuously; audio is dropped while the assistant speaks
+                    audio_capture = AudioCapture.from_microphone(
+                        suppress=speech.is_speaking,
+                        stream_recognizer=recognizer,
+                        on_partial=lambda partial: print(f"\r... {partial}", end="", flush=True),
+                    ).start()
+                except Exception as e:
+                    speak(f"Could not open the microphone: {e}")
+                    continue
                 voice_mode_enabled = True
-                speak("Voice assistant enabled. I am now listening for your commands.")
+                speak(VOICE_ENABLED_PHRASE, cache=True)
+                print("\nListening... (Say 'deactivate' or 'exit')")
             continue
             
         if user_input.lower().strip() == 'deactivate voice':
             if voice_mode_enabled:
                 voice_mode_enabled = False
-                speak("Voice assistant deactivated. Switching back to keyboard input.")
+                audio_capture.stop()
+                audio_capture = None
+                speak(VOICE_DISABLED_PHRASE, cache=True)
             continue
 
         if user_input.lower().strip() == 'exit':
-            speak("Assistant shutting down. Goodbye!")
+            if audio_capture:
+                audio_capture.stop()
+            print(intent_router.report())
+            speech.cancel()
+            speak(GOODBYE_PHRASE, cache=True)
+            speech.shutdown(wait=True)
             break
             
+        if user_input.lower().strip() == 'intent report':
+            print(intent_router.report())
+            continue
+            
         if not user_input.strip():
             continue
 
-        # --- Gemini Interaction with Failover Logic ---
-        
-        MAX_RETRIES = len(VALID_API_KEYS) - current_api_key_index
-        retries = 0
-        response = None
-        
-        while retries < MAX_RETRIES:
-            try:
-                # 1. Send user message to the model
-                response = chat.send_message(user_input)
-                time.sleep(API_DELAY_SECONDS) 
-                
-                # 2. Tool Calling Loop (Inner loop)
-                while response.function_calls:
-                    function_responses = []
-                    
-                    for function_call in response.function_calls:
-                        function_name = function_call.name
-                        function_to_call = globals().get(function_name) 
-                        
-                        function_args = dict(function_call.args)
-                        speak(f"Assistant action calling tool {function_name} with arguments.")
-                        print(f"\n**ASSISTANT ACTION: Calling tool: {function_name}({function_args})**")
-
-                        tool_output = function_to_call(**function_args)
-                        print(f"**TOOL RESULT: {tool_output}**")
-
-                        function_responses.append(
-                            types.Content(
-                                parts=[
-                                    types.Part.from_function_response(
-                                        name=function_name,
-                                        response={"result": tool_output}
-                                    )
-                                ]
-                            )
-                        )
-
-                    # Send the tool outputs back to the model 
-                    response = chat.send_message(contents=function_responses)
-                    time.sleep(API_DELAY_SECONDS) 
-                
-                # If everything succeeded, break the retry loop
-                break 
-
-            except errors.ServerError as e:
-                # 503 UNAVAILABLE or other server issues
-                retries += 1
-                if retries < MAX_RETRIES:
-                    speak(f"API Error: Server overloaded with current key (Key {current_api_key_index + 1}). Switching to next key.")
-                    current_api_key_index += 1
-                    # Re-initialize client/chat with the next key
-                    if not initialize_client_and_chat(SYSTEM_INSTRUCTION_TEXT): # tools argument removed
-                         speak("ERROR: Backup key failed during switch. Stopping attempts.")
-                         return 
-                    
-                else:
-                    speak("ERROR: All API keys have failed due to server overload. Please try again later.")
-                    return 
-            
-            except Exception as e:
-                # Catch all other API errors (e.g., 400 Invalid key, etc.)
-                speak(f"An unexpected API error occurred: {e}. Switching to next key.")
-                retries += 1
-                if retries < MAX_RETRIES:
-                    current_api_key_index += 1
-                    if not initialize_client_and_chat(SYSTEM_INSTRUCTION_TEXT): # tools argument removed
-                         speak("ERROR: Backup key failed during switch. Stopping attempts.")
-                         return
-                else:
-                    speak("ERROR: All API keys have failed. Please check your keys and try again.")
-                    return
-        
-        # Check if response was successfully populated
-        if response and response.text:
-            speak(response.text)
-        elif response is None and retries >= MAX_RETRIES:
-            pass
-        else:
-            speak("An unknown error occurred after processing the request.")
+        # --- Local routing, Gemini interaction and tool calls for this request ---
+        handle_turn(user_input, speak, trace)
 
 
 if __name__ == "__main__":
-    run_assistant()
\ No newline at end of file
+    if "--daemon" in sys.argv:
+        # Headless: serves turns from scripts, hotkeys and front ends over a local socket
+        from assistant_daemon import run_daemon
+        run_daemon(sys.modules[__name__], sys.argv[1:])
+    elif "--async" in sys.argv:
+        # Listens while it works, streams over the async client and can be interrupted with "stop"
+        from async_core import run_async_assistant
+        run_async_assistant(sys.modules[__name__], BARGE_IN_RATIO)
+    else:
+        run_assistant()
\ No newline at end of file
@@ -0,0 +1,241 @@
+import csv
+import os
+import time
+from collections import Counter, OrderedDict, deque
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from tool_executor import cancel_requested
+
+# --- Bulk Phone Number Lookup ---
+# Contact list ki CSV ya text file se numbers stream karke padhe jaate hain, chunks mein
+# phonenumbers se parse aur enrich hote hain (country, carrier, timezone), aur badi files par
+# kaam kai threads mein batt jaata hai. Geocoding/carrier/timezone data sirf number ke shuru ke
+# kuch digits par depend karta hai, isliye us prefix ka result ek LRU cache mein rakha jaata hai.
+# Badi files ke chunks ek thread pool par chalte hain; process pool nahi, kyunki tool main.py ke
+# andar chalta hai aur spawn par har worker main.py ko dobara import karta (keys, registry, exit()).
+# Har number ka result ek CSV file mein jaata hai; model ko sirf ek chhota summary milta hai.
+
+CHUNK_SIZE = 500
+MAX_WORKERS = 4
+PREFIX_CACHE_SIZE = 4096
+# Longest prefix (country code + national digits) any of libphonenumber's geocoding, carrier or
+# timezone tables key on; two numbers that agree on these digits get the same metadata
+METADATA_PREFIX_DIGITS = 9
+MIN_DIGITS = 5
+PHONE_HEADER_WORDS = ("phone", "mobile", "number", "tel", "whatsapp", "contact")
+RESULT_COLUMNS = ["input", "e164", "valid", "type", "region", "location", "carrier", "timezones", "error"]
+
+
+class PrefixMetadataCache:
+    """LRU cache of (location, carrier, timezones) per number prefix, type and region."""
+
+    def __init__(self, max_size: int = PREFIX_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def metadata(self, number, number_type: int, region: Optional[str]) -> tuple:
+        import phonenumbers  # type: ignore
+        from phonenumbers import carrier, geocoder, timezone  # type: ignore
+        digits = f"{number.country_code}{phonenumbers.national_significant_number(number)}"
+        key = (digits[:METADATA_PREFIX_DIGITS], number_type, region)
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        value = (
+            geocoder.description_for_number(number, "en"),
+            carrier.name_for_number(number, "en"),
+            "|".join(timezone.time_zones_for_number(number)),
+        )
+        with self.lock:
+            self.entries[key] = value
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return value
+
+
+# Shared by every chunk and worker thread
+PREFIX_CACHE = PrefixMetadataCache()
+_TYPE_NAMES = {}
+
+
+def _type_name(number_type: int) -> str:
+    if not _TYPE_NAMES:
+        from phonenumbers import PhoneNumberType  # type: ignore
+        _TYPE_NAMES.update({value: name.lower() for name, value in vars(PhoneNumberType).items() if name.isupper()})
+    return _TYPE_NAMES.get(number_type, "unknown")
+
+
+def lookup_number(raw: str, default_region: Optional[str] = None, cache: PrefixMetadataCache = PREFIX_CACHE) -> dict:
+    """One result row for raw. Numbers without a leading + need default_region (e.g. 'IN')."""
+    import phonenumbers  # type: ignore
+    row = dict.fromkeys(RESULT_COLUMNS, "")
+    row["input"] = raw
+    try:
+        number = phonenumbers.parse(raw, default_region)
+    except phonenumbers.NumberParseException as e:
+        row["valid"] = "no"
+        row["error"] = str(e)
+        return row
+
+    number_type = phonenumbers.number_type(number)
+    region = phonenumbers.region_code_for_number(number)
+    row["e164"] = phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+    row["valid"] = "yes" if phonenumbers.is_valid_number(number) else "no"
+    row["type"] = _type_name(number_type)
+    row["region"] = region or ""
+    row["location"], row["carrier"], row["timezones"] = cache.metadata(number, number_type, region)
+    return row
+
+
+def lookup_chunk(numbers: List[str], default_region: Optional[str]) -> List[dict]:
+    """Worker entry point: the result rows for one chunk."""
+    return [lookup_number(raw, default_region) for raw in numbers]
+
+
+# --- Reading Numbers ---
+
+def _looks_like_number(cell: str) -> bool:
+    return sum(ch.isdigit() for ch in cell) >= MIN_DIGITS
+
+
+def read_numbers(file_path: str) -> Iterator[str]:
+    """
+    Streams phone numbers from a CSV (the column with a phone-like header, else the first cell
+    that looks like a number in each row) or from a text file with one number per line.
+    """
+    with open(file_path, 'r', encoding='utf-8-sig', errors='replace', newline='') as f:
+        if not file_path.lower().endswith('.csv'):
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+            return
+
+        column = None
+        for index, row in enumerate(csv.reader(f)):
+            cells = [cell.strip() for cell in row]
+            if index == 0 and not any(_looks_like_number(cell) for cell in cells):
+                column = next((i for i, cell in enumerate(cells)
+                               if any(word in cell.lower() for word in PHONE_HEADER_WORDS)), None)
+                continue
+            if column is not None and column < len(cells):
+                if cells[column]:
+                    yield cells[column]
+                continue
+            cell = next((cell for cell in cells if _looks_like_number(cell)), None)
+            if cell:
+                yield cell
+
+
+def _chunks(numbers: Iterator[str], size: int) -> Iterator[List[str]]:
+    while True:
+        chunk = list(islice(numbers, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _result_chunks(numbers: Iterator[str], default_region: Optional[str], workers: int, chunk_size: int):
+    """Yields the rows of each chunk, in input order. Small files never start a thread pool."""
+    chunks = _chunks(numbers, chunk_size)
+    first = next(chunks, None)
+    second = next(chunks, None)
+    if first is None:
+        return
+    if second is None or workers <= 1:
+        yield lookup_chunk(first, default_region)
+        if second is not None:
+            yield lookup_chunk(second, default_region)
+            for chunk in chunks:
+                yield lookup_chunk(chunk, default_region)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="phone-lookup") as pool:
+        # A bounded window of chunks in flight keeps memory flat for any file size
+        pending = deque(pool.submit(lookup_chunk, chunk, default_region) for chunk in (first, second))
+        for chunk in chunks:
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+            pending.append(pool.submit(lookup_chunk, chunk, default_region))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _top(counter: Counter, limit: int = 5) -> str:
+    return ", ".join(f"{name} ({count})" for name, count in counter.most_common(limit)) or "none"
+
+
+def lookup_numbers_from_file(file_path: str, default_region: Optional[str] = None, output_path: Optional[str] = None,
+                             workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> str:
+    """Looks up every number in file_path, writes one CSV row per number and returns a short summary."""
+    if not os.path.isfile(file_path):
+        return f"ERROR: File '{file_path}' not found."
+    if default_region:
+        default_region = default_region.upper()
+    output_path = output_path or os.path.splitext(file_path)[0] + "_lookup.csv"
+    workers = workers or min(MAX_WORKERS, os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    hits_before, misses_before = PREFIX_CACHE.hits, PREFIX_CACHE.misses
+    totals = Counter()
+    countries, carriers, types = Counter(), Counter(), Counter()
+    seen = set()
+    temp_path = output_path + ".tmp"
+    results = _result_chunks(read_numbers(file_path), default_region, workers, chunk_size)
+    try:
+        with open(temp_path, 'w', encoding='utf-8', newline='') as out:
+            writer = csv.DictWriter(out, fieldnames=RESULT_COLUMNS)
+            writer.writeheader()
+            for rows in results:
+                if cancel_requested():
+                    break
+                writer.writerows(rows)
+                for row in rows:
+                    totals['numbers'] += 1
+                    if row['error']:
+                        totals['unparseable'] += 1
+                        continue
+                    if row['e164'] in seen:
+                        totals['duplicates'] += 1
+                    seen.add(row['e164'])
+                    if row['valid'] != "yes":
+                        totals['invalid'] += 1
+                        continue
+                    totals['valid'] += 1
+                    countries[row['region'] or "unknown"] += 1
+                    types[row['type']] += 1
+                    if row['carrier']:
+                        carriers[row['carrier']] += 1
+        if cancel_requested():
+            results.close()  # Waits only for the chunks already in flight
+            os.remove(temp_path)
+            return f"INFO: Lookup cancelled after {totals['numbers']} numbers; '{output_path}' was not written."
+        os.replace(temp_path, output_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    elapsed = time.perf_counter() - start
+    if not totals['numbers']:
+        os.remove(output_path)
+        return f"INFO: No phone numbers found in '{file_path}'."
+    hits, misses = PREFIX_CACHE.hits - hits_before, PREFIX_CACHE.misses - misses_before
+    return (
+        f"SUCCESS: Looked up {totals['numbers']} numbers from '{file_path}' in {elapsed:.1f}s "
+        f"({totals['numbers'] / max(elapsed, 1e-6):.0f}/s). "
+        f"Valid: {totals['valid']}, invalid: {totals['invalid']}, unparseable: {totals['unparseable']}, "
+        f"duplicates: {totals['duplicates']}. "
+        f"Regions: {_top(countries)}. Carriers: {_top(carriers)}. Types: {_top(types)}. "
+        f"Prefix cache hit rate: {hits / max(hits + misses, 1):.0%}. "
+        f"Per-number results saved to '{output_path}'."
+    )
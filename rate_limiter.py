@@ -0,0 +1,94 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Optional
+
+# --- Adaptive Per-Key Rate Limiting ---
+# Har API key ka apna token bucket hota hai. Bucket mein token ho to request turant jaati hai,
+# sirf quota khatam hone par hi wait kiya jaata hai. 429/503 aane par rate kam hota hai
+# aur successful calls ke saath dheere-dheere wapas configured rate tak badhta hai.
+
+RETRY_DELAY_PATTERN = re.compile(r"retry(?:_d|D)elay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+
+class TokenBucketRateLimiter:
+    """A thread-safe token bucket that learns from rate-limit and overload responses."""
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None,
+                 min_rate_fraction: float = 0.25, recovery_step: float = 0.1):
+        self.max_rate = requests_per_minute / 60.0
+        self.rate = self.max_rate
+        self.min_rate = self.max_rate * min_rate_fraction
+        self.recovery_step = recovery_step
+        # A fresh key may spend its whole minute's quota at once; real 429s lower the rate via penalize()
+        self.capacity = float(burst if burst else max(1, int(requests_per_minute)))
+        self.tokens = self.capacity
+        self.blocked_until = 0.0
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available (returns 0.0), otherwise returns how long to wait first."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now >= self.blocked_until and self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return max(self.blocked_until - now, (1.0 - self.tokens) / self.rate)
+
+    def acquire(self) -> float:
+        """Blocks only as long as the key's quota requires. Returns the seconds actually waited."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self) -> float:
+        """acquire() for the asyncio core: waits without blocking the event loop."""
+        waited = 0.0
+        while True:
+            delay = self.try_acquire()
+            if not delay:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def expected_wait(self) -> float:
+        """Seconds acquire() would block right now, without consuming a token."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def penalize(self, retry_after: Optional[float] = None) -> None:
+        """Called on 429/503: halves the rate and blocks the key until the server's retry delay passes."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            cooldown = retry_after if retry_after is not None else 1.0 / self.rate
+            self.blocked_until = max(self.blocked_until, now + cooldown)
+
+    def reward(self) -> None:
+        """Called on success: recovers the rate additively towards the configured maximum."""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery_step)
+
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """Extracts the server-suggested retry delay (e.g. retryDelay: '23s') from an API error, if any."""
+    match = RETRY_DELAY_PATTERN.search(str(getattr(error, 'details', '')) + str(error))
+    return float(match.group(1)) if match else None
@@ -0,0 +1,317 @@
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Callable, List, Optional
+
+import speech_recognition as sr
+
+# --- Optional Offline Engine ---
+try:
+    import vosk #type: ignore
+    VOSK_AVAILABLE = True
+except ImportError:
+    VOSK_AVAILABLE = False
+
+# --- Continuous Background Audio Capture ---
+# Microphone ek hi baar khulta hai aur ek hi baar calibrate hota hai. Background thread
+# lagataar frames padhta hai, energy-based voice activity detection se utterance ki shuruaat
+# aur ant pehchanta hai (ring buffer se thoda pre-roll bhi rakhta hai) aur poori utterance
+# queue mein daal deta hai. Silence ke dauran noise floor update hota rehta hai, isliye
+# periodic recalibration bina "dead listening" ke hota hai. Testing ke liye mic ki jagah
+# WAV files di ja sakti hain.
+
+MIN_ENERGY_THRESHOLD = 100.0
+ENERGY_RATIO = 1.5
+NOISE_FLOOR_SMOOTHING = 0.05
+
+_SAMPLE_TYPECODES = {1: 'b', 2: 'h', 4: 'i'}
+
+
+def frame_rms(frame: bytes, sample_width: int) -> float:
+    """Root-mean-square energy of a raw little-endian PCM frame."""
+    typecode = _SAMPLE_TYPECODES.get(sample_width)
+    if not typecode or not frame:
+        return 0.0
+    samples = array(typecode)
+    samples.frombytes(frame[:len(frame) - len(frame) % sample_width])
+    if not samples:
+        return 0.0
+    offset = 128 if sample_width == 1 else 0  # 8-bit WAV is unsigned
+    return math.sqrt(sum((s + offset) ** 2 for s in samples) / len(samples))
+
+
+# --- Pluggable Speech Recognizer Backends ---
+# Har backend transcribe(audio) deta hai aur kuch na samajh aane par sr.UnknownValueError
+# raise karta hai, taaki main loop ka error handling har engine ke liye same rahe.
+
+class GoogleWebRecognizer:
+    """The original path: one network round trip to Google's web speech API per utterance."""
+
+    name = "google"
+    supports_streaming = False
+
+    def __init__(self, language: str = 'en-IN'):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class VoskStream:
+    """Incremental decoding session: feed raw 16-bit frames, read partial text as it changes."""
+
+    def __init__(self, kaldi_recognizer):
+        self.kaldi = kaldi_recognizer
+        self.segments = []
+        self.partial = ""
+
+    def feed(self, frame: bytes) -> Optional[str]:
+        """Returns the new partial transcript when it changed, otherwise None."""
+        if self.kaldi.AcceptWaveform(frame):
+            self.segments.append(json.loads(self.kaldi.Result()).get('text', ''))
+            self.partial = ""
+        else:
+            partial = json.loads(self.kaldi.PartialResult()).get('partial', '')
+            if partial == self.partial:
+                return None
+            self.partial = partial
+        return " ".join(segment for segment in self.segments + [self.partial] if segment)
+
+    def finish(self) -> str:
+        self.segments.append(json.loads(self.kaldi.FinalResult()).get('text', ''))
+        return " ".join(segment for segment in self.segments if segment).strip()
+
+
+class VoskRecognizer:
+    """CPU-only offline engine. The model is loaded once and kept warm for the whole session."""
+
+    name = "vosk"
+    supports_streaming = True
+
+    def __init__(self, model_path: str):
+        if not VOSK_AVAILABLE:
+            raise RuntimeError("The 'vosk' library is not installed. Please install it using 'pip install vosk'.")
+        vosk.SetLogLevel(-1)
+        self.model = vosk.Model(model_path)
+        # A throwaway decode pays the graph's first-use cost now instead of on the first command
+        warm_up = self.open_stream(16000)
+        warm_up.feed(b"\x00\x00" * 8000)
+        warm_up.finish()
+
+    def open_stream(self, sample_rate: int) -> VoskStream:
+        return VoskStream(vosk.KaldiRecognizer(self.model, sample_rate))
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        stream = self.open_stream(audio.sample_rate)
+        stream.feed(audio.get_raw_data(convert_width=2))
+        text = stream.finish()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+def create_recognizer(engine: str, language: str = 'en-IN', model_path: Optional[str] = None):
+    """Builds the configured speech recognizer backend ('google' or 'vosk')."""
+    engine = engine.lower()
+    if engine == 'google':
+        return GoogleWebRecognizer(language)
+    if engine == 'vosk':
+        if not model_path:
+            raise RuntimeError("VOSK_MODEL_PATH is not set. Download a model such as vosk-model-small-en-in-0.4.")
+        return VoskRecognizer(model_path)
+    raise RuntimeError(f"Unknown speech recognition engine '{engine}'. Use 'google' or 'vosk'.")
+
+
+class AudioCapture:
+    """Reads audio sources on a background thread and queues one AudioData per detected utterance."""
+
+    def __init__(self, sources: List[sr.AudioSource], pause_threshold: float = 0.8,
+                 phrase_time_limit: float = 10.0, min_phrase_seconds: float = 0.3,
+                 pre_roll_seconds: float = 0.3, calibration_seconds: float = 1.0,
+                 recalibrate_interval: float = 30.0, realtime: bool = True,
+                 suppress: Optional[Callable[[], bool]] = None, max_queued: int = 8,
+                 stream_recognizer=None, on_partial: Optional[Callable[[str], None]] = None,
+                 barge_in_ratio: float = 0.0, on_speech_start: Optional[Callable[[], None]] = None):
+        self.sources = sources
+        self.pause_threshold = pause_threshold
+        self.phrase_time_limit = phrase_time_limit
+        self.min_phrase_seconds = min_phrase_seconds
+        self.pre_roll_seconds = pre_roll_seconds
+        self.calibration_seconds = calibration_seconds
+        self.recalibrate_interval = recalibrate_interval
+        self.realtime = realtime
+        self.suppress = suppress
+        # With barge-in, audio is kept while the assistant talks, but only speech this many times
+        # louder than the normal threshold (the user, not the speaker echo) starts an utterance
+        self.barge_in_ratio = barge_in_ratio
+        self.on_speech_start = on_speech_start
+        # A streaming backend decodes frames while the user is still talking
+        self.stream_recognizer = stream_recognizer if getattr(stream_recognizer, 'supports_streaming', False) else None
+        self.on_partial = on_partial
+        self.utterances = queue.Queue(maxsize=max_queued)
+        self.energy_threshold = None
+        self.noise_floor = None
+        self.audio_clock = 0.0
+        self.last_calibration = 0.0
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+        self.thread = None
+        self._reset_utterance()
+
+    @classmethod
+    def from_microphone(cls, **kwargs) -> "AudioCapture":
+        # Constructed here (not on the worker thread) so a missing PyAudio fails loudly at start-up
+        return cls([sr.Microphone()], **kwargs)
+
+    @classmethod
+    def from_wav_files(cls, paths: List[str], **kwargs) -> "AudioCapture":
+        kwargs.setdefault('realtime', False)
+        return cls([sr.AudioFile(path) for path in paths], **kwargs)
+
+    # --- Public API ---
+
+    def start(self) -> "AudioCapture":
+        self.thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def get_utterance(self, timeout: Optional[float] = None) -> Optional[sr.AudioData]:
+        """Next captured utterance, or None if nothing was said within timeout."""
+        try:
+            return self.utterances.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    # --- Capture Thread ---
+
+    def _run(self) -> None:
+        try:
+            for source in self.sources:
+                if self.stop_event.is_set():
+                    break
+                with source:
+                    self._capture(source)
+        except Exception as e:
+            print(f"ERROR: Audio capture stopped: {e}")
+        finally:
+            self.finished.set()
+
+    def _capture(self, source: sr.AudioSource) -> None:
+        frame_seconds = source.CHUNK / float(source.SAMPLE_RATE)
+        self.ring = deque(maxlen=max(1, int(self.pre_roll_seconds / frame_seconds)))
+        if self.energy_threshold is None:
+            self._calibrate(source, frame_seconds)
+        while not self.stop_event.is_set():
+            frame = source.stream.read(source.CHUNK)
+            if not frame:
+                break
+            if self.realtime and isinstance(source, sr.AudioFile):
+                time.sleep(frame_seconds)  # pace file input like a live microphone
+            self._process_frame(frame, source, frame_seconds)
+        self._emit(source)
+
+    def _calibrate(self, source: sr.AudioSource, frame_seconds: float) -> None:
+        """One-time noise calibration; later adjustments happen during silence without blocking."""
+        energies = []
+        while len(energies) * frame_seconds < self.calibration_seconds:
+            frame = source.stream.read(source.CHUNK)
+            if not frame:
+                break
+            energies.append(frame_rms(frame, source.SAMPLE_WIDTH))
+            self.audio_clock += frame_seconds
+        self.noise_floor = sum(energies) / len(energies) if energies else MIN_ENERGY_THRESHOLD
+        self._recalibrate()
+        print(f"INFO: Microphone calibrated. Energy threshold {self.energy_threshold:.0f}.")
+
+    def _recalibrate(self) -> None:
+        self.energy_threshold = max(MIN_ENERGY_THRESHOLD, self.noise_floor * ENERGY_RATIO)
+        self.last_calibration = self.audio_clock
+
+    def _reset_utterance(self) -> None:
+        self.in_speech = False
+        self.stream = None
+        self.frames = []
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+
+    def _process_frame(self, frame: bytes, source: sr.AudioSource, frame_seconds: float) -> None:
+        self.audio_clock += frame_seconds
+        threshold = self.energy_threshold
+        if self.suppress and self.suppress() and not self.in_speech:
+            if not self.barge_in_ratio:
+                # Drop audio while the assistant itself is talking so it never transcribes its own voice
+                self._reset_utterance()
+                self.ring.clear()
+                return
+            threshold = self.energy_threshold * self.barge_in_ratio
+
+        energy = frame_rms(frame, source.SAMPLE_WIDTH)
+        if not self.in_speech:
+            self.ring.append(frame)
+            if energy > threshold:
+                self.in_speech = True
+                if self.on_speech_start:
+                    self.on_speech_start()
+                self.frames = list(self.ring)
+                self.ring.clear()
+                if self.stream_recognizer and source.SAMPLE_WIDTH == 2:
+                    self.stream = self.stream_recognizer.open_stream(source.SAMPLE_RATE)
+                    for buffered in self.frames:
+                        self._feed_stream(buffered)
+            elif threshold == self.energy_threshold:
+                self.noise_floor += NOISE_FLOOR_SMOOTHING * (energy - self.noise_floor)
+                if self.audio_clock - self.last_calibration >= self.recalibrate_interval:
+                    self._recalibrate()
+            return
+
+        self.frames.append(frame)
+        self._feed_stream(frame)
+        self.speech_seconds += frame_seconds
+        self.silence_seconds = 0.0 if energy > self.energy_threshold else self.silence_seconds + frame_seconds
+        if self.silence_seconds >= self.pause_threshold or self.speech_seconds >= self.phrase_time_limit:
+            self._emit(source)
+
+    def _feed_stream(self, frame: bytes) -> None:
+        if self.stream is None:
+            return
+        partial = self.stream.feed(frame)
+        if partial and self.on_partial:
+            self.on_partial(partial)
+
+    def _emit(self, source: sr.AudioSource) -> None:
+        if self.in_speech and self.speech_seconds - self.silence_seconds >= self.min_phrase_seconds:
+            audio = sr.AudioData(b"".join(self.frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            # Already decoded while streaming; the consumer can skip a second recognition pass
+            audio.transcript = self.stream.finish() if self.stream else None
+            if self.utterances.full():
+                # Keep the newest commands; an old utterance the user has moved past is less useful
+                try:
+                    self.utterances.get_nowait()
+                except queue.Empty:
+                    pass
+            self.utterances.put(audio)
+        self._reset_utterance()
+
+
+if __name__ == "__main__":
+    # Offline check: python speech_input.py command1.wav command2.wav
+    capture = AudioCapture.from_wav_files(sys.argv[1:]).start()
+    capture.finished.wait()
+    count = 0
+    while True:
+        audio = capture.get_utterance(timeout=0)
+        if audio is None:
+            break
+        count += 1
+        seconds = len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)
+        print(f"Utterance {count}: {seconds:.2f}s of audio")
+    print(f"Detected {count} utterance(s).")
@@ -0,0 +1,192 @@
+import hashlib
+import itertools
+import os
+import platform
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
+
+import pyttsx3
+
+# --- Non-Blocking Speech Output ---
+# TTS engine ek dedicated worker thread par chalta hai. say() sirf queue mein daalta hai,
+# isliye control loop kabhi speech ka wait nahi karta. cancel() current utterance rok kar
+# queue khaali kar deta hai (barge-in). Fixed phrases ek baar WAV mein synthesize hokar
+# disk cache mein rehte hain aur agli baar turant play hote hain. Cache warm-up sabse kam
+# priority par chalta hai, taaki greeting aur replies kabhi warm-up ke peeche na atkein.
+
+TTS_CACHE_DIR = "tts_cache"
+SPEECH_RATE = 150
+
+_SHUTDOWN = object()
+LIVE_PRIORITY = 0  # say() and shutdown
+WARM_UP_PRIORITY = 1  # Background synthesis; only runs when nothing is waiting to be spoken
+
+
+def clean_for_speech(text: str) -> str:
+    """Strips markdown and symbols that TTS engines read out literally."""
+    return re.sub(r'[^\w\s,\.\?\!]', '', text).replace('*', '')
+
+
+def wav_duration(path: str) -> float:
+    try:
+        with wave.open(path, 'rb') as f:
+            return f.getnframes() / float(f.getframerate())
+    except Exception:
+        return 0.0
+
+
+class SpeechWorker:
+    """Owns the pyttsx3 engine on its own thread and plays queued utterances in order."""
+
+    def __init__(self, rate: int = SPEECH_RATE, cache_dir: str = TTS_CACHE_DIR, on_spoken=None):
+        self.rate = rate
+        self.cache_dir = cache_dir
+        # Called as on_spoken(text, seconds, cached) after each utterance finishes playing
+        self.on_spoken = on_spoken
+        self.queue = queue.PriorityQueue()  # (priority, sequence, text, cache)
+        self.sequence = itertools.count()
+        self.interrupt = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.busy = False
+        self.engine = None
+        self.ready = threading.Event()
+        self.init_timing = None  # (perf_counter at start, seconds) of the engine start-up
+        self.thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+        self.thread.start()
+
+    # --- Public API (safe to call from any thread) ---
+
+    def say(self, text: str, cache: bool = False) -> None:
+        """Queues text for speech and returns immediately. cache=True keeps the audio for reuse."""
+        print(f"Assistant: {text}")
+        self.idle.clear()
+        self.queue.put((LIVE_PRIORITY, next(self.sequence), text, cache))
+
+    def warm_cache(self, phrases) -> None:
+        """Pre-synthesizes fixed phrases in the background so their first use is already instant."""
+        for phrase in phrases:
+            self.queue.put((WARM_UP_PRIORITY, next(self.sequence), phrase, None))
+
+    def cancel(self) -> None:
+        """Barge-in: stops the current utterance and drops everything still queued."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.interrupt.set()
+        if not self.busy:
+            self.idle.set()
+
+    def _live_pending(self) -> bool:
+        with self.queue.mutex:
+            return any(item[0] == LIVE_PRIORITY for item in self.queue.queue)
+
+    def is_speaking(self) -> bool:
+        return not self.idle.is_set()
+
+    def wait_until_idle(self, timeout: float = None) -> bool:
+        return self.idle.wait(timeout)
+
+    def shutdown(self, wait: bool = True, timeout: float = 30.0) -> None:
+        if wait:
+            self.wait_until_idle(timeout)
+        self.queue.put((LIVE_PRIORITY, next(self.sequence), _SHUTDOWN, False))
+        self.thread.join(timeout=5)
+
+    # --- Worker Thread ---
+
+    def _run(self) -> None:
+        init_start = time.perf_counter()
+        try:
+            self.engine = pyttsx3.init()
+            self.engine.setProperty('rate', self.rate)
+            # The engine may only be stopped from inside its own loop, so poll the interrupt flag per word
+            self.engine.connect('started-word', self._on_word)
+        except Exception as e:
+            self.engine = None
+            print(f"ERROR: Text-to-speech engine unavailable ({e}). Replies will only be printed.")
+        self.init_timing = (init_start, time.perf_counter() - init_start)
+        self.ready.set()
+        while True:
+            _, _, text, cache = self.queue.get()
+            if text is _SHUTDOWN:
+                break
+            if self.engine is None:
+                if not self._live_pending():
+                    self.idle.set()
+                continue
+            self.busy = True
+            self.interrupt.clear()
+            started = time.perf_counter()
+            try:
+                if cache is None:
+                    self._synthesize(text)
+                elif cache:
+                    self._speak_cached(text)
+                else:
+                    self._speak_live(text)
+                if cache is not None and self.on_spoken:
+                    self.on_spoken(text, time.perf_counter() - started, cache)
+            except Exception as e:
+                print(f"ERROR: Speech output failed: {e}")
+            self.busy = False
+            # Pending warm-up is not speech, so it neither mutes the microphone nor delays shutdown
+            if not self._live_pending():
+                self.idle.set()
+
+    def _on_word(self, name, location, length) -> None:
+        if self.interrupt.is_set():
+            self.engine.stop()
+
+    def _speak_live(self, text: str) -> None:
+        self.engine.say(clean_for_speech(text))
+        self.engine.runAndWait()
+
+    def _cache_path(self, text: str) -> str:
+        digest = hashlib.sha1(f"{self.rate}:{clean_for_speech(text)}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.wav")
+
+    def _synthesize(self, text: str) -> str:
+        path = self._cache_path(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = path + ".tmp.wav"
+            self.engine.save_to_file(clean_for_speech(text), temp_path)
+            self.engine.runAndWait()
+            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
+                os.replace(temp_path, path)
+        return path
+
+    def _speak_cached(self, text: str) -> None:
+        path = self._synthesize(text)
+        if self.interrupt.is_set():
+            return
+        if not os.path.exists(path) or not self._play_wav(path):
+            self._speak_live(text)
+
+    def _play_wav(self, path: str) -> bool:
+        """Plays a cached file, stopping early on interrupt. Returns False if no player is available."""
+        system = platform.system()
+        if system == "Windows":
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME | winsound.SND_ASYNC)
+            if self.interrupt.wait(wav_duration(path)):
+                winsound.PlaySound(None, winsound.SND_PURGE)
+            return True
+
+        player = 'afplay' if system == "Darwin" else (shutil.which('aplay') or shutil.which('paplay'))
+        if not player:
+            return False
+        process = subprocess.Popen([player, path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while process.poll() is None:
+            if self.interrupt.wait(0.05):
+                process.terminate()
+                break
+        return True
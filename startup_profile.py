@@ -0,0 +1,51 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Startup Profiler ---
+# `python main.py --profile-startup` har startup stage (imports, TTS engine, Gemini clients,
+# speech recognizer) ka start time, duration aur thread record karta hai. Parallel warm-up
+# stages alag threads par dikhte hain, isliye saaf pata chalta hai ki "ready" tak ka time
+# kis stage ki wajah se hai.
+
+
+class StartupProfiler:
+    """Records named startup stages from any thread, relative to the moment it was created."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = []
+        self.marks = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start - self.origin, time.perf_counter() - start)
+
+    def add(self, name: str, started_at: float, seconds: float, thread: str = None) -> None:
+        with self.lock:
+            self.stages.append((started_at, seconds, name, thread or threading.current_thread().name))
+
+    def mark(self, name: str) -> None:
+        """A point in time, e.g. 'greeting queued' or 'ready for input'."""
+        with self.lock:
+            self.marks.append((time.perf_counter() - self.origin, name))
+
+    def report(self) -> str:
+        with self.lock:
+            stages = sorted(self.stages)
+            marks = sorted(self.marks)
+        lines = [
+            "--- Startup Profile ---",
+            f"{'Stage':<40}{'Thread':<16}{'Start(ms)':>10}{'Took(ms)':>10}",
+        ]
+        for started_at, seconds, name, thread in stages:
+            lines.append(f"{name:<40}{thread[:15]:<16}{started_at * 1000:>10.0f}{seconds * 1000:>10.0f}")
+        for at, name in marks:
+            lines.append(f"{'* ' + name:<56}{at * 1000:>10.0f}")
+        lines.append("-----------------------")
+        return "\n".join(lines)
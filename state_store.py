@@ -0,0 +1,149 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Optional
+
+# --- Cached JSON State Store ---
+# whatsapp/telegram config, shortcuts.json aur intent cache jaisi chhoti JSON files ek hi store
+# se padhi aur likhi jaati hain. File ek baar parse hokar memory mein rehti hai; har read par sirf
+# os.stat se dekha jaata hai ki file badli to nahi (mtime/size), badli ho tabhi dobara parse hoti hai.
+# Changes memory mein turant lagte hain aur thodi der baad ek saath disk par jaate hain: pehle
+# temp file, phir rename, taaki koi bhi tool ya crash aadhi likhi file na chhode.
+
+FLUSH_DELAY_SECONDS = 0.5
+
+
+class _StateFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.data = None
+        self.signature = None
+        self.dirty = False
+        self.lock = threading.RLock()
+
+
+def _signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class StateStore:
+    """In-memory copies of JSON state files, reloaded when the file changes and written back atomically."""
+
+    def __init__(self, flush_delay: float = FLUSH_DELAY_SECONDS):
+        self.flush_delay = flush_delay
+        self.files = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def _file(self, path: str) -> _StateFile:
+        path = os.path.abspath(path)
+        with self.lock:
+            if path not in self.files:
+                self.files[path] = _StateFile(path)
+            return self.files[path]
+
+    def _refresh(self, state: _StateFile) -> None:
+        """Parses the file if it changed on disk since it was last read or written (caller holds state.lock)."""
+        signature = _signature(state.path)
+        if state.data is not None and (signature == state.signature or state.dirty):
+            # Unflushed changes win over an outside edit; they are written over it shortly
+            return
+        state.signature = signature
+        if signature is None:
+            state.data = {}
+            return
+        try:
+            with open(state.path, 'r', encoding='utf-8') as f:
+                state.data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not read {state.path} ({e}). Using {'the last good copy' if state.data is not None else 'an empty one'}.")
+            if state.data is None:
+                state.data = {}
+
+    # --- Reading ---
+
+    def get(self, path: str) -> Any:
+        """
+        The parsed contents of path ({} if it does not exist). Costs one os.stat when unchanged.
+        The returned object is shared: change it only through update().
+        """
+        state = self._file(path)
+        with state.lock:
+            self._refresh(state)
+            return state.data
+
+    # --- Writing ---
+
+    def update(self, path: str, mutate: Callable[[Any], Any]) -> Any:
+        """
+        Applies mutate to the current contents under the file's lock and schedules a write.
+        Returns whatever mutate returns. Writes of several updates are batched into one.
+        """
+        state = self._file(path)
+        with state.lock:
+            self._refresh(state)
+            result = mutate(state.data)
+            state.dirty = True
+        self._schedule_flush()
+        return result
+
+    def _schedule_flush(self) -> None:
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(self.flush_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self) -> None:
+        """Writes every file with pending changes now."""
+        with self.lock:
+            self.timer = None
+            states = [state for state in self.files.values() if state.dirty]
+        for state in states:
+            with state.lock:
+                if not state.dirty:
+                    continue
+                try:
+                    self._write(state)
+                    state.dirty = False
+                except OSError as e:
+                    print(f"ERROR: Could not save {state.path} ({e}).")
+
+    def save(self, path: str) -> None:
+        """
+        Writes path now instead of with the next batch, for saves the user is told about.
+        Raises OSError if the write fails; the change then stays pending.
+        """
+        state = self._file(path)
+        with state.lock:
+            if state.dirty:
+                self._write(state)
+                state.dirty = False
+
+    def _write(self, state: _StateFile) -> None:
+        directory = os.path.dirname(state.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(state.path) + ".", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state.data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, state.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        # Our own write must not count as an outside change
+        state.signature = _signature(state.path)
+
+
+# Shared by every tool; pending writes are flushed when the assistant exits
+STATE_STORE = StateStore()
+atexit.register(STATE_STORE.flush)
@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+# --- Per-Turn Tracing and Metrics ---
+# Har turn ke stages (STT capture, transcription, intent routing, model requests, tools) ke
+# spans banaye jaate hain. Har model request ke saath key, rate-limiter wait aur token usage bhi
+# record hota hai. Poora turn ek JSON line ban kar rotating JSONL file mein jaata hai, aur
+# aggregate metrics (p50/p99 latency, per-key requests aur tokens) Prometheus text format mein
+# file par likhe jaate hain; chahein to ek chhota HTTP /metrics endpoint bhi chal sakta hai.
+
+TELEMETRY_DIR = "telemetry"
+TRACE_FILE_NAME = "turns.jsonl"
+METRICS_FILE_NAME = "metrics.prom"
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUP_COUNT = 3
+QUANTILE_WINDOW = 1000
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def quantile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def usage_to_dict(usage) -> dict:
+    """Token counts from a response's usage_metadata (missing fields count as 0)."""
+    if usage is None:
+        return {}
+    return {
+        'prompt': usage.prompt_token_count or 0,
+        'output': usage.candidates_token_count or 0,
+        'thoughts': getattr(usage, 'thoughts_token_count', None) or 0,
+        'total': usage.total_token_count or 0,
+    }
+
+
+class TurnTrace:
+    """Spans, model calls and tool calls of one user turn."""
+
+    def __init__(self, telemetry: "Telemetry", source: str):
+        self.telemetry = telemetry
+        self.source = source
+        self.route = "model"
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.model_calls = []
+        self.tool_calls = []
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self.add_span(name, time.perf_counter() - start, start - self.start, **attributes)
+
+    def add_span(self, name: str, seconds: float, offset: Optional[float] = None, **attributes) -> None:
+        """Records a stage measured elsewhere, e.g. how long the user spoke before the turn started."""
+        span = {'name': name, 'ms': round(seconds * 1000, 2)}
+        if offset is not None:
+            span['offset_ms'] = round(offset * 1000, 2)
+        span.update(attributes)
+        self.spans.append(span)
+
+    def model_call(self, seconds: float, first_chunk_seconds: Optional[float], call_stats: dict, usage) -> None:
+        attempts = call_stats.get('attempts', [])
+        winner = next((a for a in reversed(attempts) if a['ok']), None)
+        self.model_calls.append({
+            'ms': round(seconds * 1000, 2),
+            'first_chunk_ms': round(first_chunk_seconds * 1000, 2) if first_chunk_seconds is not None else None,
+            'key': winner['key'] if winner else None,
+            'attempts': attempts,
+            'outage_wait_ms': round(call_stats.get('outage_wait', 0.0) * 1000, 2),
+            # Old turns folded into the history summary after this request (0 almost always)
+            'compactions': call_stats.get('compactions', 0),
+            'tokens': usage_to_dict(usage),
+        })
+
+    def tool_results(self, results) -> None:
+        for result in results:
+            self.tool_calls.append({
+                'tool': result.name,
+                'ms': round(result.elapsed * 1000, 2),
+                'ok': not str(result.output).startswith("ERROR"),
+            })
+
+    def finish(self, outcome: str = "ok") -> dict:
+        record = {
+            'ts': round(self.started_at, 3),
+            'source': self.source,
+            'route': self.route,
+            'outcome': outcome,
+            'ms': round((time.perf_counter() - self.start) * 1000, 2),
+            'spans': self.spans,
+            'model_calls': self.model_calls,
+            'tool_calls': self.tool_calls,
+        }
+        self.telemetry.record_turn(record)
+        return record
+
+
+class _NullTrace(TurnTrace):
+    """Used when telemetry is disabled; records nothing."""
+
+    def finish(self, outcome: str = "ok") -> dict:
+        return {}
+
+
+class Telemetry:
+    """Writes turn traces to a rotating JSONL file and keeps Prometheus-style aggregates."""
+
+    def __init__(self, directory: str = TELEMETRY_DIR, enabled: bool = True,
+                 max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+        self.directory = directory
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.metrics_path = os.path.join(directory, METRICS_FILE_NAME)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.logger = None
+        self.turn_seconds = deque(maxlen=QUANTILE_WINDOW)
+        self.stage_seconds = {}
+        self.speech_seconds = deque(maxlen=QUANTILE_WINDOW)
+        self.counters = {}
+        self.turn_seconds_sum = 0.0
+        self.turn_count = 0
+        self.server = None
+
+    def start_turn(self, source: str = "keyboard") -> TurnTrace:
+        if not self.enabled:
+            return _NullTrace(self, source)
+        return TurnTrace(self, source)
+
+    def _trace_logger(self) -> logging.Logger:
+        if self.logger is None:
+            os.makedirs(self.directory, exist_ok=True)
+            logger = logging.getLogger("assistant.telemetry")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(os.path.join(self.directory, TRACE_FILE_NAME),
+                                          maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                          encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            self.logger = logger
+        return self.logger
+
+    def _count(self, name: str, labels: tuple, amount: float = 1) -> None:
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    # --- Recording ---
+
+    def record_turn(self, record: dict) -> None:
+        with self.lock:
+            seconds = record['ms'] / 1000
+            self.turn_seconds.append(seconds)
+            self.turn_seconds_sum += seconds
+            self.turn_count += 1
+            self._count('assistant_turns_total', (('route', record['route']), ('outcome', record['outcome'])))
+            for span in record['spans']:
+                self.stage_seconds.setdefault(span['name'], deque(maxlen=QUANTILE_WINDOW)).append(span['ms'] / 1000)
+            for call in record['model_calls']:
+                self.stage_seconds.setdefault('model_request', deque(maxlen=QUANTILE_WINDOW)).append(call['ms'] / 1000)
+                for attempt in call['attempts']:
+                    key = (('key', str(attempt['key'] + 1)),)
+                    self._count('assistant_model_requests_total', key + (('outcome', 'ok' if attempt['ok'] else 'error'),))
+                    self._count('assistant_rate_limit_wait_seconds_total', key, attempt['waited_ms'] / 1000)
+                if call['compactions']:
+                    self._count('assistant_history_compactions_total', (), call['compactions'])
+                if call['key'] is not None:
+                    for kind, tokens in call['tokens'].items():
+                        self._count('assistant_tokens_total', (('key', str(call['key'] + 1)), ('kind', kind)), tokens)
+            for tool in record['tool_calls']:
+                self.stage_seconds.setdefault('tool:' + tool['tool'], deque(maxlen=QUANTILE_WINDOW)).append(tool['ms'] / 1000)
+                self._count('assistant_tool_calls_total', (('tool', tool['tool']), ('outcome', 'ok' if tool['ok'] else 'error')))
+        try:
+            self._trace_logger().info(json.dumps(record, ensure_ascii=False))
+            self.write_metrics()
+        except OSError as e:
+            print(f"WARNING: Could not write telemetry ({e}).")
+
+    def record_speech(self, text: str, seconds: float, cached: bool) -> None:
+        """TTS playback time per utterance; speech plays after its turn has finished, so it is tracked on its own."""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.speech_seconds.append(seconds)
+            self._count('assistant_speech_utterances_total', (('cached', 'true' if cached else 'false'),))
+
+    # --- Prometheus Text Format ---
+
+    def render_metrics(self) -> str:
+        with self.lock:
+            lines = [
+                "# HELP assistant_turn_seconds End-to-end turn latency (quantiles over the last turns).",
+                "# TYPE assistant_turn_seconds summary",
+            ]
+            for q in QUANTILES:
+                lines.append(f'assistant_turn_seconds{{quantile="{q}"}} {quantile(self.turn_seconds, q):.6f}')
+            lines.append(f"assistant_turn_seconds_sum {self.turn_seconds_sum:.6f}")
+            lines.append(f"assistant_turn_seconds_count {self.turn_count}")
+
+            lines += ["# HELP assistant_stage_seconds Latency per turn stage, model request and tool.",
+                      "# TYPE assistant_stage_seconds summary"]
+            for stage, values in sorted(self.stage_seconds.items()):
+                for q in QUANTILES:
+                    lines.append(f'assistant_stage_seconds{{stage="{stage}",quantile="{q}"}} {quantile(values, q):.6f}')
+
+            lines += ["# HELP assistant_speech_seconds TTS playback time per utterance.",
+                      "# TYPE assistant_speech_seconds summary"]
+            for q in QUANTILES:
+                lines.append(f'assistant_speech_seconds{{quantile="{q}"}} {quantile(self.speech_seconds, q):.6f}')
+
+            declared = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in declared:
+                    lines.append(f"# TYPE {name} counter")
+                    declared.add(name)
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {value:g}" if labels else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self) -> None:
+        """Atomic write, so a textfile collector never reads a half-written file."""
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.metrics_path + ".tmp"
+        # Turns of concurrent sessions finish at the same time and would share the temp file
+        with self.write_lock:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render_metrics())
+            os.replace(temp_path, self.metrics_path)
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1") -> None:
+        """Serves the metrics at http://host:port/metrics from a background thread."""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = telemetry.render_metrics().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"INFO: Metrics available at http://{host}:{port}/metrics")
@@ -0,0 +1,183 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional
+
+from tool_registry import DEFAULT_TOOL_TIMEOUT_SECONDS, ToolRegistry
+
+# --- Concurrent Tool Executor ---
+# Ek model response ke independent function calls thread pool par parallel chalte hain.
+# Side effects wale tools ek "lane" mein rehte hain: same lane ke calls hamesha original
+# order mein ek-ek karke chalte hain (e.g. create_directory ke baad hi create_file us folder mein).
+# Lane, timeout aur expected time tool registry se aate hain.
+# Turn cancel ho to batch turant laut aata hai: jo calls shuru nahi hui woh hat jaati hain, aur
+# lambe tools (bulk messages, phone lookup) cancel_requested() dekh kar agle kadam par ruk jaate hain.
+
+POLL_INTERVAL_SECONDS = 0.05
+CANCELLED_MESSAGE = "ERROR: Cancelled by the user."
+
+_current = threading.local()
+
+
+def cancel_requested() -> bool:
+    """True inside a tool whose batch was cancelled; long-running tools check this between steps."""
+    event = getattr(_current, 'cancel_event', None)
+    return bool(event and event.is_set())
+
+
+class ToolCallResult:
+    """Outcome of one function call, in the same position as the call in the model response."""
+
+    def __init__(self, name: str, args: dict, output: str, elapsed: float):
+        self.name = name
+        self.args = args
+        self.output = output
+        self.elapsed = elapsed
+
+
+class _Job:
+    def __init__(self, name: str, args: dict, lane: Optional[str], timeout: float,
+                 cancel_event: Optional[threading.Event] = None):
+        self.name = name
+        self.args = args
+        self.lane = lane
+        self.timeout = timeout
+        self.cancel_event = cancel_event
+        self.batch = None  # The run_calls job list this call belongs to
+        self.future = None
+        self.deadline = None  # Monotonic time, counted from submission so queueing time counts too
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+
+
+class ToolExecutor:
+    """Runs a batch of tool calls concurrently while keeping results in call order."""
+
+    def __init__(self, registry: ToolRegistry, max_workers: int = 8):
+        self.registry = registry
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.lane_executors = {}
+        self.lane_jobs = {}  # Lane -> calls submitted to its current worker, in order
+        self.lock = threading.RLock()
+
+    def _lane_executor(self, lane: str) -> ThreadPoolExecutor:
+        with self.lock:
+            if lane not in self.lane_executors:
+                self.lane_executors[lane] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"lane-{lane}")
+            return self.lane_executors[lane]
+
+    def _submit(self, job: _Job) -> None:
+        with self.lock:
+            if job.lane:
+                executor = self._lane_executor(job.lane)
+                queued = [other for other in self.lane_jobs.get(job.lane, []) if not other.future.done()]
+                self.lane_jobs[job.lane] = queued + [job]
+            else:
+                executor = self.pool
+            job.future = executor.submit(self._run, job)
+
+    def _cancel_queued(self, job: _Job) -> bool:
+        """Cancels a call that has not started yet; False if it is already running."""
+        with self.lock:
+            return job.started_at is None and job.future.cancel()
+
+    def _abandon_lane(self, lane: str, batch: list) -> None:
+        """
+        A hung call blocks its lane forever, so the lane gets a fresh worker. The rest of the hung
+        call's batch is dropped; calls other callers (e.g. daemon sessions) queued move over in order.
+        """
+        with self.lock:
+            stuck = self.lane_executors.pop(lane, None)
+            waiting = [job for job in self.lane_jobs.pop(lane, [])
+                       if job.batch is not batch and not job.future.cancelled() and job.future.cancel()]
+            for job in waiting:
+                self._submit(job)
+        if stuck:
+            stuck.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: _Job) -> str:
+        job.started_at = time.monotonic()
+        spec = self.registry.get(job.name)
+        _current.cancel_event = job.cancel_event
+        try:
+            if spec is None:
+                return f"ERROR: Unknown tool '{job.name}'."
+            if cancel_requested():
+                return CANCELLED_MESSAGE
+            return spec.function(**job.args)
+        except Exception as e:
+            return f"ERROR: Tool '{job.name}' raised an exception: {e}"
+        finally:
+            _current.cancel_event = None
+            job.finished_at = time.monotonic()
+
+    def run_calls(self, calls: List[tuple], cancel_event: Optional[threading.Event] = None) -> List[ToolCallResult]:
+        """
+        Executes (name, args) pairs and returns one ToolCallResult per call, in the original order.
+        Setting cancel_event returns at once: queued calls are dropped and running ones are told to stop.
+        """
+        jobs = []
+        for name, args in calls:
+            spec = self.registry.get(name)
+            jobs.append(_Job(name, args, spec.lane if spec else None,
+                             spec.timeout if spec else DEFAULT_TOOL_TIMEOUT_SECONDS, cancel_event))
+        for job in jobs:
+            job.batch = jobs
+
+        # Lane calls keep their order; free calls start slowest first so the batch finishes sooner
+        def expected_seconds(job):
+            spec = self.registry.get(job.name)
+            return spec.expected_seconds if spec else 0.0
+
+        submitted_at = time.monotonic()
+        lane_deadlines = {}
+        for job in [job for job in jobs if job.lane] + sorted((job for job in jobs if not job.lane),
+                                                               key=expected_seconds, reverse=True):
+            if job.lane:
+                # A lane call may wait for the calls ahead of it, so its budget adds to theirs
+                job.deadline = lane_deadlines.get(job.lane, submitted_at) + job.timeout
+                lane_deadlines[job.lane] = job.deadline
+            else:
+                job.deadline = submitted_at + job.timeout
+            self._submit(job)
+
+        pending = list(jobs)
+        while pending:
+            wait([job.future for job in pending], timeout=POLL_INTERVAL_SECONDS)
+            now = time.monotonic()
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            for job in list(pending):
+                with self.lock:
+                    # Another batch's timeout may move this call to a fresh lane worker meanwhile
+                    future = job.future
+                    finished, skipped = future.done() and not future.cancelled(), future.cancelled()
+                if finished:
+                    job.result = future.result()
+                elif cancelled:
+                    if not self._cancel_queued(job):
+                        # Python threads cannot be killed; the tool stops at its next cancel_requested() check
+                        job.finished_at = now
+                        if job.lane:
+                            self._abandon_lane(job.lane, jobs)
+                    job.result = CANCELLED_MESSAGE
+                elif skipped:
+                    job.result = "ERROR: Skipped because an earlier call in the same lane timed out."
+                elif now > job.deadline:
+                    if self._cancel_queued(job):
+                        # Every worker is busy (e.g. with hung calls); never wait for one forever
+                        job.result = f"ERROR: Tool '{job.name}' timed out after {job.timeout:g}s waiting for a free worker."
+                    else:
+                        job.result = f"ERROR: Tool '{job.name}' timed out after {job.timeout:g}s."
+                        job.finished_at = now
+                        if job.lane:
+                            self._abandon_lane(job.lane, jobs)
+                else:
+                    continue
+                pending.remove(job)
+
+        return [
+            ToolCallResult(job.name, job.args, job.result,
+                           (job.finished_at - job.started_at) if job.started_at and job.finished_at else 0.0)
+            for job in jobs
+        ]
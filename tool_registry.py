@@ -0,0 +1,146 @@
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+# --- Tool Registry ---
+# Har tool ek hi jagah register hota hai: uska function, lane (serial chalne wale tools ka group),
+# timeout aur andaazan kitna time lagta hai. Gemini ke function declarations
+# pehli baar zaroorat padne par ek hi baar bante hain aur cache ho jaate hain. Har turn par
+# user ki baat ke keywords se sirf relevant tool groups bheje jaate hain; kuch match na ho to
+# saare tools jaate hain, taaki model ke paas zaroorat ka tool hamesha rahe.
+
+DEFAULT_TOOL_TIMEOUT_SECONDS = 30.0
+WORD_PATTERN = re.compile(r"[a-z0-9_+#.]+")
+
+
+class ToolSpec:
+    """One registered tool and the metadata the dispatcher schedules it by."""
+
+    def __init__(self, function: Callable, name: str, group: str, lane: Optional[str],
+                 timeout: float, expected_seconds: float, keywords: Iterable[str]):
+        self.function = function
+        self.name = name
+        self.group = group
+        self.lane = lane  # Tools sharing a lane run serially, in call order; None runs in parallel
+        self.timeout = timeout
+        self.expected_seconds = expected_seconds
+        self.keywords = frozenset(keyword.lower() for keyword in keywords)
+
+
+class ToolRegistry:
+    """Looks tools up by name and builds their Gemini declarations once."""
+
+    def __init__(self):
+        self.specs: Dict[str, ToolSpec] = {}
+        self.declarations = {}
+        self.tool_sets = {}
+        self.lock = threading.Lock()
+
+    def register(self, function: Callable, group: str, lane: Optional[str] = None,
+                 timeout: float = DEFAULT_TOOL_TIMEOUT_SECONDS, expected_seconds: float = 0.1,
+                 keywords: Iterable[str] = (), name: Optional[str] = None) -> Callable:
+        spec = ToolSpec(function, name or function.__name__, group, lane, timeout, expected_seconds, keywords)
+        with self.lock:
+            self.specs[spec.name] = spec
+            self.declarations.pop(spec.name, None)
+            self.tool_sets.clear()
+        return function
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self.specs.get(name)
+
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    # --- Declarations ---
+
+    def declaration(self, name: str):
+        """The function declaration for one tool, derived from its signature and docstring on first use."""
+        with self.lock:
+            if name not in self.declarations:
+                from google.genai import types
+                self.declarations[name] = types.FunctionDeclaration.from_callable_with_api_option(
+                    callable=self.specs[name].function, api_option='GEMINI_API')
+            return self.declarations[name]
+
+    def tools(self, names: Optional[Iterable[str]] = None) -> list:
+        """A cached `tools` config value with the declarations of names (all tools if None)."""
+        wanted = None if names is None else set(names)
+        selected = tuple(name for name in self.specs if wanted is None or name in wanted)
+        if selected not in self.tool_sets:
+            from google.genai import types
+            tool_set = [types.Tool(function_declarations=[self.declaration(name) for name in selected])]
+            with self.lock:
+                self.tool_sets[selected] = tool_set
+        return self.tool_sets[selected]
+
+    # --- Per-Turn Selection ---
+
+    def select(self, text: str) -> List[str]:
+        """
+        Names of the tools worth sending for this request: every tool in a group whose keywords
+        appear in text. Returns all tools when nothing matches (small talk, follow-ups like "yes").
+        """
+        words = set(WORD_PATTERN.findall(text.lower()))
+        groups = {spec.group for spec in self.specs.values() if spec.keywords & words}
+        if not groups:
+            return self.names()
+        return [name for name, spec in self.specs.items() if spec.group in groups]
+
+
+def create_default_registry() -> ToolRegistry:
+    """The assistant's tools with their scheduling metadata and selection keywords."""
+    from tools import (
+        create_file,
+        create_directory,
+        apply_file_batch,
+        execute_command,
+        list_directory,
+        open_application_or_url,
+        lookup_phone_number_info,
+        lookup_phone_numbers_from_file,
+        scan_system_for_executables,
+        assign_keyboard_shortcut,
+        send_web_message,
+        send_bulk_web_messages,
+        check_command_job,
+        stop_command_job,
+    )
+
+    file_words = ["file", "files", "folder", "folders", "directory", "directories", "dir", "txt", "note",
+                  "notes", "likho", "write", "list", "dikhao", "content", "contents", "create", "banao", "ls"]
+    command_words = ["command", "commands", "run", "chalao", "execute", "terminal", "shell", "cmd", "git",
+                     "python", "pip", "npm", "node", "install", "build", "script", "job", "jobs", "process",
+                     "server", "ping", "stop", "kill", "status", "output"]
+    app_words = ["open", "kholo", "launch", "start", "app", "apps", "application", "website", "site", "url",
+                 "youtube", "google", "search", "play", "chalao", "browser", "scan", "shortcut", "shortcuts",
+                 "hotkey", "key", "keyboard"]
+    message_words = ["whatsapp", "telegram", "message", "messages", "msg", "send", "bhejo", "text", "contact",
+                     "contacts", "phone", "number", "numbers", "call", "sms", "csv"]
+
+    registry = ToolRegistry()
+    # Files and shell commands share the 'system' lane, so e.g. a file is only written after its folder exists
+    registry.register(create_file, group="files", lane="system", keywords=file_words)
+    registry.register(create_directory, group="files", lane="system", keywords=file_words)
+    # One call for a whole manifest instead of a model round trip per file
+    registry.register(apply_file_batch, group="files", lane="system", timeout=120.0,
+                      expected_seconds=0.5, keywords=file_words + ["project", "scaffold", "batch", "setup"])
+    registry.register(list_directory, group="files", lane="system", keywords=file_words)
+    # execute_command kills the command itself (max 600s); this timeout is only a backstop
+    registry.register(execute_command, group="commands", lane="system", timeout=630.0,
+                      expected_seconds=5.0, keywords=command_words)
+    registry.register(check_command_job, group="commands", keywords=command_words)
+    registry.register(stop_command_job, group="commands", keywords=command_words)
+    registry.register(open_application_or_url, group="apps", expected_seconds=0.5, keywords=app_words)
+    registry.register(scan_system_for_executables, group="apps", lane="system", timeout=300.0,
+                      expected_seconds=20.0, keywords=app_words)
+    registry.register(assign_keyboard_shortcut, group="apps", lane="system", keywords=app_words)
+    registry.register(send_web_message, group="messaging", lane="browser", timeout=120.0,
+                      expected_seconds=15.0, keywords=message_words)
+    registry.register(send_bulk_web_messages, group="messaging", lane="browser", timeout=900.0,
+                      expected_seconds=60.0, keywords=message_words)
+    registry.register(lookup_phone_number_info, group="messaging", keywords=message_words)
+    # Writes its own results file and spreads big lists over worker threads
+    registry.register(lookup_phone_numbers_from_file, group="messaging", timeout=600.0,
+                      expected_seconds=10.0, keywords=message_words)
+    return registry
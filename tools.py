@@ -2,22 +2,24 @@ import os
 import subprocess
 import webbrowser
 import platform
-import json
-from glob import glob
+import shutil
+import importlib.util
+from urllib.parse import urlparse
 from typing import List, Optional
 # tools.py (Add this function)
 
-from selenium import webdriver #type: ignore
-from selenium.webdriver.chrome.service import Service #type: ignore
-from selenium.webdriver.common.by import By #type: ignore
-from selenium.webdriver.support.ui import WebDriverWait #type: ignore
-from selenium.webdriver.support import expected_conditions as EC #type: ignore
-import time 
+from app_index import AppIndex, APP_INDEX_FILE, get_resolver, is_system_command
+from command_runner import CommandRun, build_command_line, get_job, start_job
+from state_store import STATE_STORE
 
 # --- CONFIGURATION (Ensure these paths are created in your project folder) ---
 WHATSAPP_CONFIG_FILE = "whatsapp_config.json"
 TELEGRAM_CONFIG_FILE = "telegram_config.json"
 
+# execute_command limits; anything longer should run detached
+DEFAULT_COMMAND_TIMEOUT_SECONDS = 60
+MAX_COMMAND_TIMEOUT_SECONDS = 600
+
 def load_web_config(app_name: str) -> dict:
     """Loads configuration for a specific web application."""
     if app_name.lower() == 'whatsapp':
@@ -27,10 +29,8 @@ def load_web_config(app_name: str) -> dict:
     else:
         return {}
     
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    return {}
+    # Parsed once and re-read only when the file changes
+    return dict(STATE_STORE.get(file_path))
 
 def send_web_message(app_name: str, contact_name: str, message_content: str) -> str:
     """
@@ -38,71 +38,24 @@ def send_web_message(app_name: str, contact_name: str, message_content: str) ->
     
     Note: Requires a pre-configured browser profile for login persistence.
     """
-    app_name = app_name.lower()
-    config = load_web_config(app_name)
-    
-    if not config or not config.get('browser_profile_path'):
-        return f"ERROR: Configuration for {app_name} not found or profile path missing. Please create {app_name}_config.json."
-
-    # --- Selenium Setup ---
-    try:
-        chrome_options = webdriver.ChromeOptions()
-        # Essential step: Load the pre-logged-in browser profile
-        chrome_options.add_argument(f"user-data-dir={config['browser_profile_path']}")
-        chrome_options.add_argument("--headless")  # Run in background without showing UI
-        
-        # Initialize the WebDriver
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get(config['url'])
-        
-        wait = WebDriverWait(driver, 30) # Wait up to 30 seconds for elements
-
-    except Exception as e:
-        return f"ERROR: Could not initialize Selenium/Browser. Driver/Profile error: {e}"
+    import web_messaging  # Selenium is loaded the first time a message is sent, not at startup
+    return web_messaging.send_web_message(app_name, contact_name, message_content)
 
-    # --- Messaging Logic (HIGHLY simplified - This part is complex and needs precise locators) ---
-    try:
-        if app_name == 'whatsapp':
-            # 1. Wait for WhatsApp to load (search bar presence)
-            search_box = wait.until(EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]')))
-            search_box.send_keys(contact_name)
-            time.sleep(2) 
-            
-            # 2. Click the contact (Locator is complex and changes often)
-            contact = wait.until(EC.presence_of_element_located((By.XPATH, f'//span[@title="{contact_name}"]')))
-            contact.click()
-            
-            # 3. Type message (Locator is complex and changes often)
-            message_area = wait.until(EC.presence_of_element_located((By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]'))) 
-            message_area.send_keys(message_content)
-            
-            # 4. Click send (Locator is complex and changes often)
-            send_button = wait.until(EC.presence_of_element_located((By.XPATH, '//span[@data-icon="send"]')))
-            send_button.click()
-            
-            result = f"SUCCESS: Message sent to {contact_name} on {app_name}."
-
-        elif app_name == 'telegram':
-            # Telegram logic here (uses different XPATHs/CSS Selectors)
-            result = f"INFO: Telegram automation logic needs to be fully implemented."
-            
-        else:
-            result = "ERROR: Unsupported web application for messaging."
-
-    except Exception as e:
-        result = f"ERROR during automation ({app_name}): Failed to find contact or send message. Reason: {e}"
-
-    finally:
-        driver.quit() # Always close the browser instance
-        return result
+def send_bulk_web_messages(app_name: str, contact_names: List[str], message_contents: List[str],
+                           messages_per_minute: int = 20, max_retries: int = 2) -> str:
+    """
+    Sends messages to many contacts on WhatsApp Web or Telegram Web in one browser session.
+    message_contents holds one message per contact, or a single message that is sent to every contact.
+    Sends are rate-limited (messages_per_minute) and each recipient is retried up to max_retries times.
+    Returns a per-recipient report.
+    """
+    import web_messaging
+    return web_messaging.send_bulk_web_messages(app_name, contact_names, message_contents,
+                                                messages_per_minute, max_retries)
 
 # --- External Libraries ---
-try:
-    import phonenumbers #type: ignore
-    from phonenumbers import geocoder, carrier, timezone #type: ignore
-    PHONENUMBERS_AVAILABLE = True
-except ImportError:
-    PHONENUMBERS_AVAILABLE = False
+# phonenumbers loads its geocoding tables on import (~0.5s), so it is only imported on first lookup
+PHONENUMBERS_AVAILABLE = importlib.util.find_spec("phonenumbers") is not None
 
 
 # --- File Management Tools ---
@@ -124,39 +77,102 @@ def create_directory(dirname: str) -> str:
     except Exception as e:
         return f"ERROR: Could not create directory '{dirname}'. Reason: {e}"
 
-def list_current_directory_contents() -> str:
-    """Lists all files and directories in the current working directory."""
-    try:
-        items = os.listdir('.')
-        return "SUCCESS: Current directory contents: " + ", ".join(items)
-    except Exception as e:
-        return f"ERROR: Could not list directory contents. Reason: {e}"
+def apply_file_batch(file_paths: List[str], file_contents: List[str], write_modes: Optional[List[str]] = None,
+                     directories: Optional[List[str]] = None, base_directory: str = ".") -> str:
+    """
+    Creates many folders and files in one call, e.g. to scaffold a project. file_contents[i] goes to
+    file_paths[i]; write_modes[i] is 'write' (default, replaces the file) or 'append'. A path may be
+    repeated to send large content in parts. Paths are relative to base_directory and missing parent
+    folders are created. Either the whole batch is applied or nothing is changed.
+    """
+    from file_batch import apply_batch
+    return apply_batch(file_paths, file_contents, write_modes, directories, base_directory)
+
+def list_directory(path: str = ".", pattern: str = "*", sort_by: str = "name", page_size: int = 50,
+                   cursor: Optional[str] = None, recursive: bool = False, max_results: int = 1000) -> str:
+    """
+    Lists one page of a directory (default: the current one) with types and sizes.
+    pattern is a glob filter such as '*.py' (several can be separated by ';'). sort_by is 'name',
+    'size' (largest first), 'modified' (newest first) or 'type'. If more entries exist, the result
+    contains a cursor; pass it back to get the next page. recursive=True also searches subfolders
+    and stops after max_results matches.
+    """
+    from dir_listing import list_directory as list_directory_page
+    return list_directory_page(path, pattern, sort_by, page_size, cursor, recursive, max_results)
 
 # --- System Execution Tools ---
 
-def execute_command(command: str, args: Optional[List[str]] = None) -> str:
+def execute_command(command: str, args: Optional[List[str]] = None, timeout_seconds: int = DEFAULT_COMMAND_TIMEOUT_SECONDS,
+                    detach: bool = False) -> str:
     """
     Executes a system command (e.g., 'git status', 'python script.py', 'code .').
-    Returns the command's output or an error message.
+    Output streams live to the console; the model gets only the first and last part plus a summary.
+    The command is killed after timeout_seconds. Long jobs (builds, installs, servers) can be started
+    with detach=True, which returns a job id to poll with check_command_job.
     """
-    full_command = [command] + (args if args else [])
+    command_line = build_command_line(command, args)
+    if detach:
+        try:
+            job_id = start_job(command_line)
+        except OSError as e:
+            return f"ERROR: Could not start command '{command}': {e}"
+        return f"SUCCESS: Started '{command_line}' in the background as {job_id}. Poll it with check_command_job."
+
+    timeout_seconds = max(1, min(int(timeout_seconds), MAX_COMMAND_TIMEOUT_SECONDS))
     try:
-        result = subprocess.run(
-            full_command, 
-            capture_output=True, 
-            text=True, 
-            check=True, 
-            shell=True 
-        )
-        output_report = f"COMMAND OUTPUT:\n{result.stdout}\nCOMMAND ERROR (if any):\n{result.stderr}"
-        return output_report
-    except subprocess.CalledProcessError as e:
-        return f"ERROR: Command failed with exit code {e.returncode}. Stderr: {e.stderr}"
-    except FileNotFoundError:
-        return f"ERROR: Command '{command}' not found on the system path."
+        print(f"INFO: Running '{command_line}' (timeout {timeout_seconds}s)...")
+        run = CommandRun(command_line)
+        returncode = run.wait(timeout=timeout_seconds)
+    except OSError as e:
+        return f"ERROR: Could not start command '{command}': {e}"
     except Exception as e:
         return f"ERROR: An unexpected error occurred while running command: {e}"
 
+    if run.stop_reason:
+        return f"ERROR: Command was stopped. {run.summary()}"
+    if returncode != 0:
+        # Shells report a missing program as exit code 127 (9009 from cmd.exe)
+        if returncode in (127, 9009):
+            return f"ERROR: Command '{command}' not found on the system path."
+        return f"ERROR: Command failed with exit code {returncode}. {run.summary()}"
+    return run.summary()
+
+
+def check_command_job(job_id: str) -> str:
+    """
+    Reports the status and the latest output of a command started with execute_command(detach=True).
+    """
+    run = get_job(job_id)
+    if run is None:
+        return f"ERROR: No background job with id '{job_id}'."
+    return f"INFO: {job_id}: {run.summary()}"
+
+
+def stop_command_job(job_id: str) -> str:
+    """
+    Stops a background command started with execute_command(detach=True), including its child processes.
+    """
+    run = get_job(job_id)
+    if run is None:
+        return f"ERROR: No background job with id '{job_id}'."
+    if not run.is_running():
+        return f"INFO: {job_id} already finished. {run.summary()}"
+    run.kill("stopped on request")
+    run.wait()
+    return f"SUCCESS: Stopped {job_id}. {run.summary()}"
+
+
+SITE_SEARCH_TEMPLATES = {
+    'youtube': "https://www.youtube.com/results?search_query=",
+    'google': "https://www.google.com/search?q=",
+    'spotify': "https://open.spotify.com/search/",
+    'whatsapp': "https://web.whatsapp.com/",
+    'telegram': "https://web.telegram.org/k/",
+    'portfolio': "https://mohd-eisa.lovable.app",
+    'alsa-ai': "https://alsa-ai.lovable.app",
+    'github': "https://github.com",
+    'stackoverflow': "https://stackoverflow.com/search?q=",
+}
 
 def open_application_or_url(target_type: str, target_name: str, search_query: Optional[str] = None) -> str:
     """
@@ -165,33 +181,46 @@ def open_application_or_url(target_type: str, target_name: str, search_query: Op
     target_type = target_type.lower()
     
     if target_type == 'app':
+        if is_system_command(target_name):
+            return f"ERROR: '{target_name}' is a system command, not an application. Use execute_command if the user really wants to run it."
+        # Resolve the spoken/typed name locally (exact, alias or a unique prefix) to an absolute path
+        resolver = get_resolver(APP_INDEX_FILE)
+        resolved = resolver.resolve(target_name)
+        if resolved:
+            app_name, app_path = resolved
+        else:
+            app_name, app_path = target_name, shutil.which(target_name)
+            suggestions = resolver.suggestions(target_name)
+            if suggestions and not app_path:
+                # Ambiguous or only a near miss: ask instead of guessing which program to start
+                return (f"INFO: No application is named exactly '{target_name}'. Candidates: {', '.join(suggestions)}. "
+                        "Ask the user which one to open.")
         try:
-            subprocess.Popen([target_name], shell=True)
-            return f"SUCCESS: Attempted to open application '{target_name}'. Please check your screen."
+            if app_path:
+                _launch_executable(app_path)
+            elif platform.system() == "Windows":
+                # Let Windows resolve registered apps (App Paths) that are not in the index
+                os.startfile(target_name)
+            else:
+                return (f"ERROR: Application '{target_name}' not found in the app index or PATH. "
+                        "Run scan_system_for_executables to refresh the index.")
+            if resolved:
+                AppIndex(APP_INDEX_FILE).record_launch(app_name)
+            return f"SUCCESS: Attempted to open application '{app_name}' ({app_path or target_name}). Please check your screen."
         except Exception as e:
             return f"ERROR: Could not open application '{target_name}'. Reason: {e}"
 
     elif target_type == 'site':
-        search_templates = {
-            'youtube': "https://www.youtube.com/results?search_query=",
-            'google': "https://www.google.com/search?q=",
-            'spotify': "https://open.spotify.com/search/",
-            'whatsapp': "https://web.whatsapp.com/",
-            'telegram': "https://web.telegram.org/k/",
-            'portfolio': "https://mohd-eisa.lovable.app",
-            'alsa-ai': "https://alsa-ai.lovable.app",
-            'github': "https://github.com",
-            'stackoverflow': "https://stackoverflow.com/search?q=",
-        }
-        
-        if target_name.lower() in search_templates:
-            base_url = search_templates[target_name.lower()]
+        if target_name.lower() in SITE_SEARCH_TEMPLATES:
+            base_url = SITE_SEARCH_TEMPLATES[target_name.lower()]
             if search_query:
                 full_url = base_url + search_query.replace(" ", "+")
                 webbrowser.open_new_tab(full_url)
                 return f"SUCCESS: Opened {target_name} with search query: '{search_query}'."
             else:
-                webbrowser.open_new_tab(target_name.lower())
+                # The home page is the template's scheme and host (e.g. https://www.youtube.com)
+                parsed = urlparse(base_url)
+                webbrowser.open_new_tab(f"{parsed.scheme}://{parsed.netloc}")
                 return f"SUCCESS: Opened the main page of {target_name}."
 
         elif target_name.startswith('http') or '.' in target_name:
@@ -209,6 +238,15 @@ def open_application_or_url(target_type: str, target_name: str, search_query: Op
             
     return "ERROR: Invalid target_type specified. Use 'app' or 'site'."
 
+def _launch_executable(app_path: str) -> None:
+    """Starts an executable by absolute path, without going through a shell."""
+    if platform.system() == "Windows":
+        os.startfile(app_path)  # Also handles .lnk shortcuts
+    elif platform.system() == "Darwin" and app_path.endswith('.app'):
+        subprocess.Popen(['open', app_path])
+    else:
+        subprocess.Popen([app_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
 # --- Phone Number Lookup Tool ---
 
 def lookup_phone_number_info(phone_number: str) -> str:
@@ -219,6 +257,9 @@ def lookup_phone_number_info(phone_number: str) -> str:
     if not PHONENUMBERS_AVAILABLE:
         return "ERROR: The 'phonenumbers' library is not installed. Please install it using 'pip install phonenumbers'."
         
+    import phonenumbers #type: ignore
+    from phonenumbers import geocoder, carrier, timezone #type: ignore
+
     try:
         parsed_number = phonenumbers.parse(phone_number, None)
     except phonenumbers.phonenumberutil.NumberParseException:
@@ -244,6 +285,22 @@ def lookup_phone_number_info(phone_number: str) -> str:
     )
     return result
 
+def lookup_phone_numbers_from_file(file_path: str, default_region: Optional[str] = None,
+                                   output_path: Optional[str] = None) -> str:
+    """
+    Looks up every phone number in a CSV file (phone/mobile column) or a text file (one number per line)
+    in a single call. Numbers without a + prefix are read as numbers of default_region (e.g. 'IN').
+    Per-number results (validity, type, region, location, carrier, timezones) are written to a CSV file
+    (output_path, default '<file>_lookup.csv'); only a summary with counts is returned.
+    """
+    if not PHONENUMBERS_AVAILABLE:
+        return "ERROR: The 'phonenumbers' library is not installed. Please install it using 'pip install phonenumbers'."
+    import phone_lookup
+    try:
+        return phone_lookup.lookup_numbers_from_file(file_path, default_region, output_path)
+    except Exception as e:
+        return f"ERROR: Bulk phone lookup failed: {e}"
+
 # --- System Scanning Tool ---
 
 def get_scan_directories() -> list:
@@ -251,35 +308,28 @@ def get_scan_directories() -> list:
     system = platform.system()
     if system == "Windows":
         return [
-            os.path.join(os.environ.get('PROGRAMFILES', ''), '*'), 
-            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'WindowsApps', '*'),
+            os.environ.get('PROGRAMFILES', ''), 
+            os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'WindowsApps'),
         ]
     elif system == "Linux" or system == "Darwin": 
-        return ['/usr/bin/*', '/usr/local/bin/*', '/Applications/*']
+        return ['/usr/bin', '/usr/local/bin', '/Applications']
     else:
         return []
 
-def scan_system_for_executables(output_file: str = "discovered_apps.json") -> str:
+def scan_system_for_executables(full_rescan: bool = False) -> str:
     """
-    Scans common application directories for executables and saves a list 
-    of their names and paths to a JSON file.
+    Scans common application directories for executables and updates the persistent app index.
+    Only directories that changed since the last scan are re-examined unless full_rescan is True.
     """
-    discovered_apps = {}
-    
     try:
-        for base_path_wildcard in get_scan_directories():
-            for path in glob(base_path_wildcard):
-                if os.path.isfile(path) and (os.access(path, os.X_OK) or path.endswith(('.exe', '.lnk'))):
-                    app_name = os.path.basename(path)
-                    app_name_clean = app_name.split('.')[0].lower()
-                    
-                    if app_name_clean and app_name_clean not in discovered_apps:
-                        discovered_apps[app_name_clean] = path 
-
-        with open(output_file, 'w') as f:
-            json.dump(discovered_apps, f, indent=4)
-            
-        return f"SUCCESS: Found {len(discovered_apps)} potential applications. List saved to '{output_file}'. Relaunch assistant to load them."
+        stats = AppIndex(APP_INDEX_FILE).scan(get_scan_directories(), full_rescan=full_rescan)
+        return (
+            f"SUCCESS: Index holds {stats['apps']} potential applications. "
+            f"Scanned {stats['changed']} changed of {stats['directories']} directories "
+            f"({stats['skipped']} unchanged, skipped): {stats['entries_scanned']} entries in "
+            f"{stats['seconds']:.2f}s ({stats['entries_per_second']:.0f} entries/s). "
+            f"Saved to '{APP_INDEX_FILE}'; new applications can be opened right away, no restart needed."
+        )
         
     except Exception as e:
         return f"ERROR during system scan: {e}"
@@ -303,19 +353,12 @@ def assign_keyboard_shortcut(app_name: str, shortcut: str) -> str:
         A message confirming the assignment or reporting an error.
     """
     try:
-        # 1. Existing shortcuts load karo
-        if os.path.exists(SHORTCUTS_FILE):
-            with open(SHORTCUTS_FILE, 'r') as f:
-                shortcuts = json.load(f)
-        else:
-            shortcuts = {}
+        # Assignment memory mein hota hai; user ko "saved" batane se pehle file abhi atomically likhi jaati hai
+        def assign(shortcuts):
+            shortcuts[app_name.lower()] = shortcut
 
-        # 2. Assignment karo
-        shortcuts[app_name.lower()] = shortcut
-        
-        # 3. Save wapas karo
-        with open(SHORTCUTS_FILE, 'w') as f:
-            json.dump(shortcuts, f, indent=4)
+        STATE_STORE.update(SHORTCUTS_FILE, assign)
+        STATE_STORE.save(SHORTCUTS_FILE)
             
         return f"SUCCESS: Shortcut '{shortcut}' assigned to application '{app_name}'. Saved to {SHORTCUTS_FILE}."
         
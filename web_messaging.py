@@ -0,0 +1,196 @@
+import platform
+import time
+from typing import List
+
+from selenium.webdriver.common.by import By #type: ignore
+from selenium.webdriver.common.keys import Keys #type: ignore
+from selenium.webdriver.common.action_chains import ActionChains #type: ignore
+from selenium.webdriver.support.ui import WebDriverWait #type: ignore
+from selenium.webdriver.support import expected_conditions as EC #type: ignore
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException #type: ignore
+
+from browser_pool import DRIVER_POOL, ProfileInUseError
+from rate_limiter import TokenBucketRateLimiter
+from tool_executor import cancel_requested
+from tools import load_web_config
+
+# --- Web Messaging (Selenium) ---
+# WhatsApp/Telegram Web automation yahan alag module mein hai taaki selenium sirf tab load ho
+# jab pehla message bheja jaaye. tools.py ke send_web_message/send_bulk_web_messages (jinke
+# signature aur docstring Gemini ko tool declaration ke roop mein jaate hain) isi ko call karte hain.
+
+def _open_messaging_session(app_name: str):
+    """Returns (config, profile_path) or an ERROR string if the app is not configured."""
+    config = load_web_config(app_name)
+    if not config or not config.get('browser_profile_path'):
+        return f"ERROR: Configuration for {app_name} not found or profile path missing. Please create {app_name}_config.json."
+    # A dedicated automation profile avoids clashing with the Chrome window you use every day
+    return config, config.get('automation_profile_path') or config['browser_profile_path']
+
+def _profile_in_use_message(app_name: str) -> str:
+    return (
+        f"ERROR: The Chrome profile for {app_name} is open in another Chrome window. Close that window, "
+        f"or set 'automation_profile_path' in {app_name}_config.json to a separate logged-in profile."
+    )
+
+def send_web_message(app_name: str, contact_name: str, message_content: str) -> str:
+    """
+    Automates sending a message via WhatsApp Web or Telegram Web using Selenium.
+    
+    Note: Requires a pre-configured browser profile for login persistence.
+    """
+    app_name = app_name.lower()
+    if app_name not in MESSAGING_STEPS:
+        return "ERROR: Unsupported web application for messaging."
+    session_info = _open_messaging_session(app_name)
+    if isinstance(session_info, str):
+        return session_info
+    config, profile_path = session_info
+
+    # --- Selenium Setup (a warm session per profile is reused across messages) ---
+    try:
+        with DRIVER_POOL.checkout(profile_path, config['url']) as (driver, freshly_loaded):
+            # Wait up to 30 seconds for elements on first load; an open tab answers immediately
+            wait = WebDriverWait(driver, 30 if freshly_loaded else 10)
+            try:
+                MESSAGING_STEPS[app_name](driver, wait, contact_name, message_content)
+                return f"SUCCESS: Message sent to {contact_name} on {app_name}."
+            except Exception as e:
+                return f"ERROR during automation ({app_name}): Failed to find contact or send message. Reason: {e}"
+    except ProfileInUseError:
+        return _profile_in_use_message(app_name)
+    except Exception as e:
+        return f"ERROR: Could not initialize Selenium/Browser. Driver/Profile error: {e}"
+
+def send_bulk_web_messages(app_name: str, contact_names: List[str], message_contents: List[str],
+                           messages_per_minute: int = 20, max_retries: int = 2) -> str:
+    """
+    Sends messages to many contacts on WhatsApp Web or Telegram Web in one browser session.
+    message_contents holds one message per contact, or a single message that is sent to every contact.
+    Sends are rate-limited (messages_per_minute) and each recipient is retried up to max_retries times.
+    Returns a per-recipient report.
+    """
+    app_name = app_name.lower()
+    if app_name not in MESSAGING_STEPS:
+        return "ERROR: Unsupported web application for messaging."
+    if len(message_contents) == 1:
+        message_contents = list(message_contents) * len(contact_names)
+    if not contact_names or len(message_contents) != len(contact_names):
+        return "ERROR: Provide one message per contact, or a single message for all contacts."
+    session_info = _open_messaging_session(app_name)
+    if isinstance(session_info, str):
+        return session_info
+    config, profile_path = session_info
+
+    limiter = TokenBucketRateLimiter(messages_per_minute, burst=1)
+    report = []
+    sent = 0
+    start = time.monotonic()
+    try:
+        with DRIVER_POOL.checkout(profile_path, config['url']) as (driver, freshly_loaded):
+            wait = WebDriverWait(driver, 30 if freshly_loaded else 10)
+            for contact_name, message_content in zip(contact_names, message_contents):
+                if cancel_requested():
+                    report.append(f"- Stopped before {contact_name}: cancelled by the user")
+                    break
+                error = None
+                for attempt in range(1, max_retries + 2):
+                    limiter.acquire()
+                    try:
+                        MESSAGING_STEPS[app_name](driver, wait, contact_name, message_content)
+                        error = None
+                        break
+                    except SendUnconfirmedError as e:
+                        # Never resend a message that may already have gone out
+                        error = str(e)
+                        break
+                    except Exception as e:
+                        error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                        # Close any half-open chat or search before trying again
+                        ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+                if error is None:
+                    sent += 1
+                    report.append(f"- {contact_name}: sent")
+                else:
+                    report.append(f"- {contact_name}: FAILED after {attempt} attempt(s) ({error})")
+    except ProfileInUseError:
+        return _profile_in_use_message(app_name)
+    except Exception as e:
+        report.append(f"- Batch aborted: browser error ({e})")
+
+    status = "SUCCESS" if sent == len(contact_names) else ("ERROR" if sent == 0 else "PARTIAL")
+    header = f"{status}: Sent {sent}/{len(contact_names)} messages on {app_name} in {time.monotonic() - start:.1f}s."
+    return "\n".join([header] + report)
+
+# --- Messaging Steps (explicit waits, no fixed sleeps; locators change often) ---
+
+def _xpath_literal(text: str) -> str:
+    """Quotes text for XPath, including names that contain both quote characters."""
+    if '"' not in text:
+        return f'"{text}"'
+    if "'" not in text:
+        return f"'{text}'"
+    return "concat(" + ", '\"', ".join(f'"{part}"' for part in text.split('"')) + ")"
+
+class SendUnconfirmedError(Exception):
+    """The send action ran but its confirmation never showed up; retrying could duplicate the message."""
+
+def _wait_for_compose_box_to_clear(wait, message_area) -> None:
+    def cleared(_):
+        try:
+            return not message_area.text.strip()
+        except StaleElementReferenceException:
+            return True  # The chat re-rendered after sending
+    try:
+        wait.until(cleared)
+    except TimeoutException:
+        raise SendUnconfirmedError("message was submitted but delivery could not be confirmed")
+
+def _replace_text(element, text: str) -> None:
+    # Tabs are reused between messages and attempts, so clear whatever was typed before
+    select_all = Keys.COMMAND if platform.system() == "Darwin" else Keys.CONTROL
+    element.send_keys(select_all + "a", Keys.DELETE)
+    element.send_keys(text)
+
+def _whatsapp_send(driver, wait, contact_name: str, message_content: str) -> None:
+    # 1. Wait for WhatsApp to load (search bar clickable)
+    search_box = wait.until(EC.element_to_be_clickable((By.XPATH, '//div[@contenteditable="true"][@data-tab="3"]')))
+    _replace_text(search_box, contact_name)
+
+    # 2. Click the contact as soon as the search result renders
+    contact = wait.until(EC.element_to_be_clickable((By.XPATH, f'//span[@title={_xpath_literal(contact_name)}]')))
+    contact.click()
+
+    # 3. Type message; WhatsApp keeps a draft from a failed attempt, so replace it instead of adding to it
+    message_area = wait.until(EC.element_to_be_clickable((By.XPATH, '//div[@contenteditable="true"][@data-tab="10"]')))
+    _replace_text(message_area, message_content)
+
+    # 4. Click send and wait until the compose box empties, which confirms the send
+    send_button = wait.until(EC.element_to_be_clickable((By.XPATH, '//span[@data-icon="send"]')))
+    send_button.click()
+    _wait_for_compose_box_to_clear(wait, message_area)
+
+def _telegram_send(driver, wait, contact_name: str, message_content: str) -> None:
+    # 1. Wait for Telegram Web A to load (search input clickable)
+    search_box = wait.until(EC.element_to_be_clickable((By.ID, 'telegram-search-input')))
+    _replace_text(search_box, contact_name)
+
+    # 2. Click the matching chat in the search results
+    contact = wait.until(EC.element_to_be_clickable((
+        By.XPATH,
+        f'//div[contains(@class, "ListItem")]//*[contains(@class, "fullName") and normalize-space()={_xpath_literal(contact_name)}]'
+    )))
+    contact.click()
+
+    # 3. Type message (replacing any draft left by a failed attempt) and press Enter to send
+    message_area = wait.until(EC.element_to_be_clickable((By.ID, 'editable-message-text')))
+    _replace_text(message_area, message_content)
+    message_area.send_keys(Keys.ENTER)
+
+    # 4. The compose box empties once the message has been sent
+    _wait_for_compose_box_to_clear(wait, message_area)
+
+MESSAGING_STEPS = {
+    'whatsapp': _whatsapp_send,
+    'telegram': _telegram_send,
+}